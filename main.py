@@ -1,5 +1,6 @@
 import sys
 import os
+import multiprocessing
 from PyQt5.QtWidgets import QApplication, QMessageBox
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont
@@ -54,4 +55,6 @@ def main():
         return 1
 
 if __name__ == "__main__":
+    # 多进程批量检测使用 spawn 启动子进程，打包为可执行文件时需要
+    multiprocessing.freeze_support()
     sys.exit(main())
\ No newline at end of file
@@ -11,39 +11,57 @@ PaperTrackerEyeLabeler - Python版本
 - Painter: 图像绘制器
 - SmartAdd: AI智能检测
 - StartupDialog: 启动配置对话框
+- ImageListModel: 虚拟化图片列表模型
+- ImageCache: 解码图像LRU缓存
+- PredictionCache: 推理结果磁盘缓存
+- LabelStore: 数据集标签库（可选的单文件标签存储）
+- LabelSaver: 后台标签写入器
+- LabelIndex: 数据集标签索引
 """
 
 __version__ = "2.0.0"
 __author__ = "PaperTrackerEyeLabeler Team"
 __email__ = "support@papertracker-eye.com"
 
-# 导入主要类，方便外部使用
-from .main_window import MainWindow
-from .draw_on_pic import DrawOnPic
-from .label_manager import OneLabel
-from .txt_manager import AllLabel
-from .qt_painter import Painter
-from .model import SmartAdd
-from .index_list import IndexQListWidgetItem
-from .startup_dialog import StartupDialog
+# 主要类按需导入：访问 src.MainWindow 等属性时才加载对应模块，
+# 这样命令行批量检测（python -m src.batch）不会加载任何Qt组件
+_LAZY_IMPORTS = {
+    'MainWindow': '.main_window',
+    'DrawOnPic': '.draw_on_pic',
+    'OneLabel': '.label_manager',
+    'AllLabel': '.txt_manager',
+    'Painter': '.qt_painter',
+    'SmartAdd': '.model',
+    'ImageListModel': '.file_list_model',
+    'StartupDialog': '.startup_dialog',
+    'ImageCache': '.image_cache',
+    'get_image_cache': '.image_cache',
+    'PredictionCache': '.prediction_cache',
+    'get_prediction_cache': '.prediction_cache',
+    'LabelStore': '.label_store',
+    'open_label_store': '.label_store',
+    'load_all_labels': '.label_store',
+    'LabelSaver': '.label_saver',
+    'get_label_saver': '.label_saver',
+    'LabelIndex': '.label_index',
+    'open_label_index': '.label_index',
+    # 常量
+    'MOVE': '.draw_on_pic',
+    'ADD': '.draw_on_pic',
+}
 
 # 定义公共API
-__all__ = [
-    'MainWindow',
-    'DrawOnPic', 
-    'OneLabel',
-    'AllLabel',
-    'Painter',
-    'SmartAdd',
-    'IndexQListWidgetItem',
-    'StartupDialog',
-    # 常量
-    'MOVE',
-    'ADD',
-]
+__all__ = list(_LAZY_IMPORTS)
 
-# 导入常量
-from .draw_on_pic import MOVE, ADD
+def __getattr__(name):
+    """延迟导入公共API"""
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
 
 # 包级别的配置
 DEFAULT_CONFIG = {
@@ -73,10 +91,12 @@ def _check_dependencies():
     """检查依赖是否满足"""
     missing_deps = []
     
-    try:
-        import PyQt5
-    except ImportError:
-        missing_deps.append('PyQt5')
+    # PyQt5 只有图形界面需要，命令行批量检测可以不安装；只检查是否存在，不导入
+    import importlib.util
+    if importlib.util.find_spec('PyQt5') is None:
+        import warnings
+        warnings.warn("PyQt5 not found. Only headless batch labelling (python -m src.batch) is available.",
+                     UserWarning)
     
     try:
         import cv2
@@ -0,0 +1,347 @@
+"""批量智能标注
+
+可在图形界面中调用，也可作为无图形环境的命令行工具使用：
+
+    python -m src.batch --images <文件夹|通配符|列表.txt> --model model.onnx --out <数据集文件夹>
+
+结果按现有格式写入 <数据集文件夹>/labels/<图片名>.txt（每行14个归一化坐标）。
+本模块及其依赖不导入任何Qt组件。
+"""
+import argparse
+import glob
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, List, Optional, Sequence, Tuple
+from .model import SmartAdd, ONNXRUNTIME_AVAILABLE
+from .pipeline import DetectionPipeline
+from .tracking import TrackingDetector
+from .manifest import DetectManifest, DETECT_MODES, DETECT_MISSING
+from .cache_utils import file_hash
+from .prediction_cache import get_prediction_cache
+from .quantization import QUANT_MODES, DEFAULT_CALIBRATION_SAMPLES, sample_paths
+from .folder_scanner import FolderScanner, is_image_file
+
+# 工作进程内的模型（每个进程各自持有一个 InferenceSession）
+_worker_model: Optional[SmartAdd] = None
+_worker_label_folder = ""
+_worker_keyframe_interval = 0
+
+
+def default_worker_count(threads_per_worker: int = 1) -> int:
+    """默认进程数：占满全部CPU核心"""
+    return max(1, (os.cpu_count() or 1) // max(1, threads_per_worker))
+
+
+def detect_in_process(model: SmartAdd, paths: Sequence[str], label_folder: str,
+                      on_progress: Optional[Callable[[int, List[str]], None]] = None,
+                      cancel_event: Optional[threading.Event] = None,
+                      running_event: Optional[threading.Event] = None,
+                      keyframe_interval: int = 0,
+                      **pipeline_options) -> Tuple[int, int]:
+    """在当前进程中以流水线方式检测，参数含义与 ProcessPoolDetector.run 相同
+
+    keyframe_interval > 0 时只对关键帧运行模型，其余帧用光流跟踪（见 TrackingDetector）；
+    否则 pipeline_options 传给 DetectionPipeline（各阶段线程数等）。
+    """
+    if keyframe_interval > 0:
+        detector = TrackingDetector(model, label_folder, keyframe_interval)
+        return detector.run(paths, on_progress, cancel_event, running_event)
+    pipeline = DetectionPipeline(model, label_folder, **pipeline_options)
+    return pipeline.run(paths, on_progress, cancel_event, running_event)
+
+
+# 传给工作进程的 SmartAdd 设置
+WORKER_MODEL_OPTIONS = ('batch_size', 'reduced_decode', 'use_prediction_cache', 'quantization')
+
+
+def worker_model_options(model: SmartAdd) -> dict:
+    """提取需要在工作进程中保持一致的模型设置"""
+    return {name: getattr(model, name) for name in WORKER_MODEL_OPTIONS}
+
+
+def _init_worker(model_path: str, label_folder: str, threads: int, model_options: dict,
+                 keyframe_interval: int):
+    """工作进程初始化：加载独立的推理会话"""
+    global _worker_model, _worker_label_folder, _worker_keyframe_interval
+    _worker_label_folder = label_folder
+    _worker_keyframe_interval = keyframe_interval
+    _worker_model = SmartAdd()
+    for name, value in model_options.items():
+        setattr(_worker_model, name, value)
+    if not _worker_model.set_model(model_path, intra_op_threads=threads, inter_op_threads=1):
+        _worker_model = None
+
+
+def _process_shard(paths: List[str]) -> Tuple[int, List[str]]:
+    """工作进程：检测一个分片并直接写入标签文件，返回 (处理数, 写入的路径)"""
+    if _worker_model is None:
+        return len(paths), []
+    # 进程内同样用流水线重叠读取、解码与推理，线程数保持最少以免超额占用CPU；
+    # 光流跟踪时分片内的连续帧按顺序处理，分片的第一帧为关键帧
+    written: List[str] = []
+    detect_in_process(_worker_model, paths, _worker_label_folder,
+                      lambda count, batch_written: written.extend(batch_written),
+                      keyframe_interval=_worker_keyframe_interval,
+                      read_workers=1, decode_workers=1)
+    return len(paths), written
+
+
+class ProcessPoolDetector:
+    """多进程分片批量检测
+
+    图片列表切成 shard_size 大小的分片分发给各进程，动态调度保证负载均衡；
+    各进程直接把结果写入同一个标签文件夹（每张图片一个文件，互不冲突）。
+    """
+
+    def __init__(self, model_path: str, label_folder: str, num_workers: Optional[int] = None,
+                 threads_per_worker: int = 1, shard_size: int = 256,
+                 model_options: Optional[dict] = None, keyframe_interval: int = 0):
+        """model_options 为工作进程中 SmartAdd 的设置（见 worker_model_options），
+        keyframe_interval > 0 时各分片使用光流跟踪检测"""
+        self.model_path = model_path
+        self.label_folder = label_folder
+        self.threads_per_worker = max(1, threads_per_worker)
+        self.num_workers = num_workers or default_worker_count(self.threads_per_worker)
+        self.shard_size = shard_size
+        self.model_options = dict(model_options or {})
+        self.keyframe_interval = keyframe_interval
+
+    def run(self, paths: Sequence[str],
+            on_progress: Optional[Callable[[int, List[str]], None]] = None,
+            cancel_event: Optional[threading.Event] = None,
+            running_event: Optional[threading.Event] = None) -> Tuple[int, int]:
+        """执行批量检测，返回 (检测成功数, 已处理数)
+
+        on_progress(本分片处理数, 本分片写入的路径) 在调用线程中回调；
+        running_event 被清除时暂停派发新分片，cancel_event 置位后尽快停止。
+        """
+        os.makedirs(self.label_folder, exist_ok=True)
+        total = len(paths)
+        detected = 0
+        processed = 0
+        next_start = 0
+        pending = set()
+
+        # 使用 spawn，避免在已有Qt线程的进程中 fork
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=self.num_workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self.model_path, self.label_folder, self.threads_per_worker,
+                      self.model_options, self.keyframe_interval),
+        ) as pool:
+            while next_start < total or pending:
+                # 每个进程保持两个分片在途，既不空闲也便于及时取消
+                while next_start < total and len(pending) < 2 * self.num_workers:
+                    if running_event is not None and not running_event.is_set() and pending:
+                        break
+                    if running_event is not None:
+                        running_event.wait()
+                    if cancel_event is not None and cancel_event.is_set():
+                        break
+                    shard = [paths[i] for i in range(next_start, min(next_start + self.shard_size, total))]
+                    pending.add(pool.submit(_process_shard, shard))
+                    next_start += len(shard)
+
+                if cancel_event is not None and cancel_event.is_set():
+                    for future in pending:
+                        future.cancel()
+                    next_start = total
+                    pending = {future for future in pending if not future.cancelled()}
+                if not pending:
+                    break
+
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.cancelled():
+                        continue
+                    count, written = future.result()
+                    processed += count
+                    detected += len(written)
+                    if on_progress is not None:
+                        on_progress(count, written)
+
+        return detected, processed
+
+
+def collect_images(specs: Sequence[str], recursive: bool = False) -> List[str]:
+    """解析输入：图片文件夹、通配符、图片列表txt（每行一个路径）或单个图片"""
+    paths: List[str] = []
+    for spec in specs:
+        if os.path.isdir(spec):
+            scanner = FolderScanner(spec, recursive)
+            paths.extend(os.path.join(spec, name) for name in scanner.scan_all())
+        elif spec.lower().endswith('.txt') and os.path.isfile(spec):
+            with open(spec, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith('#'):
+                        paths.append(line)
+        elif glob.has_magic(spec):
+            paths.extend(sorted(p for p in glob.glob(spec, recursive=True) if is_image_file(p)))
+        elif os.path.isfile(spec):
+            paths.append(spec)
+        else:
+            print(f"Warning: 输入不存在: {spec}")
+
+    # 去重并保持顺序
+    return list(dict.fromkeys(paths))
+
+
+class _ProgressPrinter:
+    """命令行进度输出（每隔几秒打印一次）"""
+
+    def __init__(self, total: int, interval: float = 2.0):
+        self.total = total
+        self.interval = interval
+        self.done = 0
+        self.detected = 0
+        self.start_time = time.monotonic()
+        self._last_print = 0.0
+
+    def __call__(self, count: int, written: List[str]):
+        self.done += count
+        self.detected += len(written)
+        now = time.monotonic()
+        if now - self._last_print >= self.interval or self.done >= self.total:
+            self._last_print = now
+            elapsed = max(now - self.start_time, 1e-6)
+            fps = self.done / elapsed
+            eta = (self.total - self.done) / fps if fps > 0 else 0.0
+            print(f"[{self.done}/{self.total}] 检测成功 {self.detected} | "
+                  f"{fps:.1f} 帧/秒 | 剩余 {eta:.0f} 秒", flush=True)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(
+        prog="python -m src.batch",
+        description="PaperTrackerEyeLabeler 命令行批量智能标注（无需图形界面）",
+    )
+    parser.add_argument("--images", nargs="+", required=True,
+                        help="图片文件夹、通配符（如 'data/*.jpg'）或图片列表txt，可指定多个")
+    parser.add_argument("--model", required=True, help="ONNX 模型文件")
+    parser.add_argument("--out", required=True, help="数据集文件夹，结果写入 <out>/labels/")
+    parser.add_argument("--recursive", action="store_true", help="递归扫描子文件夹")
+    parser.add_argument("--mode", choices=DETECT_MODES, default=DETECT_MISSING,
+                        help="检测范围：missing 只检测没有标签的图片（默认，中断后重新运行即可继续），"
+                             "all 全部重新检测并覆盖已有标签，"
+                             "stale 另外重新检测旧模型生成且未修改的标签")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="进程数，0 表示占满全部CPU核心（默认 1）")
+    parser.add_argument("--threads", type=int, default=0,
+                        help="每个进程的ORT线程数（默认：单进程使用调优结果或 2，多进程 1）")
+    parser.add_argument("--batch-size", type=int, default=0,
+                        help="每次推理的帧数（默认使用调优结果，未调优时为 64）")
+    parser.add_argument("--auto-tune", action="store_true",
+                        help="单进程模式：本机还没有该模型的调优结果时先自动调优推理配置")
+    parser.add_argument("--full-decode", action="store_true",
+                        help="按原尺寸解码图片（默认按模型输入尺寸缩小解码，速度更快）")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="不使用推理结果缓存（默认已检测过且未修改的图片直接使用缓存结果）")
+    parser.add_argument("--quantization", choices=QUANT_MODES, default=None,
+                        help="使用 INT8 量化模型推理：dynamic 只量化权重，static 用抽样图片校准"
+                             "（默认 FP32；精度对比见 python -m src.quantization）")
+    parser.add_argument("--track", type=int, default=0, metavar="N",
+                        help="连续视频帧：每 N 帧用模型检测一次，其余帧用光流跟踪上一帧的点，"
+                             "跟踪误差过大时提前检测（默认 0 表示逐帧检测）")
+    parser.add_argument("--read-workers", type=int, default=4,
+                        help="单进程流水线：读取文件的线程数（默认 4）")
+    parser.add_argument("--decode-workers", type=int, default=0,
+                        help="单进程流水线：解码和预处理的线程数（默认按CPU核心数）")
+    parser.add_argument("--infer-workers", type=int, default=1,
+                        help="单进程流水线：推理线程数（默认 1）")
+    parser.add_argument("--write-workers", type=int, default=1,
+                        help="单进程流水线：写入标签的线程数（默认 1）")
+    parser.add_argument("--stats", action="store_true",
+                        help="结束后打印流水线各阶段统计（单进程模式）")
+    args = parser.parse_args(argv)
+
+    if not ONNXRUNTIME_AVAILABLE:
+        print("Error: 需要安装 onnxruntime 才能进行批量检测")
+        return 1
+    if not os.path.isfile(args.model):
+        print(f"Error: 模型文件不存在: {args.model}")
+        return 1
+
+    paths = collect_images(args.images, args.recursive)
+    if not paths:
+        print("Error: 没有找到支持的图片")
+        return 1
+
+    # 按清单筛选需要检测的图片，写入的标签逐批记入清单，中断后重新运行即从剩余图片继续
+    model_hash = file_hash(args.model)
+    manifest = DetectManifest(args.out)
+    total = len(paths)
+    paths = manifest.plan(paths, args.mode, model_hash)
+    if len(paths) < total:
+        print(f"跳过 {total - len(paths)} 张已有标签的图片")
+    if not paths:
+        print("没有需要检测的图片")
+        return 0
+
+    label_folder = os.path.join(args.out, "labels")
+    workers = args.workers if args.workers > 0 else default_worker_count(args.threads or 1)
+    print(f"共 {len(paths)} 张图片，使用 {workers} 个进程，结果写入 {label_folder}")
+
+    progress = _ProgressPrinter(len(paths))
+
+    def report(count: int, written: List[str]):
+        manifest.record(written, model_hash)
+        progress(count, written)
+
+    model = SmartAdd()
+    model.batch_size = args.batch_size or None
+    model.auto_tune = args.auto_tune
+    model.reduced_decode = not args.full_decode
+    model.use_prediction_cache = not args.no_cache
+    model.quantization = args.quantization
+    model.calibration_paths = sample_paths(paths, DEFAULT_CALIBRATION_SAMPLES)
+    if model.use_prediction_cache:
+        # 推理结果缓存只在主进程中清理一次，工作进程不清理
+        get_prediction_cache().prune()
+
+    try:
+        if workers > 1:
+            # 量化模型在主进程中生成一次，工作进程直接加载
+            if args.quantization and not model.set_model(args.model):
+                return 1
+            detector = ProcessPoolDetector(
+                args.model, label_folder, num_workers=workers,
+                threads_per_worker=args.threads or 1,
+                model_options=worker_model_options(model), keyframe_interval=args.track
+            )
+            detected, processed = detector.run(paths, report)
+        else:
+            if not model.set_model(args.model, intra_op_threads=args.threads or None):
+                return 1
+            if args.track > 0:
+                tracker = TrackingDetector(model, label_folder, args.track)
+                detected, processed = tracker.run(paths, report)
+                print(tracker.summary())
+            else:
+                pipeline = DetectionPipeline(
+                    model, label_folder,
+                    read_workers=args.read_workers, decode_workers=args.decode_workers,
+                    infer_workers=args.infer_workers, write_workers=args.write_workers
+                )
+                detected, processed = pipeline.run(paths, report)
+                if args.stats:
+                    print(pipeline.stats.summary())
+    except KeyboardInterrupt:
+        print("已中断")
+        return 130
+
+    elapsed = time.monotonic() - progress.start_time
+    print(f"完成：处理 {processed} 张，检测成功 {detected} 张，用时 {elapsed:.1f} 秒")
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""推理微基准
+
+    python -m src.benchmark --model model.onnx --image eye.jpg [--frames 500]
+
+对同一张图片反复预处理和推理，比较逐帧分配数组的旧流程与写入预分配缓冲区、
+通过 IOBinding 绑定输入输出的流程：每帧耗时，以及用 tracemalloc 统计的每帧新分配字节数
+（NumPy、OpenCV 和 ONNX Runtime 返回的数组都计入）。新流程不再分配任何数组，
+剩下的几百字节是调用时临时的Python对象（参数、视图等）。
+另外比较原尺寸解码与按模型输入尺寸缩小解码的耗时。
+
+    python -m src.benchmark --model model.onnx --image eye.jpg --startup
+
+测量从启动到第一次预测的时间：每种情况各在新进程中运行（包含导入模块），
+比较不使用优化模型缓存、首次生成缓存和从缓存加载，以及同一进程内重新加载同一模型。
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Optional, Sequence
+import cv2
+import numpy as np
+from .image_io import read_file_bytes, decode_image
+from .model import SmartAdd, ONNXRUNTIME_AVAILABLE
+
+
+def _legacy_frame(model: SmartAdd, img: np.ndarray):
+    """旧流程：每个中间结果都是新数组，session.run 返回新的输出数组"""
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    resized = cv2.resize(gray, (model.input_width, model.input_height),
+                         interpolation=cv2.INTER_NEAREST)
+    normalized = resized.astype(np.float32) / 255.0
+    model.run_inference(normalized[np.newaxis, np.newaxis, :, :])
+
+
+def _inplace_frame(model: SmartAdd, img: np.ndarray, frame: np.ndarray):
+    """新流程：预处理写入预分配的输入缓冲区，输出写入绑定的缓冲区"""
+    model.preprocess_into(img, frame)
+    model.run_bound(model.fixed_batch or 1)
+
+
+def measure(run_frame: Callable[[], None], frames: int, warmup: int = 20) -> dict:
+    """返回每帧平均耗时（毫秒）和平均新分配字节数"""
+    for _ in range(warmup):
+        run_frame()
+
+    start = time.perf_counter()
+    for _ in range(frames):
+        run_frame()
+    elapsed = time.perf_counter() - start
+
+    # 单独统计分配：每帧开始时重置峰值，峰值减去帧前占用即为本帧新分配的内存
+    tracemalloc.start()
+    allocated = 0
+    try:
+        for _ in range(frames):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            run_frame()
+            _, peak = tracemalloc.get_traced_memory()
+            allocated += peak - before
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'ms_per_frame': elapsed / frames * 1000.0,
+        'bytes_per_frame': allocated / frames,
+    }
+
+
+# 子进程中执行：从导入模块开始计时，直到得到第一张图片的预测结果
+_STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from src.model import SmartAdd
+model = SmartAdd()
+model.use_prediction_cache = False
+model.use_optimized_cache = sys.argv[3] == "1"
+model.set_model(sys.argv[1])
+loaded = time.perf_counter()
+result = model.predict_batch([sys.argv[2]])[0]
+first = time.perf_counter()
+print(json.dumps({"load": loaded - start, "first": first - start, "ok": result is not None}))
+"""
+
+
+def measure_startup(model_path: str, image_path: str, use_optimized_cache: bool,
+                    cache_dir: str) -> Optional[dict]:
+    """在新进程中测量启动到第一次预测的时间（秒）"""
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PAPERTRACKER_CACHE_DIR=cache_dir)
+    completed = subprocess.run(
+        [sys.executable, "-c", _STARTUP_SCRIPT, os.path.abspath(model_path),
+         os.path.abspath(image_path), "1" if use_optimized_cache else "0"],
+        cwd=project_root, env=env, capture_output=True, text=True
+    )
+    for line in reversed(completed.stdout.splitlines()):
+        if line.startswith("{"):
+            return json.loads(line)
+    print(completed.stderr)
+    return None
+
+
+def startup_report(model_path: str, image_path: str) -> int:
+    """比较启动到第一次预测的时间"""
+    rows = []
+    # 使用空的临时缓存目录，保证"首次"确实没有优化模型缓存
+    with tempfile.TemporaryDirectory() as cache_dir:
+        rows.append(("不缓存优化模型", measure_startup(model_path, image_path, False, cache_dir)))
+        rows.append(("首次（生成缓存）", measure_startup(model_path, image_path, True, cache_dir)))
+        rows.append(("从缓存加载", measure_startup(model_path, image_path, True, cache_dir)))
+
+    # 同一进程内重新加载同一模型（重新配置时）直接复用会话
+    model = SmartAdd()
+    model.set_model(model_path)
+    start = time.perf_counter()
+    model.set_model(model_path)
+    reload_time = time.perf_counter() - start
+
+    print(f"{'情况':<16}{'加载模型':>10}{'第一次预测':>12}")
+    for name, result in rows:
+        if result is None:
+            print(f"{name:<16}{'失败':>10}")
+            continue
+        print(f"{name:<16}{result['load'] * 1000:>10.0f} ms{result['first'] * 1000:>10.0f} ms")
+    print(f"{'进程内重新加载':<16}{reload_time * 1000:>10.1f} ms")
+    return 0
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(prog="python -m src.benchmark", description="推理微基准")
+    parser.add_argument("--model", required=True, help="ONNX 模型文件")
+    parser.add_argument("--image", required=True, help="测试图片")
+    parser.add_argument("--frames", type=int, default=500, help="测量的帧数（默认 500）")
+    parser.add_argument("--threads", type=int, default=2, help="ORT线程数（默认 2）")
+    parser.add_argument("--startup", action="store_true", help="测量启动到第一次预测的时间")
+    args = parser.parse_args(argv)
+
+    if not ONNXRUNTIME_AVAILABLE:
+        print("Error: 需要安装 onnxruntime")
+        return 1
+    if args.startup:
+        return startup_report(args.model, args.image)
+
+    model = SmartAdd()
+    if not model.set_model(args.model, intra_op_threads=args.threads):
+        return 1
+    data = read_file_bytes(args.image)
+    img = decode_image(data) if data is not None else None
+    if img is None:
+        print(f"Error: 无法读取图片: {args.image}")
+        return 1
+
+    frame = model.buffers().frame
+    results = [
+        ("逐帧分配", measure(lambda: _legacy_frame(model, img), args.frames)),
+        ("预分配+IOBinding", measure(lambda: _inplace_frame(model, img, frame), args.frames)),
+        ("原尺寸解码", measure(lambda: decode_image(data), args.frames)),
+        ("缩小解码", measure(lambda: model.decode_for_inference(data), args.frames)),
+    ]
+    if model.buffers().binding is None:
+        print("注意: 模型输出形状不固定，未使用 IOBinding")
+
+    print(f"图片 {img.shape[1]}x{img.shape[0]}，{args.frames} 帧")
+    print(f"{'流程':<18}{'耗时/帧':>12}{'分配/帧':>14}")
+    for name, result in results:
+        print(f"{name:<18}{result['ms_per_frame']:>10.3f} ms{result['bytes_per_frame']:>12.0f} B")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+import hashlib
+import os
+import sys
+
+APP_NAME = "PaperTrackerEyeLabeler"
+
+
+def user_cache_dir(*parts: str) -> str:
+    """获取用户缓存目录（可用环境变量 PAPERTRACKER_CACHE_DIR 覆盖），不存在时自动创建"""
+    base = os.environ.get("PAPERTRACKER_CACHE_DIR")
+    if not base:
+        if sys.platform == "win32":
+            root = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+            base = os.path.join(root, APP_NAME, "cache")
+        elif sys.platform == "darwin":
+            base = os.path.join(os.path.expanduser("~/Library/Caches"), APP_NAME)
+        else:
+            root = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+            base = os.path.join(root, APP_NAME)
+    path = os.path.join(base, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def atomic_write_text(path: str, text: str):
+    """先写临时文件再重命名，避免中断时留下半个文件"""
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def file_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """计算文件内容的 SHA-1（用于识别模型文件是否变化）"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -7,11 +7,21 @@ from .qt_painter import Painter
 from .txt_manager import AllLabel
 from .label_manager import OneLabel
 from .model import SmartAdd
+from .image_cache import get_image_cache
 
 # 模式常量
 MOVE = 0
 ADD = 1
 
+def ndarray_to_qimage(img) -> QImage:
+    """将缓存中的 numpy 图像转换为 QImage（拷贝一份，不引用缓存内存）"""
+    height, width = img.shape[:2]
+    if img.ndim == 2:
+        fmt = QImage.Format_Grayscale8
+    else:
+        fmt = QImage.Format_BGR888
+    return QImage(img.data, width, height, img.strides[0], fmt).copy()
+
 class DrawOnPic(QLabel):
     """图像绘制和标注组件"""
     
@@ -30,7 +40,7 @@ class DrawOnPic(QLabel):
         # 图像相关
         self.current_file = ""
         self.image_name = ""
-        self.img: Optional[QImage] = None
+        self.base_pixmap: Optional[QPixmap] = None
         self.img2label = QTransform()
         
         # 鼠标操作相关
@@ -94,38 +104,59 @@ class DrawOnPic(QLabel):
         if not self.enabled:
             return
             
-        if self.auto_save:
-            self.save_as_txt()
+        self.leave_current_file()
         
         self.img2label.reset()
+        self.have_focus = False
         self.current_file = file_path
         self.image_name = self.get_pic_name(file_path)
         self.load_image()
         self.all_label.set_image_name(self.image_name)
         self.draw()
     
+    def close_current_file(self):
+        """关闭当前图片（切换文件夹前调用，自动保存后清空状态）"""
+        self.leave_current_file()
+        self.current_file = ""
+        self.image_name = ""
+        self.base_pixmap = None
+        self.have_focus = False
+        self.all_label.reset()
+        self.all_label.image_name = ""
+        self.update()
+    
+    def leave_current_file(self):
+        """离开当前图片：自动保存时保存修改，否则记入未保存集合（未修改的图片不写入）"""
+        if not self.current_file:
+            return
+        if self.auto_save:
+            self.save_as_txt()
+        else:
+            self.all_label.stash()
+    
     def get_pic_name(self, file_path: str) -> str:
         """从文件路径获取文件名（不含扩展名）"""
         return os.path.splitext(os.path.basename(file_path))[0]
     
     def load_image(self):
-        """加载图像"""
-        if self.painter.painter_label:
-            self.painter.painter_label.end()
-        
-        self.img = QImage()
+        """加载图像 - 只在切换图片时解码一次，生成缓存的底图"""
+        self.base_pixmap = None
         self.all_label.reset()
         
-        if not self.img.load(self.current_file):
+        # 从共享缓存读取，最近浏览过的图片无需再次解码
+        decoded = get_image_cache().get(self.current_file)
+        if decoded is None:
             print(f"Failed to load image: {self.current_file}")
+            # 尺寸未知，不沿用上一张图片的尺寸换算标签
+            self.all_label.set_pic_size(0, 0)
             return
         
-        self.painter.reset_painter(self.img)
-        self.all_label.set_pic_size(self.img.height(), self.img.width())
+        self.base_pixmap = QPixmap.fromImage(ndarray_to_qimage(decoded))
+        self.all_label.set_pic_size(self.base_pixmap.height(), self.base_pixmap.width())
         
         # 计算缩放比例以适应标签大小
         label_size = self.size()
-        img_size = self.img.size()
+        img_size = self.base_pixmap.size()
         
         scale_x = label_size.width() / img_size.width()
         scale_y = label_size.height() / img_size.height()
@@ -145,17 +176,25 @@ class DrawOnPic(QLabel):
         self.img2label = transform
     
     def paintEvent(self, event):
-        """绘制事件"""
+        """绘制事件 - 底图按 img2label 变换绘制，标注在控件坐标系中叠加"""
         if not self.enabled:
             return
             
-        if not self.img:
+        if self.base_pixmap is None:
             return
         
         painter = QPainter(self)
         painter.setRenderHint(QPainter.Antialiasing)
         painter.setTransform(self.img2label)
-        painter.drawImage(0, 0, self.img)
+        painter.drawPixmap(0, 0, self.base_pixmap)
+        painter.resetTransform()
+        
+        self.painter.reset_painter(painter, self.img2label)
+        self.painter.draw(self.all_label)
+        if self.have_focus and 0 <= self.focus_label < len(self.all_label.labels_in_pic):
+            self.painter.draw_focus(self.all_label.labels_in_pic[self.focus_label])
+        self.painter.end()
+        painter.end()
     
     def wheelEvent(self, event: QWheelEvent):
         """滚轮事件 - 缩放"""
@@ -214,6 +253,7 @@ class DrawOnPic(QLabel):
                 new_pos = true_point - self.drag_offset
                 self.drag_point.setX(new_pos.x())
                 self.drag_point.setY(new_pos.y())
+                self.all_label.mark_modified()
                 self.draw()
     
     def mouseReleaseEvent(self, event: QMouseEvent):
@@ -273,21 +313,12 @@ class DrawOnPic(QLabel):
         return closest_point
     
     def draw(self):
-        """绘制图像和标注"""
-        if self.painter.painter_label:
-            self.painter.painter_label.end()
-        
-        self.img = QImage()
-        if not self.img.load(self.current_file):
-            return
-        
-        self.painter.reset_painter(self.img)
-        self.painter.draw(self.all_label)
+        """重绘图像和标注（只触发 paintEvent，不再重新读取图片）"""
         self.update()
     
     def set_add_mode(self):
         """设置添加模式"""
-        if not self.img:
+        if self.base_pixmap is None:
             return
         self.mode = ADD
         self.all_label.label_now.reset()
@@ -295,20 +326,30 @@ class DrawOnPic(QLabel):
     
     def set_move_mode(self):
         """设置移动模式"""
-        if not self.img:
+        if self.base_pixmap is None:
             return
         self.mode = MOVE
         self.draw()
     
     def draw_focus(self, index: int):
         """绘制焦点标签"""
-        self.draw()
         if 0 <= index < len(self.all_label.labels_in_pic):
             self.focus_label = index
             self.have_focus = True
-            focus_label = self.all_label.labels_in_pic[index]
-            self.painter.draw_focus(focus_label)
-            self.update()
+        self.draw()
+    
+    def reload_labels(self):
+        """从标签文件重新读取当前图片的标签（文件被后台任务改写后调用）
+        
+        当前图片有未保存的修改时先记入未保存集合，重新读取后仍显示这些修改。
+        """
+        if not self.current_file:
+            return
+        self.all_label.stash()
+        self.all_label.reset()
+        self.have_focus = False
+        self.all_label.set_image_name(self.image_name)
+        self.draw()
     
     def set_label_path(self, folder_path: str):
         """设置标签路径"""
@@ -318,22 +359,27 @@ class DrawOnPic(QLabel):
         """获取当前标签"""
         return self.all_label.labels_in_pic
     
-    def save_as_txt(self):
-        """保存为txt文件"""
-        self.all_label.save_as_txt()
+    def save_as_txt(self) -> bool:
+        """保存当前图片的标注（未修改时不写入）"""
+        return self.all_label.save_as_txt()
+    
+    def save_all(self) -> int:
+        """保存所有修改过的图片，返回写入的图片数"""
+        return self.all_label.save_all()
     
     def auto_save_toggle(self, checked: bool):
         """切换自动保存"""
         self.auto_save = checked
     
-    def set_model_file(self, model_path: str):
+    def set_model_file(self, model_path: str) -> bool:
         """设置模型文件"""
-        self.model.set_model(model_path)
+        return self.model.set_model(model_path)
     
     def smart_detect(self):
         """智能检测"""
         self.all_label.reset()
         success = self.model.detect(self.current_file, self.all_label.labels_in_pic)
+        self.all_label.mark_modified()
         if success:
             self.doubleClicked.emit()
             if self.auto_save:
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Iterator, List, Optional
+from .cache_utils import user_cache_dir, atomic_write_text
+
+# 支持的图片格式
+IMAGE_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif'})
+
+LISTING_CACHE_VERSION = 1
+
+
+def is_image_file(name: str) -> bool:
+    """按扩展名判断是否为支持的图片"""
+    return os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+
+
+class FolderScanner:
+    """基于 os.scandir 的流式图片扫描器
+
+    scan() 按块产出相对路径，可选递归子文件夹（跳过隐藏目录）。
+    完整扫描的结果缓存到用户缓存目录，用各目录的 mtime 校验，
+    目录未变化时直接读取缓存，不再遍历文件夹。
+    """
+
+    def __init__(self, folder: str, recursive: bool = False,
+                 chunk_size: int = 2000, use_cache: bool = True):
+        self.folder = os.path.abspath(folder)
+        self.recursive = recursive
+        self.chunk_size = chunk_size
+        self.use_cache = use_cache
+        self.from_cache = False  # 本次结果是否来自缓存（缓存结果已排序）
+        self.count = 0
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        """取消扫描（可从其他线程调用）"""
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def scan(self) -> Iterator[List[str]]:
+        """按块产出图片相对路径；读取文件夹失败时抛出 OSError"""
+        self.count = 0
+        self.from_cache = False
+
+        cached = self._load_cache() if self.use_cache else None
+        if cached is not None:
+            self.from_cache = True
+            for start in range(0, len(cached), self.chunk_size):
+                if self.cancelled:
+                    return
+                chunk = cached[start:start + self.chunk_size]
+                self.count += len(chunk)
+                yield chunk
+            return
+
+        files: List[str] = []
+        dir_mtimes: Dict[str, int] = {}
+        chunk: List[str] = []
+        pending = [""]
+        while pending:
+            rel_dir = pending.pop()
+            abs_dir = os.path.join(self.folder, rel_dir)
+            try:
+                dir_mtimes[rel_dir] = os.stat(abs_dir).st_mtime_ns
+                with os.scandir(abs_dir) as entries:
+                    for entry in entries:
+                        if self.cancelled:
+                            return
+                        name = entry.name
+                        if is_image_file(name):
+                            if entry.is_file():
+                                rel_path = os.path.join(rel_dir, name) if rel_dir else name
+                                chunk.append(rel_path)
+                                if len(chunk) >= self.chunk_size:
+                                    files.extend(chunk)
+                                    self.count += len(chunk)
+                                    yield chunk
+                                    chunk = []
+                        elif (self.recursive and not name.startswith('.')
+                              and entry.is_dir(follow_symlinks=False)):
+                            pending.append(os.path.join(rel_dir, name) if rel_dir else name)
+            except OSError:
+                if not rel_dir:
+                    raise
+                print(f"Failed to scan subfolder: {abs_dir}")
+
+        if chunk:
+            files.extend(chunk)
+            self.count += len(chunk)
+            yield chunk
+
+        if self.use_cache:
+            files.sort()
+            self._save_cache(files, dir_mtimes)
+
+    def scan_all(self) -> List[str]:
+        """扫描并返回排序后的全部相对路径"""
+        files: List[str] = []
+        for chunk in self.scan():
+            files.extend(chunk)
+        if not self.from_cache:
+            files.sort()
+        return files
+
+    def _cache_path(self) -> str:
+        key = f"{self.folder}|{int(self.recursive)}".encode('utf-8', 'surrogatepass')
+        return os.path.join(user_cache_dir("listings"), hashlib.sha1(key).hexdigest() + ".json")
+
+    def _load_cache(self) -> Optional[List[str]]:
+        """读取列表缓存，任一目录 mtime 变化则视为失效"""
+        try:
+            with open(self._cache_path(), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if (data.get('version') != LISTING_CACHE_VERSION
+                    or data.get('folder') != self.folder
+                    or data.get('recursive') != self.recursive):
+                return None
+            for rel_dir, mtime in data['dirs'].items():
+                if os.stat(os.path.join(self.folder, rel_dir)).st_mtime_ns != mtime:
+                    return None
+            return data['files']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _save_cache(self, files: List[str], dir_mtimes: Dict[str, int]):
+        try:
+            data = {
+                'version': LISTING_CACHE_VERSION,
+                'folder': self.folder,
+                'recursive': self.recursive,
+                'dirs': dir_mtimes,
+                'files': files,
+            }
+            atomic_write_text(self._cache_path(), json.dumps(data, ensure_ascii=False))
+        except (OSError, UnicodeError) as e:
+            print(f"Failed to write listing cache: {e}")
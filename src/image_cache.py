@@ -0,0 +1,154 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import numpy as np
+from .image_io import imread
+
+# 默认内存预算：512 MB
+DEFAULT_CACHE_BYTES = 512 * 1024 * 1024
+
+CacheKey = Tuple[str, int, int]
+
+
+class ImageCache:
+    """解码图像LRU缓存 - 显示和推理共用
+
+    键为 (绝对路径, mtime_ns, 文件大小)，文件被修改后旧条目自动失效。
+    缓存的数组由多个使用者共享，调用方不得原地修改。
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        # 绝对路径 -> (键, 图像)，按最近使用顺序排列
+        self._entries: "OrderedDict[str, Tuple[CacheKey, np.ndarray]]" = OrderedDict()
+        # 正在解码的键，避免多个线程重复解码同一张图片
+        self._loading: Dict[CacheKey, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(path: str) -> Optional[CacheKey]:
+        """生成缓存键（只读取文件元数据）"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+    def get(self, path: str) -> Optional[np.ndarray]:
+        """获取解码后的图像，未命中时从磁盘读取并加入缓存"""
+        key = self.make_key(path)
+        if key is None:
+            return None
+
+        while True:
+            with self._lock:
+                img = self._lookup(key)
+                if img is not None:
+                    self.hits += 1
+                    return img
+                event = self._loading.get(key)
+                if event is None:
+                    event = threading.Event()
+                    self._loading[key] = event
+                    self.misses += 1
+                    break
+            # 其他线程正在解码同一张图片，等待其完成后重新查找
+            event.wait()
+
+        img = None
+        try:
+            img = imread(path)
+            if img is not None:
+                with self._lock:
+                    self._store(key, img)
+        finally:
+            with self._lock:
+                self._loading.pop(key, None)
+            event.set()
+        return img
+
+    def peek(self, path: str) -> Optional[np.ndarray]:
+        """仅查询缓存，不读取磁盘"""
+        key = self.make_key(path)
+        if key is None:
+            return None
+        with self._lock:
+            return self._lookup(key)
+
+    def contains(self, path: str) -> bool:
+        return self.peek(path) is not None
+
+    def put(self, path: str, img: np.ndarray):
+        """手动放入已解码的图像"""
+        key = self.make_key(path)
+        if key is None or img is None:
+            return
+        with self._lock:
+            self._store(key, img)
+
+    def set_max_bytes(self, max_bytes: int):
+        """设置内存预算，超出部分立即淘汰"""
+        with self._lock:
+            self.max_bytes = max(0, int(max_bytes))
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> dict:
+        """缓存统计信息"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+    def _lookup(self, key: CacheKey) -> Optional[np.ndarray]:
+        """查找条目（需持有锁），命中时移到队尾"""
+        entry = self._entries.get(key[0])
+        if entry is None:
+            return None
+        if entry[0] != key:
+            # 文件已被修改，丢弃旧条目
+            self._remove(key[0])
+            return None
+        self._entries.move_to_end(key[0])
+        return entry[1]
+
+    def _store(self, key: CacheKey, img: np.ndarray):
+        """存入条目（需持有锁）"""
+        if img.nbytes > self.max_bytes:
+            return
+        self._remove(key[0])
+        self._entries[key[0]] = (key, img)
+        self.current_bytes += img.nbytes
+        self._evict()
+
+    def _remove(self, path: str):
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self.current_bytes -= entry[1].nbytes
+
+    def _evict(self):
+        """按LRU顺序淘汰直到满足内存预算"""
+        while self._entries and self.current_bytes > self.max_bytes:
+            _, (_, img) = self._entries.popitem(last=False)
+            self.current_bytes -= img.nbytes
+
+
+# 进程级共享缓存
+_shared_cache = ImageCache()
+
+
+def get_image_cache() -> ImageCache:
+    """获取进程级共享的图像缓存"""
+    return _shared_cache
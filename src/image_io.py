@@ -0,0 +1,116 @@
+import struct
+import cv2
+import numpy as np
+from typing import Optional, Tuple
+
+# 图像读取默认标志：保留灰度/彩色通道数，统一转换为8位
+DEFAULT_IMREAD_FLAGS = cv2.IMREAD_ANYCOLOR
+
+# 缩小解码的倍数及对应标志（从大到小尝试）
+REDUCED_GRAYSCALE_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_GRAYSCALE_8),
+    (4, cv2.IMREAD_REDUCED_GRAYSCALE_4),
+    (2, cv2.IMREAD_REDUCED_GRAYSCALE_2),
+)
+
+# JPEG 中携带图像尺寸的 SOF 标记（排除 DHT/JPG/DAC）
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def read_file_bytes(path: str) -> Optional[np.ndarray]:
+    """读取文件原始字节（np.fromfile 支持中文路径）"""
+    try:
+        return np.fromfile(path, dtype=np.uint8)
+    except (OSError, ValueError) as e:
+        print(f"Failed to read file {path}: {e}")
+        return None
+
+
+def decode_image(data: np.ndarray, flags: int = DEFAULT_IMREAD_FLAGS) -> Optional[np.ndarray]:
+    """从内存字节解码图像"""
+    if data is None or data.size == 0:
+        return None
+    return cv2.imdecode(data, flags)
+
+
+def imread(path: str, flags: int = DEFAULT_IMREAD_FLAGS) -> Optional[np.ndarray]:
+    """读取并解码图像，替代 cv2.imread（后者不支持非ASCII路径）"""
+    data = read_file_bytes(path)
+    if data is None:
+        return None
+    return decode_image(data, flags)
+
+
+def read_image_size(data: np.ndarray) -> Optional[Tuple[int, int]]:
+    """只解析文件头获取图像尺寸 (宽, 高)，支持 JPEG/PNG/BMP，其他格式返回 None"""
+    if data is None or data.size < 26:
+        return None
+    header = data[:32].tobytes()
+
+    if header.startswith(b'\x89PNG\r\n\x1a\n'):
+        width, height = struct.unpack('>II', header[16:24])
+        return width, height
+
+    if header.startswith(b'BM'):
+        width, height = struct.unpack('<ii', header[18:26])
+        return abs(width), abs(height)
+
+    if header.startswith(b'\xff\xd8'):
+        buf = memoryview(data)
+        size = len(buf)
+        pos = 2
+        while pos + 9 < size:
+            if buf[pos] != 0xFF:
+                return None
+            marker = buf[pos + 1]
+            if marker == 0xFF:
+                # 填充字节
+                pos += 1
+                continue
+            if marker == 0x01 or 0xD0 <= marker <= 0xD9:
+                pos += 2
+                continue
+            if marker in _JPEG_SOF_MARKERS:
+                height, width = struct.unpack('>HH', bytes(buf[pos + 5:pos + 9]))
+                return (width, height) if width and height else None
+            length = (buf[pos + 2] << 8) | buf[pos + 3]
+            pos += 2 + length
+    return None
+
+
+def reduced_grayscale_flags(width: int, height: int, min_width: int, min_height: int) -> Tuple[int, int]:
+    """选择缩小解码的标志：缩小后仍不小于 (min_width, min_height) 的最大倍数
+
+    返回 (标志, 倍数)，无法缩小时为 (IMREAD_GRAYSCALE, 1)。
+    """
+    for factor, flags in REDUCED_GRAYSCALE_FLAGS:
+        if width // factor >= min_width and height // factor >= min_height:
+            return flags, factor
+    return cv2.IMREAD_GRAYSCALE, 1
+
+
+def decode_reduced(data: np.ndarray, min_width: int, min_height: int
+                   ) -> Tuple[Optional[np.ndarray], Optional[Tuple[int, int]]]:
+    """按目标尺寸缩小解码为灰度图，返回 (图像, 原图尺寸 (h,w))
+
+    JPEG 解码器可以直接按 1/2、1/4、1/8 输出，省去大部分IDCT和颜色转换；
+    原图尺寸取自文件头，坐标据此映射回原图像素。
+    """
+    if data is None or data.size == 0:
+        return None, None
+
+    size = read_image_size(data)
+    if size is None:
+        img = cv2.imdecode(data, cv2.IMREAD_GRAYSCALE)
+        return img, (img.shape[:2] if img is not None else None)
+
+    width, height = size
+    flags, _ = reduced_grayscale_flags(width, height, min_width, min_height)
+    img = cv2.imdecode(data, flags)
+    if img is None:
+        return None, None
+
+    # 解码时按 EXIF 方向旋转了90度则文件头中的宽高需要交换
+    if width != height and (img.shape[1] > img.shape[0]) != (width > height):
+        width, height = height, width
+    return img, (height, width)
@@ -0,0 +1,150 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional, Tuple
+import numpy as np
+from .label_store import open_label_store
+
+# 每张图片的索引项：(标签数, 是否完整)
+IndexEntry = Tuple[int, bool]
+
+
+def summarize_label_file(path: str) -> Optional[IndexEntry]:
+    """统计标签文件（不解析坐标）：文件不存在时返回 None
+
+    有数值个数不是14的行（只标了部分点）或没有任何标签时视为不完整。
+    """
+    try:
+        with open(path, 'r') as f:
+            text = f.read()
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        print(f"Error reading txt file {path}: {e}")
+        return None
+    count = 0
+    complete = True
+    for line in text.splitlines():
+        values = len(line.split())
+        if values == 14:  # 7个点 × 2个坐标 = 14个数值
+            count += 1
+        elif values:
+            complete = False
+    return count, complete and count > 0
+
+
+def summarize_points(points: np.ndarray, unfinished: int = 0) -> Optional[IndexEntry]:
+    """按保存的坐标 (K,7,2) 统计索引项，规则与 summarize_label_file 读取写出的文件相同
+
+    unfinished 为当前图片中未标完（少于7个点，不会写入文件）的标签数，有时视为不完整，
+    "下一张标注不完整"可以找回本次会话中没有标完的图片（重新建立索引后以磁盘为准）。
+    没有任何标签时标签文件被删除，返回 None。
+    """
+    count = len(points)
+    if not count and not unfinished:
+        return None
+    return count, count > 0 and not unfinished
+
+
+class LabelIndex:
+    """数据集标签索引：图片名 -> (标签数, 是否完整)
+
+    打开文件夹时在后台一次建好（多线程读取 labels/，有标签库时一次查询），
+    之后由保存路径（LabelSaver.submit）和批量检测的写入回调保持最新，
+    文件列表的状态和"下一张未标注"导航不再逐个检查标签文件。
+    """
+
+    def __init__(self, label_folder: str):
+        self.label_folder = label_folder
+        self.ready = False
+        self._entries: Dict[str, IndexEntry] = {}
+        # 建索引期间的更新，扫描结束后覆盖扫描结果
+        self._updates: Optional[Dict[str, Optional[IndexEntry]]] = None
+        self._lock = threading.Lock()
+        # 同一文件夹的多次 build（切换回同一文件夹时旧的扫描可能尚未结束）依次进行
+        self._build_lock = threading.Lock()
+
+    def _scan(self, workers: int) -> Dict[str, IndexEntry]:
+        store = open_label_store(self.label_folder)
+        if store is not None:
+            # 标签库中只保存完整的标签
+            return {name: (count, True) for name, count in store.counts().items()}
+        try:
+            with os.scandir(self.label_folder) as entries:
+                names = [entry.name[:-4] for entry in entries if entry.name.endswith('.txt')]
+        except FileNotFoundError:
+            return {}
+        paths = [os.path.join(self.label_folder, f"{name}.txt") for name in names]
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="label-index") as pool:
+            summaries = pool.map(summarize_label_file, paths, chunksize=256)
+            return {name: entry for name, entry in zip(names, summaries) if entry is not None}
+
+    def build(self, workers: int = 8):
+        """扫描标签文件夹（或标签库）重建索引，可在后台线程调用"""
+        with self._build_lock:
+            with self._lock:
+                self.ready = False
+                self._updates = {}
+            entries = self._scan(workers)
+            with self._lock:
+                for name, entry in self._updates.items():
+                    if entry is None:
+                        entries.pop(name, None)
+                    else:
+                        entries[name] = entry
+                self._entries = entries
+                self._updates = None
+                self.ready = True
+
+    def _set(self, name: str, entry: Optional[IndexEntry]):
+        with self._lock:
+            if entry is None:
+                self._entries.pop(name, None)
+            else:
+                self._entries[name] = entry
+            if self._updates is not None:
+                self._updates[name] = entry
+
+    def update(self, name: str, points: np.ndarray, unfinished: int = 0):
+        """保存时按保存的坐标 (K,7,2) 更新一张图片，见 summarize_points"""
+        self._set(name, summarize_points(points, unfinished))
+
+    def refresh(self, names: Iterable[str]):
+        """从磁盘重新读取这些图片的索引项（批量检测写入后调用）"""
+        store = open_label_store(self.label_folder)
+        for name in names:
+            if store is not None:
+                points = store.get(name)
+                self._set(name, summarize_points(points) if points is not None else None)
+            else:
+                self._set(name, summarize_label_file(os.path.join(self.label_folder, f"{name}.txt")))
+
+    def get(self, name: str) -> Optional[IndexEntry]:
+        with self._lock:
+            return self._entries.get(name)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_indexes: Dict[str, LabelIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def open_label_index(label_folder: str) -> LabelIndex:
+    """标签文件夹的共享索引（尚未建立时 ready 为 False）"""
+    key = os.path.abspath(label_folder)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = LabelIndex(label_folder)
+        return index
+
+
+def find_label_index(label_folder: str) -> Optional[LabelIndex]:
+    """已建立的索引，没有时返回 None（不创建）"""
+    if not label_folder:
+        return None
+    with _indexes_lock:
+        index = _indexes.get(os.path.abspath(label_folder))
+    return index if index is not None and index.ready else None
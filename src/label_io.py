@@ -0,0 +1,88 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+import numpy as np
+
+# 标签txt格式：每行一个标签，7个点的归一化坐标共14个数值
+# 本模块不依赖Qt，可在命令行批量检测和工作进程中使用
+
+_LINE_FORMAT = " ".join(["%.6f"] * 14) + "\n"
+
+
+def format_label_lines(points: np.ndarray) -> str:
+    """将归一化坐标 (K,7,2) 格式化为txt内容，每行14个数值"""
+    rows = np.asarray(points, dtype=np.float64).reshape(-1, 14).tolist()
+    return "".join(_LINE_FORMAT % tuple(row) for row in rows)
+
+
+def write_label_file(file_path: str, points: np.ndarray):
+    """写入标签文件（不依赖图片尺寸和Qt对象，供批量检测使用）"""
+    with open(file_path, 'w') as f:
+        f.write(format_label_lines(points))
+
+
+def parse_label_text(text: str) -> np.ndarray:
+    """解析txt内容为归一化坐标 (K,7,2)，数值个数不是14的行忽略
+
+    有效行的数值字符串一次交给 NumPy 转换；有无法解析的数值时再逐行解析，跳过出错的行。
+    """
+    tokens = []
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) == 14:  # 7个点 × 2个坐标 = 14个数值
+            tokens.extend(parts)
+    try:
+        return np.array(tokens, dtype=np.float64).reshape(-1, 7, 2)
+    except ValueError:
+        pass
+    rows = []
+    for start in range(0, len(tokens), 14):
+        try:
+            rows.append([float(v) for v in tokens[start:start + 14]])
+        except ValueError:
+            continue
+    return np.array(rows, dtype=np.float64).reshape(-1, 7, 2)
+
+
+def read_label_file(file_path: str) -> Optional[np.ndarray]:
+    """读取标签文件，文件不存在时返回 None"""
+    try:
+        with open(file_path, 'r') as f:
+            return parse_label_text(f.read())
+    except FileNotFoundError:
+        return None
+
+
+def _read_folder_file(path: str) -> np.ndarray:
+    try:
+        points = read_label_file(path)
+    except OSError as e:
+        print(f"Error reading txt file {path}: {e}")
+        points = None
+    return points if points is not None else np.empty((0, 7, 2))
+
+
+def read_label_folder(label_folder: str, workers: int = 8) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """一次读出标签文件夹中的全部txt，不创建任何Qt对象，也不需要图片尺寸
+
+    多线程读取和解析，返回 (有标签的图片名（已排序）, 归一化坐标 (N,7,2) float32,
+    每个标签所属图片在图片名中的下标 int32)，与 LabelStore.read_all 相同。
+    """
+    try:
+        with os.scandir(label_folder) as entries:
+            names = sorted(entry.name[:-4] for entry in entries if entry.name.endswith('.txt'))
+    except FileNotFoundError:
+        names = []
+
+    paths = [os.path.join(label_folder, f"{name}.txt") for name in names]
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="label-read") as pool:
+        per_file = list(pool.map(_read_folder_file, paths, chunksize=256))
+
+    counts = np.fromiter((len(points) for points in per_file), dtype=np.int64, count=len(per_file))
+    keep = counts > 0
+    kept_names = [name for name, k in zip(names, keep.tolist()) if k]
+    image_index = np.repeat(np.arange(len(kept_names), dtype=np.int32), counts[keep])
+    points = np.empty((int(counts.sum()), 7, 2), dtype=np.float32)
+    if len(points):
+        np.concatenate([p for p in per_file if len(p)], out=points, casting='same_kind')
+    return kept_names, points, image_index
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import List, Optional, Sequence
 from PyQt5.QtCore import QPointF
 
 class OneLabel:
@@ -8,12 +8,27 @@ class OneLabel:
         self.num_points = num_points
         self.label_points: List[QPointF] = []
         self.has_points = False
+        # 修改代数：每次增删改点时加一，用于判断标注是否需要重新保存
+        self.generation = 0
+    
+    @classmethod
+    def from_points(cls, coords: Sequence[Sequence[float]]) -> "OneLabel":
+        """由像素坐标 [(x, y), ...] 一次创建完整的标签（坐标数组可先用 tolist() 批量转换）"""
+        label = cls(len(coords))
+        label.label_points = [QPointF(x, y) for x, y in coords]
+        label.has_points = len(coords) > 0
+        return label
+    
+    def touch(self):
+        """记录一次修改（直接修改 label_points 中的点后调用）"""
+        self.generation += 1
     
     def set_point(self, point: QPointF) -> bool:
         """设置点"""
         if len(self.label_points) >= self.num_points:
             return False
         self.label_points.append(point)
+        self.touch()
         if len(self.label_points) == self.num_points:
             self.has_points = True
         return True
@@ -21,6 +36,7 @@ class OneLabel:
     def set_point_flexible(self, point: QPointF):
         """灵活设置点（可变数量）"""
         self.label_points.append(point)
+        self.touch()
         self.num_points = len(self.label_points)
         self.has_points = True
     
@@ -38,6 +54,7 @@ class OneLabel:
         """重置标签"""
         self.label_points.clear()
         self.has_points = False
+        self.touch()
     
     def empty(self) -> bool:
         return len(self.label_points) == 0
@@ -47,6 +64,7 @@ class OneLabel:
         if not self.label_points:
             return False
         self.label_points.pop()
+        self.touch()
         if len(self.label_points) < self.num_points:
             self.has_points = False
         return True
@@ -67,4 +85,5 @@ class OneLabel:
         return self.label_points[index]
     
     def __setitem__(self, index: int, value: QPointF):
-        self.label_points[index] = value
\ No newline at end of file
+        self.label_points[index] = value
+        self.touch()
\ No newline at end of file
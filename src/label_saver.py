@@ -0,0 +1,187 @@
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from .label_io import format_label_lines
+from .label_index import open_label_index
+from .label_store import LabelStore
+
+# 收到保存请求后等待多久再写入，期间的保存合并为一批（一次 fsync 目录 / 一个事务）
+DEFAULT_BATCH_DELAY = 0.1
+
+# 键：(标签文件夹, 图片名)；值：(标签库或 None, 归一化坐标 (K,7,2))
+SaveKey = Tuple[str, str]
+SaveItem = Tuple[Optional[LabelStore], np.ndarray]
+
+
+def _fsync_dir(folder: str):
+    """同步目录项，使 rename 落盘（Windows 不支持打开目录，跳过）"""
+    try:
+        fd = os.open(folder, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class LabelSaver:
+    """后台写入标签（write-behind）
+
+    保存请求只在UI线程复制一份坐标并放入队列，由后台线程写入，切换图片不再
+    等待磁盘（网络存储上尤其明显）。同一张图片在写入前的多次保存合并为最后一次。
+    txt 先写入临时文件并 fsync，再原子地 rename 覆盖，一批文件只同步一次目录；
+    标签库一批写入一个事务。写入完成前读取标签应先查询 pending，避免读到旧文件。
+    """
+
+    def __init__(self, batch_delay: float = DEFAULT_BATCH_DELAY):
+        self.batch_delay = batch_delay
+        # 尚未写入（或正在写入）的保存，写入成功后才移除
+        self._pending: Dict[SaveKey, SaveItem] = {}
+        # 已交给写线程的键，写入期间新的保存不会被误删
+        self._writing: Dict[SaveKey, SaveItem] = {}
+        # 写入失败的保存，flush 时重试
+        self._failed: Dict[SaveKey, SaveItem] = {}
+        self._flushing = 0
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, label_folder: str, name: str, points: np.ndarray,
+               store: Optional[LabelStore] = None, unfinished: int = 0):
+        """排队保存一张图片的标签（没有标签时删除标签文件），立即返回
+
+        unfinished 为未标完、不会写入的标签数，只用于标签索引的完整状态。
+        """
+        key = (label_folder, name)
+        points = np.array(points, dtype=np.float64).reshape(-1, 7, 2)
+        # 标签索引立即按保存的坐标重新统计
+        open_label_index(label_folder).update(name, points, unfinished)
+        with self._cond:
+            self._failed.pop(key, None)
+            self._pending[key] = (store, points)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="label-saver", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def pending(self, label_folder: str, name: str) -> Optional[np.ndarray]:
+        """尚未写入磁盘的标签（包括写入失败的），没有时返回 None"""
+        key = (label_folder, name)
+        with self._cond:
+            item = self._pending.get(key) or self._writing.get(key) or self._failed.get(key)
+        return item[1] if item is not None else None
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return len(self._pending) + len(self._writing) + len(self._failed)
+
+    def failed_count(self) -> int:
+        with self._cond:
+            return len(self._failed)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待所有排队的保存写完（写入失败的重试一次），全部成功返回 True"""
+        with self._cond:
+            for key, item in self._failed.items():
+                self._pending.setdefault(key, item)
+            self._failed.clear()
+            self._flushing += 1
+            self._cond.notify_all()
+            try:
+                done = self._cond.wait_for(lambda: not self._pending and not self._writing, timeout)
+            finally:
+                self._flushing -= 1
+            return done and not self._failed
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending)
+                # 稍等片刻让连续的保存合并成一批；flush 等待时不再延迟
+                self._cond.wait_for(lambda: self._flushing, self.batch_delay)
+                self._writing = self._pending
+                self._pending = {}
+            try:
+                failed = self._write_batch(self._writing)
+            except Exception as e:
+                # 意外错误不能让写线程退出，否则 flush 会一直等待；整批记为失败，flush 时重试
+                print(f"Error saving labels: {e}")
+                failed = list(self._writing)
+            with self._cond:
+                for key in failed:
+                    # 写入期间又有新的保存时以新的为准
+                    if key not in self._pending:
+                        self._failed[key] = self._writing[key]
+                self._writing = {}
+                self._cond.notify_all()
+
+    def _write_batch(self, items: Dict[SaveKey, SaveItem]) -> List[SaveKey]:
+        """写入一批保存，返回失败的键"""
+        failed: List[SaveKey] = []
+        by_store: Dict[LabelStore, List[SaveKey]] = {}
+        by_folder: Dict[str, List[SaveKey]] = {}
+        for key, (store, _) in items.items():
+            if store is not None:
+                by_store.setdefault(store, []).append(key)
+            else:
+                by_folder.setdefault(key[0], []).append(key)
+
+        for store, keys in by_store.items():
+            if not store.put_many((name, items[(folder, name)][1]) for folder, name in keys):
+                failed.extend(keys)
+        for folder, keys in by_folder.items():
+            failed.extend(self._write_txt(folder, [(key, items[key][1]) for key in keys]))
+        return failed
+
+    @staticmethod
+    def _write_txt(folder: str, items: List[Tuple[SaveKey, np.ndarray]]) -> List[SaveKey]:
+        """原子地写入一个文件夹中的txt：临时文件 + fsync + rename，最后同步一次目录"""
+        failed: List[SaveKey] = []
+        try:
+            os.makedirs(folder, exist_ok=True)
+        except OSError as e:
+            print(f"Error saving txt file: {e}")
+            return [key for key, _ in items]
+
+        changed = False
+        for key, points in items:
+            file_path = os.path.join(folder, f"{key[1]}.txt")
+            tmp_path = f"{file_path}.tmp{os.getpid()}"
+            try:
+                if len(points):
+                    with open(tmp_path, 'w') as f:
+                        f.write(format_label_lines(points))
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(tmp_path, file_path)
+                    changed = True
+                elif os.path.exists(file_path):
+                    # 没有标签时删除标签文件
+                    os.remove(file_path)
+                    changed = True
+            except OSError as e:
+                print(f"Error saving txt file: {e}")
+                failed.append(key)
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+        if changed:
+            _fsync_dir(folder)
+        return failed
+
+
+_shared_saver: Optional[LabelSaver] = None
+_shared_lock = threading.Lock()
+
+
+def get_label_saver() -> LabelSaver:
+    """图形界面共用的后台标签写入器"""
+    global _shared_saver
+    with _shared_lock:
+        if _shared_saver is None:
+            _shared_saver = LabelSaver()
+        return _shared_saver
@@ -0,0 +1,312 @@
+"""数据集标签库（可选）
+
+    python -m src.label_store import <数据集文件夹>   # 由 labels/*.txt 创建标签库
+    python -m src.label_store export <数据集文件夹>   # 导出为 labels/*.txt
+    python -m src.label_store stats <数据集文件夹>
+
+标签库是数据集文件夹下的单个 SQLite 文件 labels.sqlite3，每张图片一行
+（图片名, 修改时间, 标签数, 归一化坐标 (K,7,2)）。存在时图形界面和批量检测
+都直接读写标签库，不再逐个打开 labels/ 下的txt文件；坐标按txt格式的精度
+（6位小数）保存，与txt格式可无损互相转换。
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+import numpy as np
+from .label_io import read_label_file, read_label_folder, write_label_file
+
+LABEL_STORE_FILE_NAME = "labels.sqlite3"
+
+# txt格式保存6位小数，标签库按同样精度保存
+_DECIMALS = 6
+
+
+def label_store_path(label_folder: str) -> str:
+    """标签文件夹对应的标签库路径（与 labels/ 同在数据集文件夹下）"""
+    return os.path.join(os.path.dirname(os.path.abspath(label_folder)), LABEL_STORE_FILE_NAME)
+
+
+def _label_name(path: str) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+class LabelStore:
+    """单文件标签库
+
+    按图片名（不含扩展名，与txt文件名相同）索引，单张查询只需一次主键查找；
+    read_all 一次读出全部标签。每个线程使用独立连接，多个进程可同时读写（WAL模式）。
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS labels ("
+                "name TEXT PRIMARY KEY, mtime INTEGER NOT NULL, "
+                "count INTEGER NOT NULL, points BLOB NOT NULL) WITHOUT ROWID"
+            )
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _encode(points: np.ndarray) -> Tuple[int, bytes]:
+        points = np.round(np.asarray(points, dtype=np.float64).reshape(-1, 7, 2), _DECIMALS)
+        return len(points), points.tobytes()
+
+    @staticmethod
+    def _decode(blob: bytes) -> np.ndarray:
+        return np.frombuffer(blob, dtype=np.float64).reshape(-1, 7, 2)
+
+    def get(self, name: str) -> Optional[np.ndarray]:
+        """一张图片的归一化坐标 (K,7,2)，没有标签时返回 None"""
+        try:
+            row = self._connection().execute(
+                "SELECT points FROM labels WHERE name = ?", (name,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Label store error: {e}")
+            return None
+        return self._decode(row[0]) if row is not None else None
+
+    def contains(self, name: str) -> bool:
+        try:
+            return self._connection().execute(
+                "SELECT 1 FROM labels WHERE name = ?", (name,)
+            ).fetchone() is not None
+        except sqlite3.Error as e:
+            print(f"Label store error: {e}")
+            return False
+
+    def put_many(self, items: Iterable[Tuple[str, np.ndarray]]) -> bool:
+        """在一个事务中写入多张图片的标签（没有标签的图片删除对应行），失败返回 False"""
+        now = time.time_ns()
+        rows = []
+        empty = []
+        for name, points in items:
+            count, blob = self._encode(points)
+            if count:
+                rows.append((name, now, count, blob))
+            else:
+                empty.append((name,))
+        if not rows and not empty:
+            return True
+        try:
+            conn = self._connection()
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO labels VALUES (?, ?, ?, ?)", rows)
+                conn.executemany("DELETE FROM labels WHERE name = ?", empty)
+        except sqlite3.Error as e:
+            print(f"Label store error: {e}")
+            return False
+        return True
+
+    def put(self, name: str, points: np.ndarray) -> bool:
+        return self.put_many([(name, points)])
+
+    def delete(self, name: str) -> bool:
+        return self.put_many([(name, np.empty((0, 7, 2)))])
+
+    def names(self) -> Set[str]:
+        """有标签的图片名集合"""
+        try:
+            rows = self._connection().execute("SELECT name FROM labels").fetchall()
+        except sqlite3.Error as e:
+            print(f"Label store error: {e}")
+            return set()
+        return {name for name, in rows}
+
+    def counts(self) -> Dict[str, int]:
+        """图片名 -> 标签数"""
+        try:
+            return dict(self._connection().execute("SELECT name, count FROM labels").fetchall())
+        except sqlite3.Error as e:
+            print(f"Label store error: {e}")
+            return {}
+
+    def mtimes(self, names: Optional[Sequence[str]] = None, chunk_size: int = 500) -> Dict[str, int]:
+        """图片名 -> 最后写入时间（ns），相当于txt文件的 mtime；names 为 None 时返回全部"""
+        try:
+            conn = self._connection()
+            if names is None:
+                return dict(conn.execute("SELECT name, mtime FROM labels").fetchall())
+            result = {}
+            for start in range(0, len(names), chunk_size):
+                chunk = list(names[start:start + chunk_size])
+                placeholders = ",".join("?" * len(chunk))
+                result.update(conn.execute(
+                    f"SELECT name, mtime FROM labels WHERE name IN ({placeholders})", chunk
+                ).fetchall())
+            return result
+        except sqlite3.Error as e:
+            print(f"Label store error: {e}")
+            return {}
+
+    def _read_rows(self) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """按图片名排序读出全部行：(图片名, 每张图片的标签数, 坐标 (N,7,2) float64)"""
+        try:
+            rows = self._connection().execute(
+                "SELECT name, count, points FROM labels ORDER BY name"
+            ).fetchall()
+        except sqlite3.Error as e:
+            print(f"Label store error: {e}")
+            rows = []
+        names = [row[0] for row in rows]
+        counts = np.fromiter((row[1] for row in rows), dtype=np.int64, count=len(rows))
+        return names, counts, self._decode(b"".join(row[2] for row in rows))
+
+    def read_all(self) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """一次读出全部标签，返回 (图片名, 坐标 (N,7,2) float32, 每个标签所属图片在图片名中的下标)"""
+        names, counts, points = self._read_rows()
+        image_index = np.repeat(np.arange(len(names), dtype=np.int32), counts)
+        return names, points.astype(np.float32), image_index
+
+    def stats(self) -> Tuple[int, int]:
+        """(有标签的图片数, 标签总数)"""
+        try:
+            images, labels = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(count), 0) FROM labels"
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Label store error: {e}")
+            return 0, 0
+        return images, labels
+
+    def import_txt(self, label_folder: str, workers: int = 8, chunk_size: int = 1000) -> int:
+        """导入标签文件夹中的全部txt（多线程读取，按块写入），返回导入的文件数
+
+        没有txt文件时同样创建标签库，之后的标注直接写入标签库。
+        """
+        self._connection()
+        try:
+            with os.scandir(label_folder) as entries:
+                names = [entry.name[:-4] for entry in entries if entry.name.endswith('.txt')]
+        except FileNotFoundError:
+            return 0
+
+        imported = 0
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            for start in range(0, len(names), chunk_size):
+                chunk = names[start:start + chunk_size]
+                paths = [os.path.join(label_folder, f"{name}.txt") for name in chunk]
+                items = [(name, points) for name, points in zip(chunk, pool.map(read_label_file, paths))
+                         if points is not None]
+                self.put_many(items)
+                imported += len(items)
+        return imported
+
+    def export_txt(self, label_folder: str) -> int:
+        """把全部标签写成 labels/<图片名>.txt，返回写入的文件数"""
+        os.makedirs(label_folder, exist_ok=True)
+        names, counts, points = self._read_rows()
+        bounds = np.concatenate(([0], np.cumsum(counts)))
+        exported = 0
+        for i, name in enumerate(names):
+            try:
+                write_label_file(os.path.join(label_folder, f"{name}.txt"),
+                                 points[bounds[i]:bounds[i + 1]])
+                exported += 1
+            except OSError as e:
+                print(f"Error saving txt file: {e}")
+        return exported
+
+
+_stores: Dict[str, LabelStore] = {}
+_stores_lock = threading.Lock()
+
+
+def open_label_store(label_folder: str, create: bool = False) -> Optional[LabelStore]:
+    """数据集的标签库：标签库文件不存在且 create 为 False 时返回 None（使用txt文件）"""
+    if not label_folder:
+        return None
+    path = label_store_path(label_folder)
+    if not create and not os.path.exists(path):
+        return None
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = LabelStore(path)
+        return store
+
+
+def load_all_labels(label_folder: str, workers: int = 8) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """一次读出数据集的全部标签（标签库或 labels/*.txt），供统计、导出训练数据和评估使用
+
+    返回 (有标签的图片名, 归一化坐标 (N,7,2) float32, 每个标签所属图片在图片名中的下标 int32)。
+    不依赖Qt，也不需要解码图片。
+    """
+    store = open_label_store(label_folder)
+    if store is not None:
+        return store.read_all()
+    return read_label_folder(label_folder, workers)
+
+
+class LabelWriter:
+    """批量检测写入标签：数据集有标签库时一批写入一个事务，否则逐个写txt文件"""
+
+    def __init__(self, label_folder: str):
+        self.label_folder = label_folder
+        self.store = open_label_store(label_folder)
+        if self.store is None:
+            os.makedirs(label_folder, exist_ok=True)
+
+    def write_many(self, items: Sequence[Tuple[str, np.ndarray]]) -> List[str]:
+        """写入 (图片路径, 归一化坐标) 列表，返回成功写入的图片路径"""
+        if self.store is not None:
+            if not self.store.put_many((_label_name(path), points) for path, points in items):
+                return []
+            return [path for path, _ in items]
+
+        written = []
+        for path, points in items:
+            try:
+                write_label_file(os.path.join(self.label_folder, f"{_label_name(path)}.txt"), points)
+                written.append(path)
+            except OSError as e:
+                print(f"Error saving txt file: {e}")
+        return written
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(prog="python -m src.label_store",
+                                     description="数据集标签库与 labels/*.txt 互相转换")
+    parser.add_argument("command", choices=("import", "export", "stats"),
+                        help="import: 由txt创建或更新标签库；export: 导出为txt；stats: 统计（标签库或txt）")
+    parser.add_argument("dataset", help="数据集文件夹（包含 labels/）")
+    parser.add_argument("--workers", type=int, default=8, help="导入和统计时读取txt的线程数（默认 8）")
+    args = parser.parse_args(argv)
+
+    label_folder = os.path.join(args.dataset, "labels")
+    start = time.monotonic()
+    if args.command == "import":
+        os.makedirs(args.dataset, exist_ok=True)
+        count = open_label_store(label_folder, create=True).import_txt(label_folder, args.workers)
+        print(f"已导入 {count} 个标签文件到 {label_store_path(label_folder)}")
+    elif args.command == "stats":
+        # 没有标签库时直接统计 labels/*.txt
+        names, points, _ = load_all_labels(label_folder, args.workers)
+        print(f"已标注图片: {len(names)}，标签: {len(points)}")
+    else:
+        store = open_label_store(label_folder)
+        if store is None:
+            print(f"Error: 没有标签库: {label_store_path(label_folder)}")
+            return 1
+        print(f"已导出 {store.export_txt(label_folder)} 个标签文件到 {label_folder}")
+    print(f"用时 {time.monotonic() - start:.1f} 秒")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,20 @@
 import os
-from typing import List, Optional
+from typing import List, Optional, Set
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                             QPushButton, QListWidget, QListWidgetItem, QFileDialog,
                             QCheckBox, QSlider, QLabel, QMessageBox, QApplication,
-                            QGroupBox, QProgressBar, QTextEdit, QSplitter, QFrame)
-from PyQt5.QtCore import Qt, pyqtSlot, QTimer
+                            QGroupBox, QProgressBar, QTextEdit, QSplitter, QFrame,
+                            QListView, QSpinBox, QComboBox)
+from PyQt5.QtCore import Qt, pyqtSlot, QTimer, QModelIndex, QThread
 from PyQt5.QtGui import QKeyEvent, QFont, QPalette, QColor
 from .draw_on_pic import DrawOnPic
-from .index_list import IndexQListWidgetItem
+from .file_list_model import ImageListModel, STATUS_INCOMPLETE, STATUS_UNLABELED
 from .startup_dialog import StartupDialog
+from .prefetcher import ImagePrefetcher
+from .label_saver import get_label_saver
+from .workers import FolderScanThread, LabelIndexThread, ModelLoadThread, SmartDetectThread
+from .manifest import DETECT_ALL, DETECT_MISSING, DETECT_STALE
+from .quantization import QUANT_DYNAMIC, QUANT_STATIC, DEFAULT_CALIBRATION_SAMPLES, sample_paths
 
 class MainWindow(QMainWindow):
     """主窗口类"""
@@ -22,6 +28,21 @@ class MainWindow(QMainWindow):
         self.has_images = False
         self.has_model = False
         self.initialization_success = False
+        self.recursive_scan = False
+        # 扫描期间用户是否切换过图片（决定排序后保持当前图片还是回到第一张）
+        self.user_navigated = False
+        self.scan_thread: Optional[FolderScanThread] = None
+        self.detect_thread: Optional[SmartDetectThread] = None
+        self.detect_error = ""
+        self.model_thread: Optional[ModelLoadThread] = None
+        self.index_thread: Optional[LabelIndexThread] = None
+        # 每次开始加载模型、建立索引时加一，已被取代的线程之后发来的结果被忽略
+        self.model_generation = 0
+        self.index_generation = 0
+        # 仍在运行的模型加载和建立索引线程（包括已被取代的），关闭窗口时等待
+        self.background_threads: Set[QThread] = set()
+        self.model_loading = False
+        self.prefetcher = ImagePrefetcher()
         
         try:
             # 显示启动对话框
@@ -55,13 +76,10 @@ class MainWindow(QMainWindow):
             self.update_ui_state()
             print("UI状态更新完成")
             
-            # 显示窗口
+            # 显示窗口（第一张图片在首批扫描结果到达后加载）
             self.show()
             print("窗口显示完成")
             
-            # 使用QTimer延迟加载第一张图片
-            QTimer.singleShot(100, self.load_first_image)
-            
             self.initialization_success = True
             print("主窗口初始化成功")
             
@@ -71,17 +89,6 @@ class MainWindow(QMainWindow):
             traceback.print_exc()
             self.initialization_success = False
 
-    def load_first_image(self):
-        """延迟加载第一张图片"""
-        if self.has_images and self.file_list.count() > 0:
-            first_item = self.file_list.item(0)
-            if first_item:
-                print("正在加载第一张图片...")
-                self.image_label.set_current_file(first_item.text())
-                self.refresh_label_list()
-                # 强制更新显示
-                self.image_label.update()
-
     def show_startup_dialog(self) -> bool:
         """显示启动对话框"""
         dialog = StartupDialog(self)
@@ -90,6 +97,7 @@ class MainWindow(QMainWindow):
             self.current_folder = config['image_folder']
             self.dataset_folder = config['dataset_folder']
             self.model_file = config['model_file']
+            self.recursive_scan = config.get('recursive', False)
             self.has_model = bool(self.model_file)
             
             # 设置自动保存
@@ -99,50 +107,143 @@ class MainWindow(QMainWindow):
             return True
         return False
     def load_images_from_folder(self):
-        """从文件夹加载图片"""
+        """从文件夹加载图片 - 后台流式扫描，结果分块加入列表"""
         if not self.current_folder:
             return
-            
-        # 支持的图片格式
-        image_extensions = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif']
+        
+        self.stop_folder_scan()
+        self.image_label.close_current_file()
         
         # 清空列表
-        self.file_list.clear()
+        self.file_model.set_paths(self.current_folder, [])
+        self.file_model.set_label_dir(os.path.join(self.dataset_folder, "labels"))
+        self.prefetcher.set_paths(self.file_model.paths)
+        self.start_label_index()
+        self.has_images = False
+        self.user_navigated = False
         
-        # 获取图片文件
-        image_files = []
-        try:
-            for file_name in os.listdir(self.current_folder):
-                if any(file_name.lower().endswith(ext) for ext in image_extensions):
-                    image_files.append(os.path.join(self.current_folder, file_name))
-        except Exception as e:
-            QMessageBox.warning(self, "错误", f"无法读取文件夹：{str(e)}")
-            return
+        # 设置标签文件夹 - 使用数据集文件夹而不是图片文件夹
+        self.image_label.set_label_path(self.dataset_folder)
         
-        # 排序并添加到列表
-        image_files.sort()
-        for idx, file_path in enumerate(image_files):
-            item = IndexQListWidgetItem(file_path, idx)
-            self.file_list.addItem(item)
+        # 如果有模型文件，在后台加载它（不阻塞界面）
+        if self.model_file:
+            self.start_model_load(self.model_file)
+        
+        self.scan_thread = FolderScanThread(self.current_folder, self.recursive_scan, self)
+        self.scan_thread.chunk_ready.connect(self.on_scan_chunk)
+        self.scan_thread.scan_finished.connect(self.on_scan_finished)
+        self.scan_thread.scan_failed.connect(self.on_scan_failed)
+        self.scan_thread.start()
+        self.status_label.setText("正在扫描图片文件夹...")
+    
+    def start_background_thread(self, thread: QThread):
+        """启动模型加载或建立索引的线程，结束后自动释放"""
+        self.background_threads.add(thread)
+        thread.finished.connect(self.on_background_thread_finished)
+        thread.start()
+    
+    @pyqtSlot()
+    def on_background_thread_finished(self):
+        thread = self.sender()
+        self.background_threads.discard(thread)
+        thread.deleteLater()
+    
+    def start_label_index(self):
+        """后台建立标签索引，建好后文件列表显示全部图片的标注状态和进度"""
+        self.stop_label_index()
+        thread = LabelIndexThread(os.path.join(self.dataset_folder, "labels"), parent=self)
+        generation = self.index_generation
+        thread.index_ready.connect(lambda index: self.on_label_index_ready(generation, index))
+        self.index_thread = thread
+        self.update_label_progress()
+        self.start_background_thread(thread)
+    
+    def stop_label_index(self):
+        """取消正在建立的索引（切换文件夹时）：不等待扫描结束，之后到达的结果被忽略"""
+        self.index_generation += 1
+        if self.index_thread is not None:
+            self.index_thread.cancel()
+            self.index_thread.index_ready.disconnect()
+            self.index_thread = None
+    
+    def on_label_index_ready(self, generation: int, index):
+        """标签索引建好（忽略已被新文件夹取代的线程）"""
+        if generation != self.index_generation:
+            return
+        self.index_thread = None
+        self.file_model.set_label_index(index)
+        self.update_label_progress()
+    
+    def update_label_progress(self):
+        """更新数据集标注进度"""
+        counts = self.file_model.status_counts()
+        if counts is None:
+            self.dataset_progress_label.setText("标注进度: 统计中..." if self.index_thread is not None else "标注进度: -")
+            return
+        labeled, incomplete, total = counts
+        percent = labeled * 100.0 / total if total else 0.0
+        text = f"标注进度: {labeled}/{total} ({percent:.1f}%)"
+        if incomplete:
+            text += f"，不完整 {incomplete}"
+        self.dataset_progress_label.setText(text)
+    
+    def jump_to_next(self, status: int):
+        """跳到下一张未标注（或标注不完整）的图片"""
+        if self.file_model.label_index is None:
+            self.status_label.setText("标签索引正在建立，请稍候...")
+            return
+        row = self.file_model.find_next(status, self.current_row())
+        if row < 0:
+            self.status_label.setText("没有未标注的图片" if status == STATUS_UNLABELED else "没有标注不完整的图片")
+            return
+        self.set_current_row(row)
+    
+    def stop_folder_scan(self):
+        """停止正在进行的扫描"""
+        if self.scan_thread is not None:
+            self.scan_thread.chunk_ready.disconnect()
+            self.scan_thread.scan_finished.disconnect()
+            self.scan_thread.scan_failed.disconnect()
+            self.scan_thread.cancel()
+            self.scan_thread.wait()
+            self.scan_thread = None
+    
+    @pyqtSlot(list)
+    def on_scan_chunk(self, names):
+        """收到一批扫描结果"""
+        self.file_model.append_paths(names)
+        total = self.file_model.rowCount()
+        self.file_slider.setMinimum(1)
+        self.file_slider.setMaximum(total)
         
-        self.has_images = len(image_files) > 0
+        if not self.has_images:
+            # 第一批结果到达即可开始标注
+            self.has_images = True
+            self.update_ui_state()
+            self.set_current_row(0)
+    
+    @pyqtSlot(int, bool)
+    def on_scan_finished(self, count, already_sorted):
+        """扫描完成"""
+        self.scan_thread = None
+        if count == 0:
+            self.update_ui_state()
+            QMessageBox.warning(self, "警告", "所选文件夹中没有找到支持的图片文件！")
+            return
         
-        # 设置滑块范围
-        if image_files:
-            self.file_slider.setMinimum(1)
-            self.file_slider.setMaximum(len(image_files))
-            self.file_slider.setValue(1)
-            self.file_list.setCurrentRow(0)
-            
-            # 设置标签文件夹 - 使用数据集文件夹而不是图片文件夹
-            self.image_label.set_label_path(self.dataset_folder)
-            
-            # 如果有模型文件，加载它
-            if self.model_file:
-                self.image_label.set_model_file(self.model_file)
-            
-            # 不在这里加载第一张图片，改为在延迟函数中加载
-
+        if not already_sorted:
+            # 流式结果按目录顺序到达，完成后统一排序；
+            # 用户已切换过图片时保持当前图片不变，否则回到排序后的第一张
+            new_row = self.file_model.sort_paths(self.current_row())
+            self.prefetcher.set_paths(self.file_model.paths)
+            self.set_current_row(new_row if self.user_navigated else 0)
+        print(f"图片扫描完成，共 {count} 张")
+    
+    @pyqtSlot(str)
+    def on_scan_failed(self, message):
+        """扫描失败"""
+        self.scan_thread = None
+        QMessageBox.warning(self, "错误", f"无法读取文件夹：{message}")
     
     def update_ui_state(self):
         """更新UI状态"""
@@ -156,13 +257,21 @@ class MainWindow(QMainWindow):
         
         # 更新智能检测按钮状态
         self.smart_button.setEnabled(self.has_images and self.has_model)
-        self.smart_all_button.setEnabled(self.has_images and self.has_model)
+        self.smart_all_button.setEnabled(self.has_images and self.has_model and self.detect_thread is None)
+        self.load_model_button.setEnabled(not self.model_loading)
+        self.precision_combo.setEnabled(not self.model_loading)
+        self.tune_button.setEnabled(self.has_model and not self.model_loading)
         
         # 更新图像标签状态
         self.image_label.set_enabled(self.has_images)
         
         # 更新按钮文本提示
-        if not self.has_model:
+        if self.model_loading:
+            self.smart_button.setText("⏳ 智能检测 (模型加载中)")
+            self.smart_all_button.setText("⏳ 全部智能检测 (模型加载中)")
+            self.smart_button.setToolTip("模型正在后台加载和预热，完成后即可使用")
+            self.smart_all_button.setToolTip("模型正在后台加载和预热，完成后即可使用")
+        elif not self.has_model:
             self.smart_button.setText("🔍 智能检测 (需要模型)")
             self.smart_all_button.setText("🚀 全部智能检测 (需要模型)")
             self.smart_button.setToolTip("请先加载模型文件才能使用智能检测功能")
@@ -182,11 +291,13 @@ class MainWindow(QMainWindow):
             self.add_label_button.setText("✏️ 添加标签 (Space)")
             self.save_button.setText("💾 保存")
             self.add_label_button.setToolTip("开始标注新的七边形")
-            self.save_button.setToolTip("保存当前标注到文件")
+            self.save_button.setToolTip("保存所有修改过的标注（未修改的图片不会重写）")
         
         # 更新状态显示
         if not self.has_images:
             self.status_label.setText("请选择包含图片的文件夹")
+        elif self.model_loading:
+            self.status_label.setText("图片已加载，模型正在后台加载...")
         elif not self.has_model:
             self.status_label.setText("图片已加载，智能检测功能不可用（未加载模型）")
         else:
@@ -271,7 +382,15 @@ class MainWindow(QMainWindow):
         slider_layout.addWidget(self.file_label)
         nav_layout.addLayout(slider_layout)
         
-        self.file_list = QListWidget()
+        self.dataset_progress_label = QLabel("标注进度: -")
+        self.dataset_progress_label.setToolTip("✅ 已标注  ⚠️ 标注不完整  ⬜ 未标注\nN - 下一张未标注，M - 下一张不完整")
+        nav_layout.addWidget(self.dataset_progress_label)
+        
+        # 虚拟化列表：只为可见行生成数据
+        self.file_model = ImageListModel(self)
+        self.file_list = QListView()
+        self.file_list.setUniformItemSizes(True)
+        self.file_list.setModel(self.file_model)
         self.file_list.setMaximumHeight(200)
         nav_layout.addWidget(self.file_list)
         
@@ -293,6 +412,63 @@ class MainWindow(QMainWindow):
         self.smart_all_button.setMinimumHeight(35)
         annotation_layout.addWidget(self.smart_all_button)
         
+        # 批量检测控制（运行时显示）
+        detect_control_layout = QHBoxLayout()
+        self.pause_detect_button = QPushButton("⏸️ 暂停")
+        self.pause_detect_button.setVisible(False)
+        self.pause_detect_button.clicked.connect(self.on_pause_detect_clicked)
+        self.cancel_detect_button = QPushButton("⏹️ 取消")
+        self.cancel_detect_button.setVisible(False)
+        self.cancel_detect_button.clicked.connect(self.on_cancel_detect_clicked)
+        detect_control_layout.addWidget(self.pause_detect_button)
+        detect_control_layout.addWidget(self.cancel_detect_button)
+        annotation_layout.addLayout(detect_control_layout)
+        
+        # 批量检测进程数（1 表示在后台线程中使用当前模型）
+        workers_layout = QHBoxLayout()
+        workers_layout.addWidget(QLabel("批量检测进程数:"))
+        self.detect_workers_spinbox = QSpinBox()
+        self.detect_workers_spinbox.setRange(1, os.cpu_count() or 1)
+        self.detect_workers_spinbox.setValue(1)
+        self.detect_workers_spinbox.setToolTip("多进程批量检测，每个进程独立加载模型，可占满全部CPU核心")
+        workers_layout.addWidget(self.detect_workers_spinbox)
+        annotation_layout.addLayout(workers_layout)
+        
+        # 光流跟踪（连续视频帧只对关键帧运行模型）
+        track_layout = QHBoxLayout()
+        track_layout.addWidget(QLabel("光流跟踪间隔:"))
+        self.keyframe_spinbox = QSpinBox()
+        self.keyframe_spinbox.setRange(0, 120)
+        self.keyframe_spinbox.setValue(0)
+        self.keyframe_spinbox.setSpecialValueText("关闭")
+        self.keyframe_spinbox.setSuffix(" 帧")
+        self.keyframe_spinbox.setToolTip(
+            "图片为连续视频帧时，每 N 帧用模型检测一次，其余帧用光流跟踪上一帧的点，\n"
+            "跟踪误差过大或换到另一个文件夹时提前检测。0 表示逐帧检测"
+        )
+        track_layout.addWidget(self.keyframe_spinbox)
+        annotation_layout.addLayout(track_layout)
+        
+        # 推理精度（INT8 量化模型更快，但关键点会有少量误差）
+        precision_layout = QHBoxLayout()
+        precision_layout.addWidget(QLabel("推理精度:"))
+        self.precision_combo = QComboBox()
+        self.precision_combo.addItem("FP32", None)
+        self.precision_combo.addItem("INT8 动态", QUANT_DYNAMIC)
+        self.precision_combo.addItem("INT8 静态", QUANT_STATIC)
+        self.precision_combo.setToolTip(
+            "INT8 量化推理速度更快，静态量化用当前文件夹的抽样图片校准；\n"
+            "精度对比: python -m src.quantization --model <模型> --images <图片文件夹>"
+        )
+        precision_layout.addWidget(self.precision_combo)
+        self.tune_button = QPushButton("调优")
+        self.tune_button.setToolTip(
+            "在本机重新调优推理配置（线程数、执行模式、内存设置、批次大小），\n"
+            "结果按模型和CPU型号保存，需要几分钟"
+        )
+        precision_layout.addWidget(self.tune_button)
+        annotation_layout.addLayout(precision_layout)
+        
         self.save_button = QPushButton("💾 保存")
         self.save_button.setMinimumHeight(35)
         annotation_layout.addWidget(self.save_button)
@@ -333,7 +509,9 @@ class MainWindow(QMainWindow):
             "Space - 添加标签\n"
             "S - 智能检测\n"
             "Q - 上一张图片\n"
-            "E - 下一张图片\n\n"
+            "E - 下一张图片\n"
+            "N - 下一张未标注图片\n"
+            "M - 下一张标注不完整的图片\n\n"
             "鼠标操作：\n"
             "左键 - 添加点/拖拽点\n"
             "右键 - 拖拽图像\n"
@@ -449,7 +627,7 @@ class MainWindow(QMainWindow):
             color: #666666;
         }
         
-        QListWidget {
+        QListView {
             background-color: #3c3c3c;
             border: 2px solid #555555;
             border-radius: 5px;
@@ -457,16 +635,16 @@ class MainWindow(QMainWindow):
             color: #ffffff;
         }
         
-        QListWidget::item {
+        QListView::item {
             padding: 5px;
             border-bottom: 1px solid #555555;
         }
         
-        QListWidget::item:selected {
+        QListView::item:selected {
             background-color: #4a90e2;
         }
         
-        QListWidget::item:hover {
+        QListView::item:hover {
             background-color: #4a4a4a;
         }
         
@@ -550,7 +728,7 @@ class MainWindow(QMainWindow):
         # 更新文件夹和模型信息
         if self.current_folder:
             folder_name = os.path.basename(self.current_folder)
-            image_count = self.file_list.count()
+            image_count = self.file_model.rowCount()
             self.image_folder_info_label.setText(f"图片文件夹: {folder_name} ({image_count} 张图片)")
             self.image_folder_info_label.setStyleSheet("color: #48dbfb;")
         else:
@@ -575,6 +753,10 @@ class MainWindow(QMainWindow):
     
     def reconfigure(self):
         """重新配置"""
+        if self.detect_thread is not None:
+            QMessageBox.warning(self, "警告", "批量智能检测正在进行，请先取消或等待完成！")
+            return
+        
         reply = QMessageBox.question(
             self, "重新配置", 
             "重新配置将丢失当前未保存的标注，是否继续？",
@@ -593,14 +775,60 @@ class MainWindow(QMainWindow):
         )
         
         if file_path:
-            success = self.image_label.set_model_file(file_path)
-            if success:
-                self.model_file = file_path
-                self.has_model = True
-                self.update_ui_state()
-                QMessageBox.information(self, "成功", "模型加载成功！")
-            else:
-                QMessageBox.warning(self, "错误", "模型加载失败，请检查文件格式。")
+            if self.detect_thread is not None:
+                QMessageBox.warning(self, "警告", "批量智能检测正在进行，请先取消或等待完成！")
+                return
+            self.start_model_load(file_path, notify=True)
+    
+    def start_model_load(self, model_path: str, notify: bool = False, retune: bool = False):
+        """在后台线程中加载模型并预热，完成前智能检测按钮显示加载状态
+        
+        notify 为 True 时加载完成后弹窗提示结果；失败时保留原来的模型文件设置。
+        正在进行的加载被取消，不等待它结束（创建推理会话可能需要较长时间）。
+        retune 为 True 时先在本机重新调优推理配置。
+        """
+        self.stop_model_load()
+        
+        self.model_loading = True
+        self.has_model = False
+        thread = ModelLoadThread(self.image_label.model, model_path, self, retune)
+        generation = self.model_generation
+        thread.model_loaded.connect(
+            lambda success: self.on_model_loaded(generation, thread, model_path, success, notify))
+        self.model_thread = thread
+        self.start_background_thread(thread)
+        self.update_ui_state()
+    
+    def stop_model_load(self):
+        """取消正在进行的模型加载：线程在后台自行结束，之后到达的结果被忽略"""
+        self.model_generation += 1
+        if self.model_thread is not None:
+            self.model_thread.cancel()
+            self.model_thread.model_loaded.disconnect()
+            self.model_thread = None
+    
+    def on_model_loaded(self, generation: int, thread: ModelLoadThread, model_path: str,
+                        success: bool, notify: bool):
+        """后台模型加载完成"""
+        # 之后又开始了新的加载时，忽略旧线程的结果
+        if generation != self.model_generation:
+            return
+        self.model_thread = None
+        self.model_loading = False
+        self.has_model = success
+        if success:
+            # 换上新加载的模型实例
+            self.image_label.model = thread.model
+            self.model_file = model_path
+        self.update_precision_combo()
+        self.update_ui_state()
+        
+        if not success:
+            QMessageBox.warning(self, "错误", "模型加载失败，请检查文件格式。")
+        elif thread.quantization and thread.model.quantization != thread.quantization:
+            QMessageBox.warning(self, "警告", "INT8 量化失败，已使用 FP32 模型。")
+        elif notify:
+            QMessageBox.information(self, "成功", "模型加载成功！")
     
     def connect_signals(self):
         """连接信号和槽"""
@@ -611,12 +839,14 @@ class MainWindow(QMainWindow):
         self.save_button.clicked.connect(self.on_save_clicked)
         self.smart_button.clicked.connect(self.on_smart_detect_clicked)
         self.smart_all_button.clicked.connect(self.on_smart_all_clicked)
+        self.precision_combo.activated.connect(self.on_precision_changed)
+        self.tune_button.clicked.connect(self.on_tune_clicked)
         
         # 复选框信号
         self.auto_save_checkbox.clicked.connect(self.image_label.auto_save_toggle)
         
         # 列表信号
-        self.file_list.currentItemChanged.connect(self.on_file_list_changed)
+        self.file_list.selectionModel().currentRowChanged.connect(self.on_file_list_changed)
         self.label_now_list.itemClicked.connect(self.on_label_now_clicked)
         
         # 滑块信号
@@ -625,6 +855,45 @@ class MainWindow(QMainWindow):
         
         # 图像标签信号
         self.image_label.doubleClicked.connect(self.refresh_label_list)
+        
+        # 标注状态变化时更新进度
+        self.file_model.dataChanged.connect(self.update_label_progress)
+        self.file_model.modelReset.connect(self.update_label_progress)
+        self.file_model.rowsInserted.connect(self.update_label_progress)
+    
+    def on_precision_changed(self, index: int):
+        """切换推理精度，重新加载模型"""
+        model = self.image_label.model
+        quantization = self.precision_combo.itemData(index)
+        if self.detect_thread is not None:
+            QMessageBox.warning(self, "警告", "批量智能检测正在进行，请先取消或等待完成！")
+            self.update_precision_combo()
+            return
+        if quantization == model.quantization:
+            return
+        
+        model.quantization = quantization
+        model.calibration_paths = sample_paths(self.file_model.paths, DEFAULT_CALIBRATION_SAMPLES)
+        if self.has_model:
+            self.start_model_load(self.model_file)
+    
+    def on_tune_clicked(self):
+        """在本机重新调优推理配置，完成后按新配置重新加载模型"""
+        if self.detect_thread is not None:
+            QMessageBox.warning(self, "警告", "批量智能检测正在进行，请先取消或等待完成！")
+            return
+        reply = QMessageBox.question(
+            self, "调优推理配置",
+            "将依次测试多种推理配置并保存最快的一种，需要几分钟，期间智能检测不可用。\n是否继续？",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply == QMessageBox.Yes:
+            self.start_model_load(self.model_file, notify=True, retune=True)
+    
+    def update_precision_combo(self):
+        """显示模型实际使用的推理精度（量化失败时已退回 FP32）"""
+        self.precision_combo.setCurrentIndex(
+            self.precision_combo.findData(self.image_label.model.quantization))
     
     def on_add_label_clicked(self):
         """添加标签按钮点击"""
@@ -636,7 +905,13 @@ class MainWindow(QMainWindow):
     def on_save_clicked(self):
         """保存按钮点击"""
         if self.has_images:
-            self.image_label.save_as_txt()
+            # 只写入修改过的图片（包括未开启自动保存时切换图片留下的修改）
+            saved = self.image_label.save_all()
+            if saved > 1:
+                self.file_model.invalidate_status()
+            else:
+                self.file_model.invalidate_status(self.current_row())
+            self.status_label.setText(f"已保存 {saved} 张图片的修改" if saved else "没有需要保存的修改")
         else:
             QMessageBox.warning(self, "警告", "请先选择包含图片的文件夹！")
     
@@ -649,18 +924,40 @@ class MainWindow(QMainWindow):
         else:
             self.image_label.smart_detect()
     
-    @pyqtSlot(QListWidgetItem, QListWidgetItem)
+    def current_row(self) -> int:
+        """当前图片索引（没有选中时为 -1）"""
+        return self.file_list.currentIndex().row()
+    
+    def set_current_row(self, row: int):
+        """按索引切换图片"""
+        if 0 <= row < self.file_model.rowCount():
+            self.file_list.setCurrentIndex(self.file_model.index(row))
+    
+    @pyqtSlot(QModelIndex, QModelIndex)
     def on_file_list_changed(self, current, previous):
         """文件列表改变"""
-        if current is None or not self.has_images:
+        if not current.isValid() or not self.has_images:
             return
         
-        self.image_label.set_current_file(current.text())
-        self.refresh_label_list()
+        row = current.row()
+        path = self.file_model.path(row)
+        
+        # 先更新预取窗口（取消过期任务），再解码当前图片
+        self.prefetcher.on_navigate(row)
+        
+        # 排序后重新选中同一张图片时不需要重新加载
+        if path != self.image_label.current_file:
+            self.image_label.set_current_file(path)
+            self.refresh_label_list()
+        
+        # 上一张图片可能刚被自动保存，刷新其标注状态；
+        # 从另一张图片切换过来说明是用户导航（首批结果的自动选中没有 previous）
+        if previous.isValid():
+            self.file_model.invalidate_status(previous.row())
+            self.user_navigated = True
         
         # 更新滑块
-        if isinstance(current, IndexQListWidgetItem):
-            self.file_slider.setValue(current.get_index() + 1)
+        self.file_slider.setValue(row + 1)
     
     @pyqtSlot(QListWidgetItem)
     def on_label_now_clicked(self, item):
@@ -675,8 +972,8 @@ class MainWindow(QMainWindow):
     def on_slider_changed(self, value):
         """滑块值改变"""
         self.file_label.setText(f"[{value}/{self.file_slider.maximum()}]")
-        if 1 <= value <= self.file_list.count() and self.has_images:
-            self.file_list.setCurrentRow(value - 1)
+        if 1 <= value <= self.file_model.rowCount() and self.has_images:
+            self.set_current_row(value - 1)
     
     @pyqtSlot(int, int)
     def on_slider_range_changed(self, min_val, max_val):
@@ -695,28 +992,123 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "警告", "请先加载模型文件！")
             return
         
-        total = self.file_list.count()
+        total = self.file_model.rowCount()
         if total == 0:
             return
         
-        reply = QMessageBox.question(
-            self, "确认", 
-            f"将对 {total} 张图片进行智能检测，这可能需要一些时间。是否继续？",
-            QMessageBox.Yes | QMessageBox.No
+        # 选择检测范围：默认只检测尚未标注的图片，不覆盖已有（包括手动修正过的）标签
+        box = QMessageBox(self)
+        box.setWindowTitle("全部智能检测")
+        box.setIcon(QMessageBox.Question)
+        box.setText(f"共 {total} 张图片，请选择检测范围：")
+        box.setInformativeText(
+            "仅未标注：跳过已有标签的图片，中断后再次运行会从剩余图片继续。\n"
+            "含旧模型结果：另外重新检测由其他模型自动生成、且之后未修改过的标签。\n"
+            "全部覆盖：重新检测所有图片，覆盖已有标签。"
         )
+        missing_button = box.addButton("仅未标注", QMessageBox.AcceptRole)
+        stale_button = box.addButton("含旧模型结果", QMessageBox.AcceptRole)
+        all_button = box.addButton("全部覆盖", QMessageBox.DestructiveRole)
+        box.addButton("取消", QMessageBox.RejectRole)
+        box.setDefaultButton(missing_button)
+        box.exec_()
+        
+        modes = {missing_button: DETECT_MISSING, stale_button: DETECT_STALE, all_button: DETECT_ALL}
+        mode = modes.get(box.clickedButton())
+        if mode is None:
+            return
         
-        if reply == QMessageBox.Yes:
-            self.progress_bar.setVisible(True)
-            self.progress_bar.setMaximum(total)
-            
-            for i in range(total):
-                self.progress_bar.setValue(i)
-                self.file_list.setCurrentRow(i)
-                self.image_label.smart_detect()
-                QApplication.processEvents()
-            
-            self.progress_bar.setVisible(False)
-            QMessageBox.information(self, "完成", "全部智能检测完成！")
+        # 当前图片先保存，避免未保存的标注被当作未标注而被检测结果覆盖
+        # 未开启自动保存时记入未保存集合，检测结果写入后重新读取当前图片时保留这些修改
+        if self.image_label.current_file:
+            if self.image_label.auto_save:
+                self.image_label.save_all()
+            else:
+                self.image_label.all_label.stash()
+        # 排队中的保存先写完，检测范围按磁盘上的标签筛选
+        if not get_label_saver().flush():
+            QMessageBox.warning(self, "警告", "部分标签保存失败，这些图片可能会被重新检测！")
+        
+        # 在后台线程中批量检测，结果直接写入标签文件夹，不经过显示控件
+        self.detect_thread = SmartDetectThread(
+            self.image_label.model, self.file_model.paths.copy(), self.dataset_folder,
+            num_workers=self.detect_workers_spinbox.value(), mode=mode,
+            keyframe_interval=self.keyframe_spinbox.value(), parent=self
+        )
+        self.detect_thread.progress.connect(self.on_smart_all_progress)
+        self.detect_thread.labels_written.connect(self.on_smart_all_labels_written)
+        self.detect_thread.detect_failed.connect(self.on_smart_all_failed)
+        self.detect_thread.detect_finished.connect(self.on_smart_all_finished)
+        self.detect_error = ""
+        
+        self.progress_bar.setMaximum(total)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setFormat("%v/%m")
+        self.progress_bar.setVisible(True)
+        self.smart_all_button.setEnabled(False)
+        self.pause_detect_button.setText("⏸️ 暂停")
+        self.pause_detect_button.setVisible(True)
+        self.cancel_detect_button.setVisible(True)
+        self.detect_thread.start()
+    
+    @pyqtSlot(int, int, float)
+    def on_smart_all_progress(self, done, total, eta):
+        """批量检测进度（total 为筛选后需要检测的图片数）"""
+        self.progress_bar.setMaximum(max(total, 1))
+        self.progress_bar.setValue(done)
+        minutes, seconds = divmod(int(eta), 60)
+        self.progress_bar.setFormat(f"%v/%m  剩余 {minutes}:{seconds:02d}")
+    
+    @pyqtSlot(list)
+    def on_smart_all_labels_written(self, paths):
+        """批量检测写入了标签文件"""
+        # 当前显示的图片被重新检测时，从文件重新读取标签，避免自动保存覆盖结果
+        if self.image_label.current_file in paths:
+            self.image_label.reload_labels()
+            self.refresh_label_list()
+        self.file_model.update_names(os.path.splitext(os.path.basename(path))[0] for path in paths)
+    
+    @pyqtSlot(str)
+    def on_smart_all_failed(self, message):
+        """批量检测出错（随后会收到 detect_finished，在那里提示）"""
+        self.detect_error = message
+    
+    @pyqtSlot(int, int, bool)
+    def on_smart_all_finished(self, detected, processed, cancelled):
+        """批量检测结束"""
+        self.detect_thread = None
+        self.progress_bar.setVisible(False)
+        self.pause_detect_button.setVisible(False)
+        self.cancel_detect_button.setVisible(False)
+        self.update_ui_state()
+        
+        if self.detect_error:
+            QMessageBox.critical(self, "智能检测出错",
+                                 f"批量检测中途出错，已处理 {processed} 张图片，检测成功 {detected} 张。\n\n"
+                                 f"{self.detect_error}")
+            self.detect_error = ""
+        elif cancelled:
+            QMessageBox.information(self, "已取消", f"智能检测已取消，已处理 {processed} 张图片，检测成功 {detected} 张。")
+        elif processed == 0:
+            QMessageBox.information(self, "完成", "所有图片都已有标签，无需检测。")
+        else:
+            QMessageBox.information(self, "完成", f"全部智能检测完成！检测成功 {detected}/{processed} 张。")
+    
+    def on_pause_detect_clicked(self):
+        """暂停/继续批量检测"""
+        if self.detect_thread is None:
+            return
+        if self.detect_thread.is_paused():
+            self.detect_thread.resume()
+            self.pause_detect_button.setText("⏸️ 暂停")
+        else:
+            self.detect_thread.pause()
+            self.pause_detect_button.setText("▶️ 继续")
+    
+    def on_cancel_detect_clicked(self):
+        """取消批量检测"""
+        if self.detect_thread is not None:
+            self.detect_thread.cancel()
     
     def refresh_label_list(self):
         """刷新标签列表"""
@@ -733,14 +1125,18 @@ class MainWindow(QMainWindow):
             return
         
         key = event.key()
-        current_row = self.file_list.currentRow()
+        current_row = self.current_row()
         
         if key == Qt.Key_Q:  # 上一张图片
             if current_row > 0:
-                self.file_list.setCurrentRow(current_row - 1)
+                self.set_current_row(current_row - 1)
         elif key == Qt.Key_E:  # 下一张图片
-            if current_row < self.file_list.count() - 1:
-                self.file_list.setCurrentRow(current_row + 1)
+            if current_row < self.file_model.rowCount() - 1:
+                self.set_current_row(current_row + 1)
+        elif key == Qt.Key_N:  # 下一张未标注图片
+            self.jump_to_next(STATUS_UNLABELED)
+        elif key == Qt.Key_M:  # 下一张标注不完整的图片
+            self.jump_to_next(STATUS_INCOMPLETE)
         elif key == Qt.Key_S:  # 智能检测
             if self.has_model:
                 self.image_label.smart_detect()
@@ -749,8 +1145,59 @@ class MainWindow(QMainWindow):
         else:
             super().keyPressEvent(event)
     
+    def flush_labels(self) -> bool:
+        """等待后台保存全部写完；有保存失败时询问是否重试，返回是否可以继续关闭"""
+        saver = get_label_saver()
+        pending = saver.pending_count()
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            success = saver.flush()
+        finally:
+            QApplication.restoreOverrideCursor()
+        if success and pending:
+            print(f"已保存全部标签（{pending} 张图片）")
+        while not success:
+            reply = QMessageBox.critical(
+                self, "保存失败",
+                f"有 {saver.failed_count()} 张图片的标签未能保存（详见控制台输出）。\n"
+                "重试：再次写入；放弃：不保存直接退出；取消：返回继续标注。",
+                QMessageBox.Retry | QMessageBox.Abort | QMessageBox.Cancel,
+                QMessageBox.Retry
+            )
+            if reply == QMessageBox.Abort:
+                return True
+            if reply != QMessageBox.Retry:
+                return False
+            success = saver.flush()
+        return True
+    
     def closeEvent(self, event):
         """关闭事件"""
         if hasattr(self.image_label, 'auto_save') and self.image_label.auto_save:
-            self.image_label.save_as_txt()
+            self.image_label.save_all()
+        elif hasattr(self.image_label, 'all_label') and self.image_label.all_label.dirty_count():
+            reply = QMessageBox.question(
+                self, "未保存的修改",
+                f"有 {self.image_label.all_label.dirty_count()} 张图片的标注修改尚未保存，是否保存？",
+                QMessageBox.Save | QMessageBox.Discard | QMessageBox.Cancel,
+                QMessageBox.Save
+            )
+            if reply == QMessageBox.Cancel:
+                event.ignore()
+                return
+            if reply == QMessageBox.Save:
+                self.image_label.save_all()
+        if not self.flush_labels():
+            event.ignore()
+            return
+        self.stop_folder_scan()
+        self.stop_label_index()
+        self.stop_model_load()
+        # 退出前等待仍在运行的后台线程，避免销毁运行中的线程
+        for thread in list(self.background_threads):
+            thread.wait()
+        if self.detect_thread is not None:
+            self.detect_thread.cancel()
+            self.detect_thread.wait()
+        self.prefetcher.shutdown()
         super().closeEvent(event)
\ No newline at end of file
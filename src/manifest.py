@@ -0,0 +1,124 @@
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Sequence, Set, Tuple
+from .label_store import open_label_store
+
+MANIFEST_FILE_NAME = ".detect_manifest.sqlite3"
+
+# 批量检测范围
+DETECT_ALL = "all"          # 全部重新检测（覆盖已有标签）
+DETECT_MISSING = "missing"  # 只检测没有标签文件的图片
+DETECT_STALE = "stale"      # 另外重新检测旧模型自动生成、且之后未被修改的标签
+DETECT_MODES = (DETECT_ALL, DETECT_MISSING, DETECT_STALE)
+
+
+class DetectManifest:
+    """批量检测清单 - 记录哪些标签由哪个模型自动生成
+
+    保存在 <数据集文件夹>/.detect_manifest.sqlite3，每写入一批标签记录一次
+    （图片名, 模型哈希, 标签文件 mtime），中断后重新运行会跳过已写入的图片。
+    标签文件之后被手动保存过（mtime 变化）即视为人工标注，不会被重新检测覆盖。
+    数据集使用标签库时，以标签库中记录的写入时间代替标签文件的 mtime。
+    """
+
+    def __init__(self, dataset_folder: str):
+        self.dataset_folder = dataset_folder
+        self.label_folder = os.path.join(dataset_folder, "labels")
+        self.db_path = os.path.join(dataset_folder, MANIFEST_FILE_NAME)
+        self.store = open_label_store(self.label_folder)
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(self.dataset_folder, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS auto_labels ("
+                "name TEXT PRIMARY KEY, model TEXT NOT NULL, mtime INTEGER NOT NULL) WITHOUT ROWID"
+            )
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def label_name(image_path: str) -> str:
+        """图片对应的标签文件名（不含扩展名）"""
+        return os.path.splitext(os.path.basename(image_path))[0]
+
+    def label_names(self) -> Set[str]:
+        """已有标签文件的名称集合（一次目录遍历，不逐个 stat）"""
+        if self.store is not None:
+            return self.store.names()
+        names = set()
+        try:
+            with os.scandir(self.label_folder) as entries:
+                for entry in entries:
+                    if entry.name.endswith('.txt'):
+                        names.add(entry.name[:-4])
+        except FileNotFoundError:
+            pass
+        return names
+
+    def _label_mtimes(self, names: Sequence[str]) -> Dict[str, int]:
+        """标签的修改时间（只 stat 给出的这部分文件）"""
+        if self.store is not None:
+            return self.store.mtimes(names)
+        result = {}
+        for name in names:
+            try:
+                result[name] = os.stat(os.path.join(self.label_folder, f"{name}.txt")).st_mtime_ns
+            except OSError:
+                continue
+        return result
+
+    def auto_labels(self) -> Dict[str, Tuple[str, int]]:
+        """自动生成的标签：名称 -> (模型哈希, 写入时的 mtime_ns)"""
+        try:
+            rows = self._connection().execute("SELECT name, model, mtime FROM auto_labels").fetchall()
+        except sqlite3.Error as e:
+            print(f"Manifest error: {e}")
+            return {}
+        return {name: (model, mtime) for name, model, mtime in rows}
+
+    def record(self, image_paths: Sequence[str], model_hash: str):
+        """记录一批由模型自动写入的标签"""
+        mtimes = self._label_mtimes([self.label_name(path) for path in image_paths])
+        rows = [(name, model_hash, mtime) for name, mtime in mtimes.items()]
+        if not rows:
+            return
+        try:
+            conn = self._connection()
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO auto_labels VALUES (?, ?, ?)", rows)
+        except sqlite3.Error as e:
+            print(f"Manifest error: {e}")
+
+    def plan(self, image_paths: Sequence[str], mode: str, model_hash: str) -> List[str]:
+        """按检测范围筛选需要检测的图片"""
+        if mode == DETECT_ALL:
+            return [image_paths[i] for i in range(len(image_paths))]
+
+        existing = self.label_names()
+        auto = self.auto_labels() if mode == DETECT_STALE else {}
+        todo = []
+        stale: List[Tuple[int, str]] = []
+        for i in range(len(image_paths)):
+            path = image_paths[i]
+            name = self.label_name(path)
+            if name not in existing:
+                todo.append((i, path))
+                continue
+            record = auto.get(name)
+            if record is not None and record[0] != model_hash:
+                stale.append((i, path))
+
+        # 旧模型生成的标签：只在之后没有被修改过时重新检测（只 stat 这部分文件）
+        mtimes = self._label_mtimes([self.label_name(path) for _, path in stale])
+        for i, path in stale:
+            name = self.label_name(path)
+            if name in mtimes and mtimes[name] == auto[name][1]:
+                todo.append((i, path))
+        todo.sort()
+        return [path for _, path in todo]
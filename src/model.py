@@ -1,8 +1,14 @@
+import os
+import threading
 import cv2
 import numpy as np
-from typing import List, Tuple, Optional
-from PyQt5.QtCore import QPointF
-from .label_manager import OneLabel
+from typing import TYPE_CHECKING, List, Tuple, Optional, Sequence
+from .image_cache import get_image_cache
+from .image_io import read_file_bytes, decode_image, decode_reduced
+from .prediction_cache import PredictionCache, get_prediction_cache
+from .session_tuner import (DEFAULT_SESSION_CONFIG, load_tuned_config, save_tuned_config,
+                            has_dynamic_batch, tune)
+from .session_cache import get_session, model_file_hash
 
 # 尝试导入ONNX Runtime，如果失败则使用模拟版本
 try:
@@ -12,15 +18,67 @@ except ImportError:
     ONNXRUNTIME_AVAILABLE = False
     print("Warning: ONNX Runtime not available. Smart detection will be disabled.")
 
+# Qt只在转换为 OneLabel 时需要（图形界面），在转换时才导入，
+# 命令行批量检测（src.batch）和工作进程不加载任何Qt组件
+if TYPE_CHECKING:
+    from .label_manager import OneLabel
+
 # 定义输出大小常量（根据C++代码中的EYE_OUTPUT_SIZE）
 EYE_OUTPUT_SIZE = 7 * 2  # 7个点，每个点2个坐标
+_NORMALIZE_SCALE = np.float32(255.0)
+
+
+def to_pixel_points(points: np.ndarray, shape: Tuple[int, int]) -> np.ndarray:
+    """归一化坐标 (...,7,2) 按原图尺寸 (h,w) 换算为像素坐标（一次向量运算）"""
+    height, width = shape
+    return points * np.array([width, height], dtype=np.float32)
+
+
+class _PreprocessScratch:
+    """单个线程的预处理中间图像（缩小后的彩色图和灰度图）
+
+    只做预处理的线程（流水线的解码线程）只需要这两块小缓冲区，不分配推理缓冲区。
+    """
+
+    def __init__(self, model: "SmartAdd"):
+        height, width = model.input_height, model.input_width
+        self.resized_color = np.empty((height, width, 3), dtype=np.uint8)
+        self.gray_image = np.empty((height, width), dtype=np.uint8)
+
+
+class _InferenceBuffers:
+    """单个线程的预分配推理缓冲区：批次输入、输出及其 IOBinding
+
+    输入输出张量绑定到固定的内存，推理时 ORT 直接读写这些数组；
+    批次行数不变时绑定可重复使用，逐帧推理不再分配任何数组。
+    """
+
+    def __init__(self, model: "SmartAdd", capacity: int):
+        height, width = model.input_height, model.input_width
+        self.capacity = capacity
+        self.input_data = np.zeros((capacity, model.input_channels, height, width), dtype=np.float32)
+        # 单帧视图，供 detect 反复使用
+        self.frame = self.input_data[0]
+
+        output_shape = model.resolve_output_shape(capacity)
+        self.output_data = np.empty(output_shape, dtype=np.float32) if output_shape else None
+        self.binding = model.session.io_binding() if output_shape else None
+        self.bound_rows = 0
+        self.output_view: Optional[np.ndarray] = None
+
+    def bind(self, model: "SmartAdd", rows: int):
+        """绑定前 rows 行输入和对应的输出缓冲区"""
+        output_view = self.output_data[:rows]
+        self.binding.bind_cpu_input(model.input_name, self.input_data[:rows])
+        self.binding.bind_output(
+            model.output_names[0], 'cpu', 0, np.float32, list(output_view.shape),
+            output_view.ctypes.data
+        )
+        for name in model.output_names[1:]:
+            self.binding.bind_output(name, 'cpu')
+        self.output_view = output_view
+        self.bound_rows = rows
 
-class Object:
-    """检测对象"""
-    def __init__(self):
-        self.conf = 0.0
-        self.points: List[Tuple[float, float]] = []
-        self.rect = (0, 0, 0, 0)  # x, y, w, h
 
 class SmartAdd:
     """智能标注类 - 基于C++版本的眼部推理实现"""
@@ -34,9 +92,34 @@ class SmartAdd:
         self.input_height = 112
         self.input_channels = 1  # 灰度图
         
+        # 推理时按输入尺寸缩小解码（JPEG可省去大部分解码开销），关闭则按原尺寸解码
+        self.reduced_decode = True
+        
+        # 推理结果磁盘缓存：按模型文件哈希区分，换模型后自动失效
+        self.use_prediction_cache = True
+        self.model_hash = ""
+        
         self.conf_thresh = 0.6
         self.nms_thresh = 0.3
         
+        # 批量推理：batch_size 为每次 session.run 的最大帧数（None 时使用调优结果），
+        # fixed_batch 为模型固定的批次维度（动态批次时为 None）
+        self.batch_size: Optional[int] = None
+        self.fixed_batch: Optional[int] = None
+        
+        # 会话配置：加载模型时优先使用保存的调优结果，
+        # auto_tune 为 True 且没有调优结果时先在本机调优
+        self.auto_tune = False
+        self.session_config = dict(DEFAULT_SESSION_CONFIG)
+        
+        # 优化后的模型保存到缓存目录，下次加载跳过图优化
+        self.use_optimized_cache = True
+        
+        # INT8 量化推理：None 为 FP32，"dynamic"/"static" 为对应量化方式，
+        # 静态量化首次生成量化模型时使用 calibration_paths 中的图片校准
+        self.quantization: Optional[str] = None
+        self.calibration_paths: Sequence[str] = ()
+        
         # ONNX Runtime相关
         if ONNXRUNTIME_AVAILABLE:
             self.session = None
@@ -45,20 +128,26 @@ class SmartAdd:
             self.input_shapes = []
             self.output_shapes = []
             self.memory_info = None
-            
-            # 预分配的缓冲区
-            self.input_data = None
-            self.gray_image = None
-            self.processed_image = None
         else:
             self.session = None
+        
+        # 预分配的缓冲区按线程保存（流水线的多个线程会同时预处理），
+        # 模型变化时递增代数，各线程下次使用时重新分配
+        self._local = threading.local()
+        self._buffer_generation = 0
     
     def set_num_points(self, points: int):
         """设置点数（固定为7，此方法保持兼容性）"""
         self.num_points = 7  # 始终为7个点
     
-    def set_model(self, model_path: str) -> bool:
-        """设置模型路径 - 基于C++的load_model实现"""
+    def set_model(self, model_path: str, intra_op_threads: Optional[int] = None,
+                  inter_op_threads: Optional[int] = None) -> bool:
+        """设置模型路径 - 基于C++的load_model实现
+
+        会话配置使用本机对该模型的调优结果（见 session_tuner），没有时使用默认配置。
+        intra_op_threads/inter_op_threads 指定时覆盖配置中的ORT线程数（0表示由ORT决定），
+        多进程批量检测时每个进程使用较少的线程。
+        """
         if not ONNXRUNTIME_AVAILABLE:
             print("ONNX Runtime not available")
             return False
@@ -66,44 +155,27 @@ class SmartAdd:
         try:
             self.model_path = model_path
             
-            # 创建环境
-            providers = ['CPUExecutionProvider']
-            
-            # 配置会话选项 - 与C++版本保持一致
-            session_options = ort.SessionOptions()
-            session_options.intra_op_num_threads = 2
-            session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
-            session_options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
-            session_options.add_session_config_entry("session.intra_op.allow_spinning", "0")
-            
-            # Python版本的内存选项
-            session_options.enable_cpu_mem_arena = True
-            session_options.enable_mem_pattern = False
-            
-            # 创建会话
-            self.session = ort.InferenceSession(
-                self.model_path, 
-                sess_options=session_options,
-                providers=providers
-            )
-            
-            # 获取输入输出信息
-            self.input_name = self.session.get_inputs()[0].name
-            self.output_names = [output.name for output in self.session.get_outputs()]
+            # 模型文件哈希：用于查找调优结果、优化后的模型和推理结果缓存
+            self.model_hash = model_file_hash(self.model_path)
             
-            # 获取输入形状
-            input_shape = self.session.get_inputs()[0].shape
-            self.input_shapes = [input_shape]
+            # 配置会话选项 - 默认与C++版本保持一致，有调优结果时使用调优结果
+            self.session_config = self.resolve_session_config(intra_op_threads, inter_op_threads)
             
-            # 获取输出形状
-            self.output_shapes = [output.shape for output in self.session.get_outputs()]
-            
-            # 预分配缓冲区
-            self.allocate_buffers()
+            # 创建会话（同一模型和配置在进程内复用，优化后的模型从缓存加载）
+            session = get_session(self.model_path, self.model_hash, self.session_config,
+                                  self.use_optimized_cache)
+            if self.quantization:
+                session = self._quantized_session(session)
+            if session is self.session:
+                return True
+            self._attach_session(session)
             
             print(f"眼睛模型加载完成")
-            print(f"Input shape: {input_shape}")
+            print(f"Input shape: {self.input_shapes[0]}")
             print(f"Output shapes: {self.output_shapes}")
+            print(f"Batch: {'dynamic' if self.fixed_batch is None else self.fixed_batch}")
+            print(f"Session: {self.session_config}")
+            print(f"Precision: {'INT8 ' + self.quantization if self.quantization else 'FP32'}")
             
             return True
             
@@ -111,42 +183,130 @@ class SmartAdd:
             print(f"Error loading model: {e}")
             return False
     
-    def allocate_buffers(self):
-        """预分配缓冲区"""
-        if not ONNXRUNTIME_AVAILABLE or not self.session:
-            return
+    def _quantized_session(self, fp32_session):
+        """获取量化模型的会话，量化失败时退回 FP32"""
+        from .quantization import quantize_model, quantized_model_path
+        path = quantized_model_path(self.model_hash, self.quantization)
+        if not os.path.exists(path):
+            # 静态量化校准需要用 FP32 会话预处理图片
+            self._attach_session(fp32_session)
+            print("正在生成 INT8 量化模型...")
+            path = quantize_model(self, self.quantization, self.calibration_paths)
+        if path is None:
+            print("INT8 量化失败，使用 FP32 模型")
+            self.quantization = None
+            return fp32_session
+        return get_session(path, model_file_hash(path), self.session_config,
+                           self.use_optimized_cache)
+    
+    def _attach_session(self, session):
+        """使用新的会话并读取其输入输出信息"""
+        self.session = session
         
-        # 分配输入数据缓冲区
-        self.input_data = np.zeros(
-            (1, self.input_channels, self.input_height, self.input_width), 
-            dtype=np.float32
-        )
+        # 获取输入输出信息
+        self.input_name = self.session.get_inputs()[0].name
+        self.output_names = [output.name for output in self.session.get_outputs()]
         
-        # 预分配图像处理缓冲区
-        self.gray_image = np.zeros((self.input_height, self.input_width), dtype=np.uint8)
-        self.processed_image = np.zeros((self.input_height, self.input_width), dtype=np.float32)
-    
-    def preprocess_image_from_cv2(self, img: np.ndarray) -> np.ndarray:
-        """预处理图像 - 基于C++的preprocess实现"""
-        # 转换为灰度图（如果需要）
-        if len(img.shape) == 3 and img.shape[2] == 3:
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        elif len(img.shape) == 3 and img.shape[2] == 1:
-            gray = img[:, :, 0]
+        # 获取输入形状
+        input_shape = self.session.get_inputs()[0].shape
+        self.input_shapes = [input_shape]
+        
+        # 批次维度为符号名/None/-1 时为动态批次
+        batch_dim = input_shape[0] if input_shape else 1
+        if isinstance(batch_dim, int) and batch_dim > 0:
+            self.fixed_batch = batch_dim
         else:
-            gray = img
+            self.fixed_batch = None
+        
+        # 获取输出形状
+        self.output_shapes = [output.shape for output in self.session.get_outputs()]
         
-        # 调整大小 - 使用INTER_NEAREST与C++保持一致
-        resized = cv2.resize(gray, (self.input_width, self.input_height), 
-                           interpolation=cv2.INTER_NEAREST)
+        # 预分配缓冲区
+        self.allocate_buffers()
+    
+    def resolve_session_config(self, intra_op_threads: Optional[int] = None,
+                               inter_op_threads: Optional[int] = None) -> dict:
+        """确定会话配置：调优结果 > 默认配置，显式指定的线程数优先"""
+        config = load_tuned_config(self.model_hash)
+        if config is None and self.auto_tune:
+            print("正在为本机调优推理配置...")
+            config, _ = tune(self.model_path, has_dynamic_batch(self.model_path))
+            save_tuned_config(self.model_hash, config)
+        if config is None:
+            config = dict(DEFAULT_SESSION_CONFIG)
+        
+        if intra_op_threads is not None:
+            config['intra_op_threads'] = intra_op_threads
+        if inter_op_threads is not None:
+            config['inter_op_threads'] = inter_op_threads
+        return config
+    
+    def allocate_buffers(self):
+        """预分配缓冲区（各线程首次使用时按当前模型分配）"""
+        self._buffer_generation += 1
+    
+    def buffers(self, rows: int = 0) -> _InferenceBuffers:
+        """当前线程的预分配缓冲区，容量不足 max(rows, inference_step()) 时重新分配
         
-        # 归一化处理 - 转换为float32并除以255
-        normalized = resized.astype(np.float32) / 255.0
+        batch_size 在首次使用后被调大（重新配置、调优结果）时同样适用。
+        """
+        local = self._local
+        capacity = max(rows, self.inference_step())
+        if (getattr(local, 'generation', None) != self._buffer_generation
+                or local.buffers.capacity < capacity):
+            local.buffers = _InferenceBuffers(self, capacity)
+            local.generation = self._buffer_generation
+        return local.buffers
+    
+    def scratch(self) -> _PreprocessScratch:
+        """当前线程的预处理中间缓冲区（与推理缓冲区分开分配）"""
+        local = self._local
+        if getattr(local, 'scratch_generation', None) != self._buffer_generation:
+            local.scratch = _PreprocessScratch(self)
+            local.scratch_generation = self._buffer_generation
+        return local.scratch
+    
+    def resolve_output_shape(self, batch: int) -> Optional[Tuple[int, ...]]:
+        """批次为 batch 时第一个输出的形状；输出不是固定形状的 float32 时返回 None（不使用 IOBinding）"""
+        if not self.session:
+            return None
+        output = self.session.get_outputs()[0]
+        if output.type != 'tensor(float)' or not output.shape:
+            return None
+        dims = [batch]
+        for dim in output.shape[1:]:
+            if not isinstance(dim, int) or dim <= 0:
+                return None
+            dims.append(dim)
+        return tuple(dims)
+    
+    def preprocess_into(self, img: np.ndarray, out: np.ndarray):
+        """预处理图像并写入 out（形状为 (1,H,W) 的 float32 数组），不分配新数组
         
-        # 添加通道维度和批次维度 (H,W) -> (1,1,H,W)
-        if len(normalized.shape) == 2:
-            normalized = normalized[np.newaxis, np.newaxis, :, :]
+        INTER_NEAREST 只是取样，与逐像素的灰度转换可交换，
+        因此先把彩色图缩小再转灰度，中间结果都写入预分配的小缓冲区。
+        """
+        scratch = self.scratch()
+        size = (self.input_width, self.input_height)
+        if len(img.shape) == 3 and img.shape[2] == 3:
+            cv2.resize(img, size, dst=scratch.resized_color, interpolation=cv2.INTER_NEAREST)
+            cv2.cvtColor(scratch.resized_color, cv2.COLOR_BGR2GRAY, dst=scratch.gray_image)
+        else:
+            if len(img.shape) == 3:
+                img = img[:, :, 0]
+            cv2.resize(img, size, dst=scratch.gray_image, interpolation=cv2.INTER_NEAREST)
         
+        # 归一化处理 - 先转换类型再原地除以255（混合类型的ufunc会分配内部缓冲区）
+        target = out[0]
+        np.copyto(target, scratch.gray_image, casting='unsafe')
+        np.divide(target, _NORMALIZE_SCALE, out=target)
+    
+    def preprocess_image_from_cv2(self, img: np.ndarray) -> np.ndarray:
+        """预处理图像 - 基于C++的preprocess实现，返回新的 (1,1,H,W) 数组"""
+        normalized = np.empty(
+            (1, self.input_channels, self.input_height, self.input_width), dtype=np.float32
+        )
+        self.preprocess_into(img, normalized[0])
         return normalized
     
     def run_inference(self, input_data: np.ndarray) -> Optional[np.ndarray]:
@@ -167,76 +327,253 @@ class SmartAdd:
             print(f"推理错误: {e}")
             return None
     
-    def postprocess(self, output: np.ndarray, original_shape: Tuple[int, int]) -> List[Object]:
-        """后处理输出 - 适配眼部7点检测"""
-        objects = []
+    def run_bound(self, rows: int) -> Optional[np.ndarray]:
+        """对当前线程输入缓冲区的前 rows 行推理，返回第一个输出
         
-        # 确保输出形状正确
-        output = output.flatten()
+        输出可绑定时结果写入预分配的输出缓冲区（下次推理会覆盖，需要保留时调用方复制），
+        否则退回普通的 session.run。
+        """
+        if not self.session:
+            return None
         
-        # 如果输出正好是14个值（7个点的x,y坐标）
-        if len(output) >= EYE_OUTPUT_SIZE:
-            obj = Object()
-            obj.conf = 1.0  # 如果模型不输出置信度，设置为1.0
-            
-            # 提取7个点的坐标
-            scale_x = original_shape[1] / self.input_width
-            scale_y = original_shape[0] / self.input_height
-            
-            for i in range(self.num_points):
-                x_idx = i * 2
-                y_idx = i * 2 + 1
-                
-                if y_idx < len(output):
-                    # 假设输出是归一化坐标，需要反归一化
-                    x = output[x_idx] * original_shape[1]
-                    y = output[y_idx] * original_shape[0]
-                    obj.points.append((x, y))
-            
-            if len(obj.points) == self.num_points:
-                objects.append(obj)
+        buffers = self.buffers(rows)
+        if buffers.binding is None:
+            return self.run_inference(buffers.input_data[:rows])
+        
+        try:
+            if buffers.bound_rows != rows:
+                buffers.bind(self, rows)
+            self.session.run_with_iobinding(buffers.binding)
+            return buffers.output_view
+        except Exception as e:
+            print(f"推理错误: {e}")
+            return None
+    
+    def prediction_cache(self) -> Optional[PredictionCache]:
+        """推理结果缓存，未启用或模型未加载时为 None"""
+        if not self.use_prediction_cache or not self.model_hash:
+            return None
+        return get_prediction_cache()
+    
+    def prediction_key(self) -> str:
+        """缓存中的模型标识：模型哈希及影响结果的预处理设置"""
+        decode = "reduced" if self.reduced_decode else "full"
+        precision = f"int8-{self.quantization}" if self.quantization else "fp32"
+        return f"{self.model_hash}:{self.input_width}x{self.input_height}:{decode}:{precision}"
+    
+    def labels_from_points(self, points: np.ndarray, shape: Tuple[int, int]) -> List["OneLabel"]:
+        """归一化坐标 (K,7,2) 转换为原图像素坐标的标签（需要Qt）"""
+        from .label_manager import OneLabel
+        return [OneLabel.from_points(coords)
+                for coords in self.postprocess(points, shape).astype(np.float64).tolist()]
+    
+    def labels_from_predictions(self, predictions: Sequence[Optional[Tuple[np.ndarray, Tuple[int, int]]]]
+                                ) -> List[List["OneLabel"]]:
+        """批量转换 predict_batch 的结果：所有帧一次换算为像素坐标，再逐个创建标签（需要Qt）"""
+        from .label_manager import OneLabel
+        results: List[List[OneLabel]] = [[] for _ in predictions]
+        valid = [i for i, prediction in enumerate(predictions) if prediction is not None]
+        if not valid:
+            return results
         
-        return objects
+        points = [predictions[i][0].reshape(-1, self.num_points, 2) for i in valid]
+        counts = [len(p) for p in points]
+        scale = np.array([(predictions[i][1][1], predictions[i][1][0]) for i in valid], dtype=np.float32)
+        scale = np.repeat(scale, counts, axis=0)[:, np.newaxis, :]
+        coords = (np.concatenate(points) * scale).astype(np.float64).tolist()
+        for owner, label_coords in zip(np.repeat(valid, counts).tolist(), coords):
+            results[owner].append(OneLabel.from_points(label_coords))
+        return results
     
-    def detect(self, img_path: str, target: List[OneLabel]) -> bool:
+    def points_from_output(self, output: np.ndarray, count: int) -> Optional[np.ndarray]:
+        """模型原始输出的前 count 帧转换为归一化坐标 (count,1,7,2)，输出不足7个点时返回 None
+        
+        返回的是副本，输出缓冲区之后被覆盖也不受影响。
+        """
+        output = output[:count].reshape(count, -1)
+        if output.shape[1] < EYE_OUTPUT_SIZE:
+            return None
+        return output[:, :EYE_OUTPUT_SIZE].reshape(count, 1, self.num_points, 2).copy()
+    
+    def postprocess(self, points: np.ndarray, original_shape: Tuple[int, int]) -> np.ndarray:
+        """后处理：一帧的归一化坐标（或原始输出）转换为原图像素坐标 (K,7,2)"""
+        points = np.asarray(points, dtype=np.float32)
+        if points.size < EYE_OUTPUT_SIZE:
+            return np.empty((0, self.num_points, 2), dtype=np.float32)
+        points = points.reshape(-1)[:points.size // EYE_OUTPUT_SIZE * EYE_OUTPUT_SIZE]
+        return to_pixel_points(points.reshape(-1, self.num_points, 2), original_shape)
+    
+    def detect(self, img_path: str, target: List["OneLabel"]) -> bool:
         """检测函数 - 基于C++的inference流程"""
         if not ONNXRUNTIME_AVAILABLE or not self.session:
             print("Model not loaded or ONNX Runtime not available")
             return False
         
         try:
-            # 读取图像
-            img = cv2.imread(img_path)
+            # 已缓存的结果无需解码和推理
+            cache = self.prediction_cache()
+            image_key = PredictionCache.image_key(img_path) if cache is not None else None
+            if cache is not None:
+                cached = cache.get(self.prediction_key(), image_key)
+                if cached is not None:
+                    target.clear()
+                    target.extend(self.labels_from_points(*cached))
+                    return len(target) > 0
+            
+            # 读取图像（与批量检测相同的解码方式）
+            img, original_shape = self.load_for_inference(img_path)
             if img is None:
                 print(f"Failed to load image: {img_path}")
                 return False
             
-            original_shape = img.shape[:2]
-            
-            # 预处理
-            input_data = self.preprocess_image_from_cv2(img)
+            # 预处理（写入预分配的输入缓冲区）
+            buffers = self.buffers()
+            self.preprocess_into(img, buffers.frame)
             
             # 运行推理
-            output = self.run_inference(input_data)
+            output = self.run_bound(self.fixed_batch or 1)
             if output is None:
                 return False
+            points = self.points_from_output(output, 1)
+            if points is None:
+                return False
             
-            # 后处理
-            objects = self.postprocess(output, original_shape)
+            if cache is not None:
+                cache.put(self.prediction_key(), image_key, (points[0], original_shape))
             
-            # 转换为OneLabel格式
+            # 后处理并转换为OneLabel格式
             target.clear()
-            for obj in objects:
-                label = OneLabel(self.num_points)
-                for point in obj.points:
-                    label.set_point(QPointF(point[0], point[1]))
-                if label.success():  # 确保7个点都设置成功
-                    target.append(label)
-            
+            target.extend(self.labels_from_points(points[0], original_shape))
             return len(target) > 0
             
         except Exception as e:
             print(f"Detection error: {e}")
             import traceback
             traceback.print_exc()
-            return False
\ No newline at end of file
+            return False
+    
+    def decode_for_inference(self, data: np.ndarray) -> Tuple[Optional[np.ndarray], Optional[Tuple[int, int]]]:
+        """解码推理用图像，返回 (图像, 原图尺寸 (h,w))
+
+        reduced_decode 时按模型输入尺寸缩小解码为灰度图，返回的原图尺寸用于把坐标映射回原图像素。
+        """
+        if self.reduced_decode:
+            return decode_reduced(data, self.input_width, self.input_height)
+        img = decode_image(data)
+        return img, (img.shape[:2] if img is not None else None)
+    
+    def load_for_inference(self, img_path: str) -> Tuple[Optional[np.ndarray], Optional[Tuple[int, int]]]:
+        """读取推理用图像，结果与 decode_for_inference 相同（推理结果缓存的键记录了解码方式）
+
+        全尺寸解码时直接使用显示缓存中的图像；缩小解码不使用显示缓存，否则结果会取决于
+        图片是否刚被显示过。解码结果不放入显示缓存（避免批量处理冲掉缓存）。
+        """
+        if not self.reduced_decode:
+            img = get_image_cache().peek(img_path)
+            if img is not None:
+                return img, img.shape[:2]
+        data = read_file_bytes(img_path)
+        if data is None:
+            return None, None
+        return self.decode_for_inference(data)
+    
+    def inference_step(self) -> int:
+        """每次 session.run 的帧数"""
+        return self.fixed_batch or max(1, self.batch_size or self.session_config['batch_size'])
+    
+    def warm_up(self, runs: int = 2) -> bool:
+        """用空白输入预先推理几次
+
+        第一次 session.run 需要分配内存池和初始化算子，明显慢于之后的推理，
+        加载模型后预热可避免第一次检测卡顿。
+        """
+        if not self.session:
+            return False
+        try:
+            rows = self.fixed_batch or 1
+            self.batch_buffer(rows).fill(0.0)
+            for _ in range(runs):
+                self.infer_batch(rows)
+            return True
+        except Exception as e:
+            print(f"Warm-up failed: {e}")
+            return False
+
+    def batch_buffer(self, count: int) -> np.ndarray:
+        """当前线程的批次输入缓冲区（前 count 行），填充后调用 infer_batch
+        
+        固定批次维度的模型多余的行不参与结果，无需清零。
+        """
+        return self.buffers(count).input_data[:count]
+    
+    def infer_batch(self, count: int) -> List[Optional[np.ndarray]]:
+        """对已填充的批次缓冲区推理，返回前 count 帧的归一化坐标 (K,7,2)，失败为 None"""
+        output = self.run_bound(self.fixed_batch or count)
+        if output is None:
+            return [None] * count
+        
+        # 输出缓冲区会被下一批覆盖，整批复制一次后按帧拆分
+        points = self.points_from_output(output, count)
+        if points is None:
+            return [None] * count
+        return list(points)
+    
+    def predict_batch(self, img_paths: List[str]) -> List[Optional[Tuple[np.ndarray, Tuple[int, int]]]]:
+        """批量推理 - 动态批次模型每 batch_size 帧调用一次 session.run
+
+        固定批次维度的模型按其批次大小分组（不足时补零），批次为1时即逐帧推理。
+        返回与 img_paths 一一对应的 (归一化坐标 (K,7,2), 原图尺寸 (h,w))，
+        读取或推理失败的图片对应 None。已缓存的图片直接返回缓存结果。
+        不创建任何Qt对象，可在工作线程中使用。
+        """
+        results: List[Optional[Tuple[np.ndarray, Tuple[int, int]]]] = [None] * len(img_paths)
+        if not ONNXRUNTIME_AVAILABLE or not self.session:
+            print("Model not loaded or ONNX Runtime not available")
+            return results
+        
+        # 先查询缓存，只对未命中的图片推理
+        cache = self.prediction_cache()
+        model_key = self.prediction_key()
+        pending = []
+        for index, path in enumerate(img_paths):
+            image_key = PredictionCache.image_key(path) if cache is not None else None
+            cached = cache.get(model_key, image_key) if cache is not None else None
+            if cached is not None:
+                results[index] = cached
+            else:
+                pending.append((index, image_key))
+        
+        step = self.inference_step()
+        for start in range(0, len(pending), step):
+            chunk = pending[start:start + step]
+            batch = self.batch_buffer(len(chunk))
+            
+            # 逐帧预处理写入批次张量，原图用完即释放，只保留尺寸
+            shapes = []
+            for i, (index, _) in enumerate(chunk):
+                img, original_shape = self.load_for_inference(img_paths[index])
+                if img is None:
+                    print(f"Failed to load image: {img_paths[index]}")
+                    shapes.append(None)
+                    continue
+                self.preprocess_into(img, batch[i])
+                shapes.append(original_shape)
+            
+            if not any(shapes):
+                continue
+            
+            computed = []
+            for i, points in enumerate(self.infer_batch(len(chunk))):
+                if points is not None and shapes[i] is not None:
+                    index, image_key = chunk[i]
+                    results[index] = (points, shapes[i])
+                    if image_key is not None:
+                        computed.append((image_key, results[index]))
+            if cache is not None:
+                cache.put_many(model_key, computed)
+        
+        return results
+    
+    def detect_batch(self, img_paths: List[str]) -> List[List["OneLabel"]]:
+        """批量检测，返回与 img_paths 一一对应的标签列表（失败的图片为空列表）"""
+        return self.labels_from_predictions(self.predict_batch(img_paths))
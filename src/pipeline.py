@@ -0,0 +1,332 @@
+import os
+import queue
+import threading
+import time
+from typing import Callable, List, Optional, Sequence, Tuple
+import numpy as np
+from .image_io import read_file_bytes
+from .label_store import LabelWriter
+from .model import SmartAdd
+from .prediction_cache import PredictionCache
+
+# 队列结束标记
+_STOP = object()
+
+
+class StageStats:
+    """单个阶段的计数器"""
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy_time = 0.0      # 处理耗时（所有线程累计）
+        self.starved_time = 0.0   # 等待上游输入的时间
+        self.blocked_time = 0.0   # 等待下游队列空位的时间
+        self._lock = threading.Lock()
+
+    def add(self, items: int, busy: float, starved: float, blocked: float):
+        with self._lock:
+            self.items += items
+            self.busy_time += busy
+            self.starved_time += starved
+            self.blocked_time += blocked
+
+    def utilization(self, wall_time: float) -> float:
+        """处理时间占全部线程可用时间的比例"""
+        if wall_time <= 0:
+            return 0.0
+        return self.busy_time / (wall_time * self.workers)
+
+
+class PipelineStats:
+    """流水线统计 - 利用率最高的阶段即瓶颈"""
+
+    def __init__(self, stages: List[StageStats]):
+        self.stages = stages
+        self.start_time = time.monotonic()
+        self.end_time: Optional[float] = None
+        self.cache_hits = 0
+
+    @property
+    def wall_time(self) -> float:
+        return (self.end_time or time.monotonic()) - self.start_time
+
+    def bottleneck(self) -> Optional[StageStats]:
+        if not self.stages:
+            return None
+        wall = self.wall_time
+        return max(self.stages, key=lambda stage: stage.utilization(wall))
+
+    def summary(self) -> str:
+        """格式化的各阶段统计"""
+        wall = self.wall_time
+        lines = [f"{'阶段':<8}{'线程':>6}{'处理数':>10}{'利用率':>9}{'等待输入':>10}{'等待输出':>10}"]
+        for stage in self.stages:
+            total = max(wall * stage.workers, 1e-9)
+            lines.append(
+                f"{stage.name:<8}{stage.workers:>8}{stage.items:>12}"
+                f"{stage.utilization(wall):>11.0%}{stage.starved_time / total:>12.0%}"
+                f"{stage.blocked_time / total:>12.0%}"
+            )
+        if self.cache_hits:
+            lines.append(f"缓存命中: {self.cache_hits}（无需解码和推理）")
+        bottleneck = self.bottleneck()
+        if bottleneck is not None:
+            lines.append(f"瓶颈阶段: {bottleneck.name}")
+        return "\n".join(lines)
+
+
+class DetectionPipeline:
+    """读取 → 解码预处理 → 推理 → 写入 流水线
+
+    各阶段使用独立的线程数，通过有界队列连接实现背压：磁盘读取、解码和推理
+    同时进行，而不是逐帧串行。cv2 与 ONNX Runtime 在计算时释放GIL，
+    因此线程即可并行。读取或推理失败的帧同样流经各阶段，以便统计处理数；
+    某个阶段处理时抛出异常的帧也按失败处理，不会使流水线停止。
+    """
+
+    def __init__(self, model: SmartAdd, label_folder: str,
+                 read_workers: int = 4, decode_workers: int = 0,
+                 infer_workers: int = 1, write_workers: int = 1, queue_batches: int = 2):
+        self.model = model
+        self.label_folder = label_folder
+        self.read_workers = max(1, read_workers)
+        self.decode_workers = max(1, decode_workers or min(4, max(1, (os.cpu_count() or 2) - 2)))
+        self.infer_workers = max(1, infer_workers)
+        self.write_workers = max(1, write_workers)
+        self.queue_batches = max(1, queue_batches)
+        self.stats: Optional[PipelineStats] = None
+
+    def run(self, paths: Sequence[str],
+            on_progress: Optional[Callable[[int, List[str]], None]] = None,
+            cancel_event: Optional[threading.Event] = None,
+            running_event: Optional[threading.Event] = None) -> Tuple[int, int]:
+        """执行流水线，返回 (检测成功数, 已处理数)
+
+        on_progress(本批处理数, 本批写入的路径) 在写入线程中回调；
+        running_event 被清除时暂停送入新帧，cancel_event 置位后不再送入新帧，
+        已进入流水线的帧会处理完毕。
+        """
+        writer = LabelWriter(self.label_folder)
+        step = self.model.inference_step()
+        frame_queue_size = step * self.queue_batches
+
+        read_q: queue.Queue = queue.Queue(maxsize=frame_queue_size)
+        decode_q: queue.Queue = queue.Queue(maxsize=frame_queue_size)
+        infer_q: queue.Queue = queue.Queue(maxsize=frame_queue_size)
+        write_q: queue.Queue = queue.Queue(maxsize=self.queue_batches * 2)
+
+        read_stats = StageStats("读取", self.read_workers)
+        decode_stats = StageStats("解码", self.decode_workers)
+        infer_stats = StageStats("推理", self.infer_workers)
+        write_stats = StageStats("写入", self.write_workers)
+        self.stats = PipelineStats([read_stats, decode_stats, infer_stats, write_stats])
+
+        counters = {'detected': 0, 'processed': 0}
+        counters_lock = threading.Lock()
+
+        cache = self.model.prediction_cache()
+        model_key = self.model.prediction_key()
+
+        def read(item):
+            index, path, image_key = item
+            return index, path, image_key, read_file_bytes(path)
+
+        # 预处理结果的缓冲池：覆盖队列中、解码线程和推理批次中可能同时存在的帧，
+        # 推理线程复制进批次后归还，池空时解码线程等待，不会为每帧分配新数组
+        pool_size = frame_queue_size + self.decode_workers + step * self.infer_workers
+        tensor_pool: queue.Queue = queue.Queue()
+        for _ in range(pool_size):
+            tensor_pool.put(np.empty(
+                (self.model.input_channels, self.model.input_height, self.model.input_width),
+                dtype=np.float32
+            ))
+
+        def decode(item):
+            index, path, image_key, data = item
+            img, original_shape = self.model.decode_for_inference(data) if data is not None else (None, None)
+            if img is None:
+                print(f"Failed to load image: {path}")
+                return index, path, None, None
+            tensor = tensor_pool.get()
+            try:
+                self.model.preprocess_into(img, tensor)
+            except Exception:
+                tensor_pool.put(tensor)
+                raise
+            # 推理结果写入缓存时需要图片标识和原图尺寸
+            entry = (image_key, original_shape) if image_key is not None else None
+            return index, path, entry, tensor
+
+        def infer(items):
+            valid = False
+            try:
+                batch = self.model.batch_buffer(len(items))
+                for i, (_, _, _, tensor) in enumerate(items):
+                    if tensor is not None:
+                        batch[i] = tensor
+                        valid = True
+            finally:
+                # 无论成功与否都归还缓冲区，否则解码线程会一直等待
+                for _, _, _, tensor in items:
+                    if tensor is not None:
+                        tensor_pool.put(tensor)
+            points = self.model.infer_batch(len(items)) if valid else [None] * len(items)
+            return [(path, p if tensor is not None else None, entry)
+                    for (_, path, entry, tensor), p in zip(items, points)]
+
+        def write(items):
+            labels = []
+            computed = []
+            for path, points, entry in items:
+                if points is None:
+                    continue
+                if entry is not None:
+                    image_key, original_shape = entry
+                    computed.append((image_key, (points, original_shape)))
+                labels.append((path, points))
+            written = writer.write_many(labels)
+            if cache is not None and computed:
+                cache.put_many(model_key, computed)
+            with counters_lock:
+                counters['processed'] += len(items)
+                counters['detected'] += len(written)
+            if on_progress is not None:
+                on_progress(len(items), written)
+            return None
+
+        # 处理出错时向下游传递的失败结果
+        def read_failed(item):
+            index, path, image_key = item
+            return index, path, image_key, None
+
+        def decode_failed(item):
+            return item[0], item[1], None, None
+
+        def infer_failed(items):
+            return [(path, None, entry) for _, path, entry, _ in items]
+
+        def write_failed(items):
+            with counters_lock:
+                counters['processed'] += len(items)
+            if on_progress is not None:
+                on_progress(len(items), [])
+            return None
+
+        threads = []
+        threads += _start_stage(read, read_q, decode_q, self.read_workers,
+                                self.decode_workers, read_stats, on_error=read_failed)
+        threads += _start_stage(decode, decode_q, infer_q, self.decode_workers,
+                                self.infer_workers, decode_stats, on_error=decode_failed)
+        threads += _start_stage(infer, infer_q, write_q, self.infer_workers,
+                                self.write_workers, infer_stats, batch_size=step,
+                                on_error=infer_failed)
+        threads += _start_stage(write, write_q, None, self.write_workers, 0, write_stats,
+                                on_error=write_failed)
+
+        # 送入图片（在调用线程中执行，队列满时自然阻塞）；
+        # 缓存命中的图片按批直接交给写入阶段，跳过读取、解码和推理
+        hits = []
+        try:
+            for index in range(len(paths)):
+                if running_event is not None:
+                    running_event.wait()
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                path = paths[index]
+                image_key = PredictionCache.image_key(path) if cache is not None else None
+                cached = cache.get(model_key, image_key) if image_key is not None else None
+                if cached is not None:
+                    hits.append((path, cached[0], None))
+                    if len(hits) >= step:
+                        self.stats.cache_hits += len(hits)
+                        write_q.put(hits)
+                        hits = []
+                else:
+                    read_q.put((index, path, image_key))
+        finally:
+            if hits:
+                self.stats.cache_hits += len(hits)
+                write_q.put(hits)
+            for _ in range(self.read_workers):
+                read_q.put(_STOP)
+            for thread in threads:
+                thread.join()
+            self.stats.end_time = time.monotonic()
+
+        return counters['detected'], counters['processed']
+
+
+def _start_stage(func: Callable, in_q: queue.Queue, out_q: Optional[queue.Queue],
+                 workers: int, downstream_workers: int, stats: StageStats,
+                 batch_size: int = 0,
+                 on_error: Optional[Callable] = None) -> List[threading.Thread]:
+    """启动一个阶段的工作线程
+
+    batch_size > 0 时每次取出一批：阻塞等待第一帧，再取出队列中已就绪的帧，
+    上游较慢时批次自动变小，不会为凑满批次而等待。
+    func 抛出异常时打印错误，改用 on_error(item) 的结果（失败的帧）传给下游，线程继续运行。
+    每个线程取到一个结束标记后退出（包括意外退出），最后退出的线程向下游的每个线程发送结束标记。
+    """
+    remaining = [workers]
+    lock = threading.Lock()
+
+    def process(item):
+        try:
+            return func(item)
+        except Exception as e:
+            print(f"Pipeline {stats.name} error: {e}")
+        if on_error is None:
+            return None
+        try:
+            return on_error(item)
+        except Exception as e:
+            print(f"Pipeline {stats.name} error: {e}")
+            return None
+
+    def worker():
+        try:
+            run_worker()
+        finally:
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last and out_q is not None:
+                for _ in range(downstream_workers):
+                    out_q.put(_STOP)
+
+    def run_worker():
+        finished = False
+        while not finished:
+            t0 = time.monotonic()
+            item = in_q.get()
+            if item is _STOP:
+                break
+            if batch_size > 0:
+                items = [item]
+                while len(items) < batch_size:
+                    try:
+                        next_item = in_q.get_nowait()
+                    except queue.Empty:
+                        break
+                    if next_item is _STOP:
+                        # 处理完当前批次后退出
+                        finished = True
+                        break
+                    items.append(next_item)
+                item = items
+            t1 = time.monotonic()
+            result = process(item)
+            t2 = time.monotonic()
+            if result is not None and out_q is not None:
+                out_q.put(result)
+            t3 = time.monotonic()
+            count = len(item) if isinstance(item, list) else 1
+            stats.add(count, t2 - t1, t1 - t0, t3 - t2)
+
+    threads = [threading.Thread(target=worker, name=f"pipeline-{stats.name}", daemon=True)
+               for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    return threads
@@ -0,0 +1,161 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, Optional, Tuple
+import numpy as np
+from .cache_utils import user_cache_dir
+
+PREDICTION_CACHE_VERSION = 2
+
+# 清理时保留的记录：最近写入的 DEFAULT_MAX_ROWS 条中不超过 DEFAULT_MAX_AGE_DAYS 天的
+DEFAULT_MAX_AGE_DAYS = 30
+DEFAULT_MAX_ROWS = 1_000_000
+
+# 图片标识：(绝对路径, 文件大小, mtime_ns)
+ImageKey = Tuple[str, int, int]
+# 缓存的预测：(归一化坐标 (K,7,2), 原图尺寸 (h,w))
+Prediction = Tuple[np.ndarray, Tuple[int, int]]
+
+
+class PredictionCache:
+    """推理结果磁盘缓存（单个SQLite文件）
+
+    键为 (模型标识, 图片绝对路径)，同时记录图片大小和 mtime：
+    图片被修改后记录不再命中；模型标识包含模型文件哈希，换模型后旧记录不再命中，
+    但仍然保留，换回原来的模型（或推理精度）时可以继续使用，由 prune 按时间和数量清理。
+    每个线程使用独立连接，多个进程可同时读写（WAL模式）。
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.path.join(
+            user_cache_dir("predictions"), f"predictions_v{PREDICTION_CACHE_VERSION}.sqlite3"
+        )
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+
+    @staticmethod
+    def image_key(path: str) -> Optional[ImageKey]:
+        """生成图片标识（只读取文件元数据）"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                "model TEXT NOT NULL, path TEXT NOT NULL, size INTEGER NOT NULL, "
+                "mtime INTEGER NOT NULL, height INTEGER NOT NULL, width INTEGER NOT NULL, "
+                "points BLOB NOT NULL, written INTEGER NOT NULL, "
+                "PRIMARY KEY (model, path)) WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS predictions_written ON predictions (written)")
+            self._local.conn = conn
+        return conn
+
+    def get(self, model_key: str, image_key: Optional[ImageKey]) -> Optional[Prediction]:
+        """查询一张图片的预测，图片已修改或不存在记录时返回 None"""
+        if image_key is None:
+            return None
+        path, size, mtime = image_key
+        try:
+            row = self._connection().execute(
+                "SELECT size, mtime, height, width, points FROM predictions "
+                "WHERE model = ? AND path = ?",
+                (model_key, path)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Prediction cache error: {e}")
+            row = None
+
+        hit = row is not None and row[0] == size and row[1] == mtime
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if not hit:
+            return None
+        points = np.frombuffer(row[4], dtype=np.float32).reshape(-1, 7, 2)
+        return points, (row[2], row[3])
+
+    def put_many(self, model_key: str, entries: Iterable[Tuple[ImageKey, Prediction]]):
+        """在一个事务中写入多张图片的预测"""
+        now = int(time.time())
+        rows = [
+            (model_key, path, size, mtime, int(shape[0]), int(shape[1]),
+             np.ascontiguousarray(points, dtype=np.float32).tobytes(), now)
+            for (path, size, mtime), (points, shape) in entries
+        ]
+        if not rows:
+            return
+        try:
+            conn = self._connection()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO predictions "
+                    "(model, path, size, mtime, height, width, points, written) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+        except sqlite3.Error as e:
+            print(f"Prediction cache error: {e}")
+
+    def put(self, model_key: str, image_key: Optional[ImageKey], prediction: Prediction):
+        if image_key is not None:
+            self.put_many(model_key, [(image_key, prediction)])
+
+    def prune(self, max_age_days: float = DEFAULT_MAX_AGE_DAYS, max_rows: int = DEFAULT_MAX_ROWS):
+        """按时间和数量清理：删除超过 max_age_days 天的记录，再只保留最近写入的 max_rows 条
+
+        不按模型删除，其他模型和推理精度的结果保留。只应在主进程中调用（加载模型后一次），
+        多进程检测的工作进程不清理。
+        """
+        cutoff = int(time.time() - max_age_days * 86400)
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM predictions WHERE written < ?", (cutoff,))
+                count = conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+                if count > max_rows:
+                    conn.execute(
+                        "DELETE FROM predictions WHERE (model, path) IN ("
+                        "SELECT model, path FROM predictions ORDER BY written LIMIT ?)",
+                        (count - max_rows,)
+                    )
+        except sqlite3.Error as e:
+            print(f"Prediction cache error: {e}")
+
+    def clear(self):
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM predictions")
+        except sqlite3.Error as e:
+            print(f"Prediction cache error: {e}")
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+
+_shared_cache: Optional[PredictionCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_prediction_cache() -> PredictionCache:
+    """获取进程内共享的推理结果缓存"""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = PredictionCache()
+        return _shared_cache
@@ -0,0 +1,104 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+from .image_cache import ImageCache, get_image_cache
+
+
+class ImagePrefetcher:
+    """相邻帧后台预取 - 根据浏览方向和速度在线程池中提前解码图片
+
+    解码结果写入共享的 ImageCache，DrawOnPic.set_current_file 读取时直接命中。
+    所有公开方法只应在UI线程调用。
+    """
+
+    def __init__(self, cache: Optional[ImageCache] = None, max_workers: int = 2,
+                 radius: int = 4, max_radius: int = 48, lookahead_seconds: float = 0.5):
+        self.cache = cache or get_image_cache()
+        self.radius = radius                        # 静止时前后预取的帧数
+        self.max_radius = max_radius                # 快速浏览时前方最多预取的帧数
+        self.lookahead_seconds = lookahead_seconds  # 按当前速度预取多少秒的帧
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="prefetch")
+        self._paths: Sequence[str] = []
+        self._futures: Dict[int, Future] = {}
+        self._last_index = -1
+        self._last_time = 0.0
+        self._direction = 1
+        self._speed = 0.0  # 平滑后的浏览速度（帧/秒）
+        self._frame_bytes = 0  # 最近一帧的解码大小，用于限制预取窗口
+
+    def set_paths(self, paths: Sequence[str]):
+        """设置图片列表（切换文件夹时调用）"""
+        self.cancel_all()
+        self._paths = paths
+        self._last_index = -1
+        self._speed = 0.0
+
+    def on_navigate(self, index: int):
+        """通知当前浏览位置，更新预取窗口并取消过期任务"""
+        if not 0 <= index < len(self._paths):
+            return
+
+        now = time.monotonic()
+        step = index - self._last_index
+        if self._last_index >= 0 and step != 0:
+            if abs(step) > self.max_radius:
+                # 跳转：之前排队的任务全部过期
+                self.cancel_all()
+                self._speed = 0.0
+            else:
+                self._direction = 1 if step > 0 else -1
+                elapsed = max(now - self._last_time, 1e-3)
+                self._speed = 0.5 * self._speed + 0.5 * (abs(step) / elapsed)
+        self._last_index = index
+        self._last_time = now
+
+        wanted = self._window(index)
+        wanted_set = set(wanted)
+
+        # 取消不在新窗口内的任务（已开始执行的任务无法取消，会自然完成）
+        for i in list(self._futures):
+            if i not in wanted_set:
+                self._futures.pop(i).cancel()
+
+        for i in wanted:
+            future = self._futures.get(i)
+            if future is None or future.cancelled():
+                self._futures[i] = self._executor.submit(self._load, self._paths[i])
+
+    def cancel_all(self):
+        """取消所有尚未开始的预取任务"""
+        for future in self._futures.values():
+            future.cancel()
+        self._futures.clear()
+
+    def shutdown(self):
+        """关闭线程池（不等待正在执行的解码）"""
+        self.cancel_all()
+        self._executor.shutdown(wait=False)
+
+    def _window(self, index: int) -> List[int]:
+        """按优先级计算需要预取的帧索引：前进方向优先，距离近的优先"""
+        ahead = self.radius + int(self._speed * self.lookahead_seconds)
+        ahead = min(ahead, self.max_radius)
+        behind = self.radius if self._speed == 0.0 else max(1, self.radius // 2)
+
+        # 窗口不能超过缓存容量的一半，否则预取的帧会互相淘汰
+        if self._frame_bytes > 0:
+            budget = max(2, self.cache.max_bytes // (2 * self._frame_bytes))
+            ahead = min(ahead, budget * 3 // 4)
+            behind = min(behind, max(1, budget - ahead))
+
+        indices = []
+        for k in range(1, max(ahead, behind) + 1):
+            if k <= ahead:
+                indices.append(index + self._direction * k)
+            if k <= behind:
+                indices.append(index - self._direction * k)
+        return [i for i in indices if 0 <= i < len(self._paths)]
+
+    def _load(self, path: str):
+        """工作线程：解码并放入缓存"""
+        img = self.cache.get(path)
+        if img is not None:
+            self._frame_bytes = img.nbytes
@@ -1,14 +1,19 @@
-from PyQt5.QtGui import QPainter, QPen, QFont, QImage, QPolygonF
+from PyQt5.QtGui import QPainter, QPen, QFont, QPolygonF, QTransform
 from PyQt5.QtCore import Qt, QPointF
 from typing import Optional, List
 from .txt_manager import AllLabel
 from .label_manager import OneLabel
 
 class Painter:
-    """绘制器类"""
+    """绘制器类 - 在控件坐标系中绘制标注叠加层
+
+    标注点保存在图像坐标系中，绘制时通过 transform 映射到控件坐标，
+    因此点的大小和线宽不随缩放变化，也不需要修改底图。
+    """
     
     def __init__(self):
         self.painter_label: Optional[QPainter] = None
+        self.transform = QTransform()
         self.pen_point = QPen(Qt.green, 4)
         self.pen_hexagon = QPen(Qt.red, 2)
         self.pen_free_point = QPen(Qt.blue, 4)
@@ -16,18 +21,28 @@ class Painter:
         self.pen_text = QPen(Qt.white, 1)
         self.font = QFont("Arial", 10, QFont.Bold)
     
-    def reset_painter(self, img: QImage):
-        """重置画笔"""
-        if self.painter_label:
-            self.painter_label.end()
-        self.painter_label = QPainter(img)
+    def reset_painter(self, painter: QPainter, transform: QTransform):
+        """绑定到外部画笔（通常在 paintEvent 中创建），transform 为图像到控件的映射"""
+        self.painter_label = painter
+        self.transform = transform
         self.painter_label.setRenderHint(QPainter.Antialiasing)
     
+    def end(self):
+        """解除绑定（画笔由调用方负责结束）"""
+        self.painter_label = None
+    
+    def map_point(self, point: QPointF) -> QPointF:
+        """图像坐标 -> 控件坐标"""
+        return self.transform.map(point)
+    
+    def map_points(self, points: List[QPointF]) -> List[QPointF]:
+        return [self.transform.map(point) for point in points]
+    
     def draw_point(self, point: QPointF, pen: QPen, radius: int = 3):
         """绘制点"""
         if self.painter_label:
             self.painter_label.setPen(pen)
-            self.painter_label.drawEllipse(point, radius, radius)
+            self.painter_label.drawEllipse(self.map_point(point), radius, radius)
     
     def draw_hexagon(self, points: List[QPointF]):
         """绘制六边形"""
@@ -35,7 +50,7 @@ class Painter:
             self.painter_label.setPen(self.pen_hexagon)
             
             # 创建六边形多边形
-            polygon = QPolygonF(points[:6])
+            polygon = QPolygonF(self.map_points(points[:6]))
             self.painter_label.drawPolygon(polygon)
     
     def draw_text(self, point: QPointF, text: str):
@@ -45,7 +60,7 @@ class Painter:
             self.painter_label.setPen(self.pen_text)
             # 添加文本背景
             text_rect = self.painter_label.fontMetrics().boundingRect(text)
-            text_rect.moveCenter(point.toPoint())
+            text_rect.moveCenter(self.map_point(point).toPoint())
             text_rect.translate(0, -15)  # 向上偏移
             self.painter_label.fillRect(text_rect, Qt.black)
             self.painter_label.drawText(text_rect, Qt.AlignCenter, text)
@@ -54,7 +69,7 @@ class Painter:
         """绘制点的编号"""
         if self.painter_label:
             self.painter_label.setPen(self.pen_text)
-            for i, point in enumerate(points):
+            for i, point in enumerate(self.map_points(points)):
                 if i < 6:
                     # 六边形顶点编号
                     self.painter_label.drawText(point + QPointF(5, -5), str(i + 1))
@@ -115,14 +130,15 @@ class Painter:
             
             # 如果有足够的点，绘制部分六边形
             if len(current_points) >= 2:
+                mapped = self.map_points(current_points)
                 self.painter_label.setPen(self.pen_hexagon)
-                for i in range(min(6, len(current_points))):
+                for i in range(min(6, len(mapped))):
                     next_i = (i + 1) % 6
-                    if next_i < len(current_points):
-                        self.painter_label.drawLine(current_points[i], current_points[next_i])
-                    elif i == len(current_points) - 1 and len(current_points) == 6:
+                    if next_i < len(mapped):
+                        self.painter_label.drawLine(mapped[i], mapped[next_i])
+                    elif i == len(mapped) - 1 and len(mapped) == 6:
                         # 闭合六边形
-                        self.painter_label.drawLine(current_points[i], current_points[0])
+                        self.painter_label.drawLine(mapped[i], mapped[0])
             
             # 绘制点编号
             self.draw_point_numbers(current_points)
@@ -140,17 +156,17 @@ class Painter:
         hexagon_points = label.get_hexagon_points()
         if len(hexagon_points) >= 6:
             self.painter_label.setPen(self.pen_focus)
-            polygon = QPolygonF(hexagon_points)
+            polygon = QPolygonF(self.map_points(hexagon_points))
             self.painter_label.drawPolygon(polygon)
         
         # 绘制焦点游离点
         free_point = label.get_free_point()
         if free_point:
             self.painter_label.setPen(self.pen_focus)
-            self.painter_label.drawEllipse(free_point, 8, 8)
+            self.painter_label.drawEllipse(self.map_point(free_point), 8, 8)
         
         # 绘制焦点标记
-        for i, point in enumerate(label.label_points):
+        for i, point in enumerate(self.map_points(label.label_points)):
             self.painter_label.setPen(self.pen_focus)
             if i < 6:
                 self.painter_label.drawText(point + QPointF(10, -10), f"H{i + 1}")
@@ -0,0 +1,237 @@
+"""INT8 量化推理
+
+    python -m src.quantization --model model.onnx --images <图片文件夹> [--mode static]
+
+在本机生成模型的 INT8 量化版本（dynamic：只量化权重；static：用图片文件夹中的
+抽样图片校准激活值范围），并在同一批图片上比较 FP32 与 INT8 的每帧推理耗时和
+关键点平均误差，用于判断量化后的预标注是否足够准确。
+"""
+import argparse
+import importlib.util
+import os
+import sys
+import time
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+from .cache_utils import user_cache_dir
+
+# onnxruntime.quantization（依赖 onnx 包）导入较慢，只在生成量化模型时导入，
+# 图形界面、命令行和工作进程启动时不加载
+QUANTIZATION_AVAILABLE = (importlib.util.find_spec("onnx") is not None
+                          and importlib.util.find_spec("onnxruntime") is not None)
+
+QUANT_DYNAMIC = "dynamic"
+QUANT_STATIC = "static"
+QUANT_MODES = (QUANT_DYNAMIC, QUANT_STATIC)
+
+# 静态量化默认的校准图片数
+DEFAULT_CALIBRATION_SAMPLES = 64
+
+
+def sample_paths(paths: Sequence[str], count: int) -> List[str]:
+    """在整个列表中均匀抽样（覆盖不同会话和光照条件）"""
+    total = len(paths)
+    if total <= count:
+        return [paths[i] for i in range(total)]
+    step = total / count
+    return [paths[int(i * step)] for i in range(count)]
+
+
+def quantized_model_path(model_hash: str, mode: str) -> str:
+    return os.path.join(user_cache_dir("quantized"), f"{model_hash}-int8-{mode}.onnx")
+
+
+class _ImageCalibrationReader:
+    """按模型输入预处理校准图片，逐个提供给静态量化
+
+    实现 CalibrationDataReader 的 get_next 接口（按接口识别，不需要继承，避免提前导入量化工具）。
+    """
+
+    def __init__(self, model, image_paths: Sequence[str]):
+        self.model = model
+        self.paths = list(image_paths)
+        self.index = 0
+
+    def get_next(self):
+        while self.index < len(self.paths):
+            path = self.paths[self.index]
+            self.index += 1
+            img, _ = self.model.load_for_inference(path)
+            if img is None:
+                continue
+            batch = np.zeros(
+                (self.model.fixed_batch or 1, self.model.input_channels,
+                 self.model.input_height, self.model.input_width),
+                dtype=np.float32
+            )
+            self.model.preprocess_into(img, batch[0])
+            return {self.model.input_name: batch}
+        return None
+
+
+def quantize_model(model, mode: str, calibration_paths: Sequence[str] = (),
+                   force: bool = False) -> Optional[str]:
+    """生成已加载 FP32 模型（SmartAdd）的 INT8 版本，返回量化模型路径，失败返回 None
+
+    结果按模型哈希和量化方式缓存，force 为 True 时重新生成（例如换了校准图片）。
+    """
+    if mode not in QUANT_MODES:
+        print(f"Unknown quantization mode: {mode}")
+        return None
+    try:
+        from onnxruntime.quantization import QuantFormat, QuantType, quantize_dynamic, quantize_static
+    except ImportError:
+        print("Quantization requires the 'onnx' package")
+        return None
+
+    output_path = quantized_model_path(model.model_hash, mode)
+    if os.path.exists(output_path) and not force:
+        return output_path
+
+    tmp_path = f"{output_path}.tmp{os.getpid()}.onnx"
+    try:
+        if mode == QUANT_DYNAMIC:
+            quantize_dynamic(model.model_path, tmp_path, weight_type=QuantType.QInt8)
+        else:
+            if not calibration_paths:
+                print("Static quantization needs calibration images")
+                return None
+            quantize_static(
+                model.model_path, tmp_path,
+                _ImageCalibrationReader(model, calibration_paths),
+                quant_format=QuantFormat.QDQ,
+                activation_type=QuantType.QUInt8,
+                weight_type=QuantType.QInt8,
+            )
+        os.replace(tmp_path, output_path)
+    except Exception as e:
+        print(f"Quantization failed: {e}")
+        return None
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return output_path
+
+
+def _preprocess_samples(model, paths: Sequence[str]) -> Tuple[np.ndarray, List[Tuple[int, int]]]:
+    """预处理对比用的图片，返回 (输入张量 (N,C,H,W), 原图尺寸)"""
+    tensors = []
+    shapes = []
+    for path in paths:
+        img, shape = model.load_for_inference(path)
+        if img is None:
+            continue
+        tensor = np.empty((model.input_channels, model.input_height, model.input_width),
+                          dtype=np.float32)
+        model.preprocess_into(img, tensor)
+        tensors.append(tensor)
+        shapes.append(shape)
+    if not tensors:
+        return np.empty((0, model.input_channels, model.input_height, model.input_width),
+                        dtype=np.float32), []
+    return np.stack(tensors), shapes
+
+
+def _timed_predict(model, tensors: np.ndarray) -> Tuple[np.ndarray, float]:
+    """逐批推理，返回 (归一化坐标 (N,7,2), 每帧耗时毫秒)"""
+    step = model.inference_step()
+    points = []
+    start = time.perf_counter()
+    for begin in range(0, len(tensors), step):
+        chunk = tensors[begin:begin + step]
+        model.batch_buffer(len(chunk))[:] = chunk
+        for result in model.infer_batch(len(chunk)):
+            points.append(result[0] if result is not None else np.full((7, 2), np.nan, np.float32))
+    elapsed = time.perf_counter() - start
+    return np.stack(points), elapsed / max(len(tensors), 1) * 1000.0
+
+
+def compare_precision(fp32_model, int8_model, paths: Sequence[str], repeat: int = 3) -> dict:
+    """在同一批图片上比较 FP32 与 INT8：每帧耗时和关键点误差（原图像素）"""
+    tensors, shapes = _preprocess_samples(fp32_model, paths)
+    if not shapes:
+        return {}
+
+    fp32_points, int8_points = None, None
+    fp32_times, int8_times = [], []
+    for _ in range(repeat):
+        fp32_points, elapsed = _timed_predict(fp32_model, tensors)
+        fp32_times.append(elapsed)
+        int8_points, elapsed = _timed_predict(int8_model, tensors)
+        int8_times.append(elapsed)
+
+    # 归一化坐标换算为原图像素后计算每个点的欧氏距离
+    scale = np.array([[w, h] for h, w in shapes], dtype=np.float64)[:, np.newaxis, :]
+    diff = (fp32_points.astype(np.float64) - int8_points.astype(np.float64)) * scale
+    errors = np.sqrt((diff ** 2).sum(axis=2))
+    return {
+        'images': len(shapes),
+        'fp32_ms': min(fp32_times),
+        'int8_ms': min(int8_times),
+        'mean_error_px': float(np.nanmean(errors)),
+        'p95_error_px': float(np.nanpercentile(errors, 95)),
+        'max_error_px': float(np.nanmax(errors)),
+    }
+
+
+def format_report(report: dict) -> str:
+    if not report:
+        return "没有可用于比较的图片"
+    speedup = report['fp32_ms'] / report['int8_ms'] if report['int8_ms'] > 0 else 0.0
+    return "\n".join([
+        f"对比图片: {report['images']} 张",
+        f"FP32 每帧: {report['fp32_ms']:.3f} ms",
+        f"INT8 每帧: {report['int8_ms']:.3f} ms（{speedup:.2f}x）",
+        f"关键点误差: 平均 {report['mean_error_px']:.2f} px，"
+        f"P95 {report['p95_error_px']:.2f} px，最大 {report['max_error_px']:.2f} px",
+    ])
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """命令行入口"""
+    from .batch import collect_images
+    from .model import SmartAdd, ONNXRUNTIME_AVAILABLE
+
+    parser = argparse.ArgumentParser(prog="python -m src.quantization",
+                                     description="生成 INT8 量化模型并比较速度和精度")
+    parser.add_argument("--model", required=True, help="FP32 ONNX 模型文件")
+    parser.add_argument("--images", nargs="+", required=True,
+                        help="图片文件夹、通配符或图片列表txt（用于校准和对比）")
+    parser.add_argument("--recursive", action="store_true", help="递归扫描子文件夹")
+    parser.add_argument("--mode", choices=QUANT_MODES, default=QUANT_DYNAMIC,
+                        help="dynamic 只量化权重（默认），static 用抽样图片校准激活值")
+    parser.add_argument("--samples", type=int, default=DEFAULT_CALIBRATION_SAMPLES,
+                        help=f"校准和对比的抽样图片数（默认 {DEFAULT_CALIBRATION_SAMPLES}）")
+    parser.add_argument("--force", action="store_true", help="重新生成量化模型")
+    args = parser.parse_args(argv)
+
+    if not ONNXRUNTIME_AVAILABLE or not QUANTIZATION_AVAILABLE:
+        print("Error: 需要安装 onnxruntime 和 onnx")
+        return 1
+
+    paths = sample_paths(collect_images(args.images, args.recursive), args.samples)
+    if not paths:
+        print("Error: 没有找到支持的图片")
+        return 1
+
+    fp32_model = SmartAdd()
+    fp32_model.use_prediction_cache = False
+    if not fp32_model.set_model(args.model):
+        return 1
+    quantized = quantize_model(fp32_model, args.mode, paths, force=args.force)
+    if quantized is None:
+        return 1
+    print(f"量化模型: {quantized}")
+
+    int8_model = SmartAdd()
+    int8_model.use_prediction_cache = False
+    int8_model.quantization = args.mode
+    if not int8_model.set_model(args.model):
+        return 1
+
+    print(format_report(compare_precision(fp32_model, int8_model, paths)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
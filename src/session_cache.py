@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Tuple
+from .cache_utils import user_cache_dir, file_hash
+from .session_tuner import cpu_model, make_session_options
+
+try:
+    import onnxruntime as ort
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+
+# 进程内保留的会话数（重新配置时同一模型直接复用）
+MAX_LIVE_SESSIONS = 2
+
+_hash_memo: Dict[Tuple[str, int, int], str] = {}
+_live_sessions: "OrderedDict[str, object]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def model_file_hash(path: str) -> str:
+    """模型文件哈希，文件未变化（大小、mtime 相同）时不重新计算"""
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    with _lock:
+        cached = _hash_memo.get(key)
+    if cached is None:
+        cached = file_hash(path)
+        with _lock:
+            _hash_memo[key] = cached
+    return cached
+
+
+def optimized_model_path(model_hash: str) -> str:
+    """优化后模型的缓存路径
+
+    ORT_ENABLE_ALL 的部分优化（如内存布局转换）与CPU相关，因此按
+    模型哈希、CPU型号和ORT版本区分。
+    """
+    machine = hashlib.sha1(cpu_model().encode('utf-8')).hexdigest()[:12]
+    name = f"{model_hash}-{machine}-ort{ort.__version__}.onnx"
+    return os.path.join(user_cache_dir("optimized"), name)
+
+
+def _session_key(model_hash: str, config: dict, use_optimized_cache: bool) -> str:
+    return f"{model_hash}|{json.dumps(config, sort_keys=True)}|{int(use_optimized_cache)}"
+
+
+def _build_session(model_path: str, model_hash: str, config: dict, use_optimized_cache: bool):
+    """创建会话：已有优化后的模型时直接加载并跳过图优化，否则优化后保存一份"""
+    providers = ['CPUExecutionProvider']
+    if not use_optimized_cache:
+        return ort.InferenceSession(model_path, sess_options=make_session_options(config),
+                                    providers=providers)
+
+    optimized_path = optimized_model_path(model_hash)
+    if os.path.exists(optimized_path):
+        session_options = make_session_options(config)
+        session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+        try:
+            return ort.InferenceSession(optimized_path, sess_options=session_options,
+                                        providers=providers)
+        except Exception as e:
+            print(f"Failed to load optimized model, rebuilding: {e}")
+            try:
+                os.remove(optimized_path)
+            except OSError:
+                pass
+
+    # 先写入临时文件，创建成功后再重命名，避免中断时留下不完整的模型
+    tmp_path = f"{optimized_path}.tmp{os.getpid()}"
+    session_options = make_session_options(config)
+    session_options.optimized_model_filepath = tmp_path
+    session = ort.InferenceSession(model_path, sess_options=session_options, providers=providers)
+    try:
+        os.replace(tmp_path, optimized_path)
+    except OSError as e:
+        print(f"Failed to save optimized model: {e}")
+    return session
+
+
+def get_session(model_path: str, model_hash: str, config: dict, use_optimized_cache: bool = True):
+    """获取推理会话：同一模型和配置的会话在进程内复用"""
+    key = _session_key(model_hash, config, use_optimized_cache)
+    with _lock:
+        session = _live_sessions.get(key)
+        if session is not None:
+            _live_sessions.move_to_end(key)
+            return session
+
+    session = _build_session(model_path, model_hash, config, use_optimized_cache)
+    with _lock:
+        _live_sessions[key] = session
+        while len(_live_sessions) > MAX_LIVE_SESSIONS:
+            _live_sessions.popitem(last=False)
+    return session
+
+
+def clear_sessions():
+    """释放进程内保留的会话"""
+    with _lock:
+        _live_sessions.clear()
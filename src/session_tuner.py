@@ -0,0 +1,232 @@
+"""ONNX Runtime 会话自动调优
+
+    python -m src.session_tuner --model model.onnx
+
+用模型输入形状的随机数据测试不同的线程数、执行模式、内存设置和批次大小，
+选出每帧耗时最短的配置，按 (模型哈希, CPU型号) 保存到用户缓存目录，
+之后加载同一模型时 SmartAdd.set_model 直接使用。
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from .cache_utils import user_cache_dir, atomic_write_text, file_hash
+
+try:
+    import onnxruntime as ort
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+
+TUNING_FILE_NAME = "session_tuning.json"
+
+# 未调优时的会话配置（与原先固定的设置一致）
+DEFAULT_SESSION_CONFIG = {
+    'intra_op_threads': 2,
+    'inter_op_threads': 0,
+    'execution_mode': 'sequential',
+    'enable_cpu_mem_arena': True,
+    'enable_mem_pattern': False,
+    'batch_size': 64,
+}
+
+
+def cpu_model() -> str:
+    """CPU型号及逻辑核心数，用于区分不同机器的调优结果"""
+    name = ""
+    if sys.platform.startswith("linux"):
+        try:
+            with open("/proc/cpuinfo", "r", encoding="utf-8", errors="ignore") as f:
+                for line in f:
+                    if line.startswith("model name"):
+                        name = line.split(":", 1)[1].strip()
+                        break
+        except OSError:
+            pass
+    if not name:
+        name = platform.processor() or platform.machine()
+    return f"{name} x{os.cpu_count() or 1}"
+
+
+def tuning_key(model_hash: str) -> str:
+    version = ort.__version__ if ONNXRUNTIME_AVAILABLE else "none"
+    return f"{model_hash}|{cpu_model()}|ort-{version}"
+
+
+def _tuning_path() -> str:
+    return os.path.join(user_cache_dir("tuning"), TUNING_FILE_NAME)
+
+
+def _load_all() -> Dict[str, dict]:
+    try:
+        with open(_tuning_path(), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def load_tuned_config(model_hash: str) -> Optional[dict]:
+    """读取保存的调优结果，没有时返回 None"""
+    config = _load_all().get(tuning_key(model_hash))
+    if not isinstance(config, dict):
+        return None
+    return {**DEFAULT_SESSION_CONFIG, **config}
+
+
+def save_tuned_config(model_hash: str, config: dict):
+    """保存调优结果"""
+    data = _load_all()
+    data[tuning_key(model_hash)] = config
+    try:
+        atomic_write_text(_tuning_path(), json.dumps(data, ensure_ascii=False, indent=2))
+    except OSError as e:
+        print(f"Failed to save tuning result: {e}")
+
+
+def make_session_options(config: dict) -> "ort.SessionOptions":
+    """按配置创建会话选项"""
+    session_options = ort.SessionOptions()
+    session_options.intra_op_num_threads = config['intra_op_threads']
+    session_options.inter_op_num_threads = config['inter_op_threads']
+    session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if config['execution_mode'] == 'parallel':
+        session_options.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+    else:
+        session_options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    session_options.add_session_config_entry("session.intra_op.allow_spinning", "0")
+    session_options.enable_cpu_mem_arena = config['enable_cpu_mem_arena']
+    session_options.enable_mem_pattern = config['enable_mem_pattern']
+    return session_options
+
+
+def _synthetic_input(session, batch: int) -> Tuple[str, np.ndarray]:
+    """按模型输入形状生成随机输入（符号维度取 batch）"""
+    model_input = session.get_inputs()[0]
+    shape = [dim if isinstance(dim, int) and dim > 0 else batch for dim in model_input.shape]
+    data = np.random.default_rng(0).random(shape, dtype=np.float32)
+    return model_input.name, data
+
+
+def measure_config(model_path: str, config: dict, min_time: float = 0.3,
+                   max_runs: int = 200) -> float:
+    """测量一种配置的每帧耗时（毫秒），失败时返回无穷大"""
+    try:
+        session = ort.InferenceSession(
+            model_path, sess_options=make_session_options(config),
+            providers=['CPUExecutionProvider']
+        )
+        name, data = _synthetic_input(session, config['batch_size'])
+        frames_per_run = data.shape[0]
+        for _ in range(3):
+            session.run(None, {name: data})
+
+        runs = 0
+        start = time.perf_counter()
+        while runs < max_runs:
+            session.run(None, {name: data})
+            runs += 1
+            if time.perf_counter() - start >= min_time:
+                break
+        elapsed = time.perf_counter() - start
+        return elapsed / (runs * frames_per_run) * 1000.0
+    except Exception as e:
+        print(f"Config failed {config}: {e}")
+        return float('inf')
+
+
+def _thread_candidates() -> List[int]:
+    cores = os.cpu_count() or 1
+    return sorted({n for n in (1, 2, 4, 8, cores) if n <= cores})
+
+
+def tune(model_path: str, dynamic_batch: bool = True, min_time: float = 0.3,
+         verbose: bool = True) -> Tuple[dict, List[Tuple[dict, float]]]:
+    """逐组搜索最佳配置，返回 (最佳配置, 全部测量结果)
+
+    依次调整线程数与执行模式、内存设置、批次大小，每组在前一组的最佳结果上搜索，
+    避免完整网格的组合爆炸。固定批次维度的模型不调整批次大小。
+    """
+    results: List[Tuple[dict, float]] = []
+    measured: Dict[str, float] = {}
+
+    def run(config: dict) -> float:
+        key = json.dumps(config, sort_keys=True)
+        if key not in measured:
+            measured[key] = measure_config(model_path, config, min_time)
+            results.append((dict(config), measured[key]))
+            if verbose:
+                print(f"{_describe(config)}  {measured[key]:.3f} ms/帧", flush=True)
+        return measured[key]
+
+    def best_of(candidates: List[dict]) -> dict:
+        return min(candidates, key=run)
+
+    best = dict(DEFAULT_SESSION_CONFIG)
+    if not dynamic_batch:
+        best['batch_size'] = 1
+
+    # 线程数与执行模式
+    candidates = [dict(best, intra_op_threads=n, inter_op_threads=1, execution_mode='sequential')
+                  for n in _thread_candidates()]
+    candidates += [dict(best, intra_op_threads=n, inter_op_threads=2, execution_mode='parallel')
+                   for n in _thread_candidates()]
+    best = best_of(candidates)
+
+    # 内存设置
+    best = best_of([dict(best, enable_cpu_mem_arena=arena, enable_mem_pattern=pattern)
+                    for arena in (True, False) for pattern in (True, False)])
+
+    # 批次大小
+    if dynamic_batch:
+        best = best_of([dict(best, batch_size=size) for size in (1, 8, 16, 32, 64, 128)])
+
+    return best, results
+
+
+def _describe(config: dict) -> str:
+    return (f"intra={config['intra_op_threads']} inter={config['inter_op_threads']} "
+            f"{config['execution_mode']} arena={int(config['enable_cpu_mem_arena'])} "
+            f"pattern={int(config['enable_mem_pattern'])} batch={config['batch_size']}")
+
+
+def has_dynamic_batch(model_path: str) -> bool:
+    """输入的批次维度是否为动态"""
+    session = ort.InferenceSession(model_path, providers=['CPUExecutionProvider'])
+    batch_dim = session.get_inputs()[0].shape[0] if session.get_inputs()[0].shape else 1
+    return not (isinstance(batch_dim, int) and batch_dim > 0)
+
+
+def tune_and_save(model_path: str, verbose: bool = True) -> dict:
+    """调优并保存结果"""
+    config, _ = tune(model_path, has_dynamic_batch(model_path), verbose=verbose)
+    save_tuned_config(file_hash(model_path), config)
+    return config
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(prog="python -m src.session_tuner",
+                                     description="ONNX Runtime 会话自动调优")
+    parser.add_argument("--model", required=True, help="ONNX 模型文件")
+    args = parser.parse_args(argv)
+
+    if not ONNXRUNTIME_AVAILABLE:
+        print("Error: 需要安装 onnxruntime")
+        return 1
+    if not os.path.isfile(args.model):
+        print(f"Error: 模型文件不存在: {args.model}")
+        return 1
+
+    print(f"CPU: {cpu_model()}")
+    config = tune_and_save(args.model)
+    print(f"最佳配置: {_describe(config)}，已保存")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
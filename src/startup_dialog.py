@@ -4,6 +4,7 @@ from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QPushButton,
                             QTextEdit, QCheckBox)
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont
+from .workers import FolderScanThread
 
 class StartupDialog(QDialog):
     """启动对话框"""
@@ -13,6 +14,9 @@ class StartupDialog(QDialog):
         self.image_folder = ""
         self.dataset_folder = ""
         self.model_file = ""
+        self.scanning_folder = ""
+        self.scanned_count = 0
+        self.scan_thread = None
         self.init_ui()
         
     def init_ui(self):
@@ -130,6 +134,11 @@ class StartupDialog(QDialog):
         folder_layout.addWidget(self.folder_label, 1)
         required_layout.addLayout(folder_layout)
         
+        # 是否递归扫描子文件夹（按采集会话分目录的数据集）
+        self.recursive_checkbox = QCheckBox("📂 包含子文件夹")
+        self.recursive_checkbox.toggled.connect(self.on_recursive_toggled)
+        required_layout.addWidget(self.recursive_checkbox)
+        
         # 数据集保存文件夹选择
         dataset_layout = QHBoxLayout()
         self.dataset_button = QPushButton("💾 选择数据集保存文件夹")
@@ -256,35 +265,79 @@ class StartupDialog(QDialog):
         print(f"用户选择的图片文件夹: {folder}")
         
         if folder:
-            # 检查文件夹中是否有图片
-            image_extensions = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif']
-            image_files = []
-            
-            try:
-                for file_name in os.listdir(folder):
-                    if any(file_name.lower().endswith(ext) for ext in image_extensions):
-                        image_files.append(file_name)
-                print(f"找到 {len(image_files)} 张图片")
-            except Exception as e:
-                print(f"读取文件夹失败: {e}")
-                QMessageBox.warning(self, "错误", f"无法访问文件夹：{str(e)}")
-                return
-            
-            if not image_files:
-                print("文件夹中没有找到图片")
-                QMessageBox.warning(
-                    self, "警告", 
-                    "所选文件夹中没有找到支持的图片文件！\n\n"
-                    "支持的格式：JPG, PNG, BMP, TIFF"
-                )
-                return
-            
-            self.image_folder = folder
-            folder_name = os.path.basename(folder)
-            self.folder_label.setText(f"✅ 已选择: {folder_name}\n({len(image_files)} 张图片)")
-            self.folder_label.setStyleSheet("color: #48dbfb;")
-            print(f"图片文件夹设置为: {self.image_folder}")
-            self.update_ok_button()
+            self.start_folder_scan(folder)
+    
+    def start_folder_scan(self, folder: str):
+        """后台扫描文件夹中的图片（结果写入列表缓存，主窗口可直接复用）"""
+        self.stop_folder_scan()
+        self.image_folder = ""
+        self.scanning_folder = folder
+        self.scanned_count = 0
+        self.update_ok_button()
+        
+        folder_name = os.path.basename(folder)
+        self.folder_label.setText(f"⏳ 正在扫描: {folder_name}")
+        self.folder_label.setStyleSheet("color: #feca57;")
+        
+        self.scan_thread = FolderScanThread(folder, self.recursive_checkbox.isChecked(), self)
+        self.scan_thread.chunk_ready.connect(self.on_scan_chunk)
+        self.scan_thread.scan_finished.connect(self.on_scan_finished)
+        self.scan_thread.scan_failed.connect(self.on_scan_failed)
+        self.scan_thread.start()
+    
+    def stop_folder_scan(self):
+        """停止正在进行的扫描"""
+        if self.scan_thread is not None:
+            self.scan_thread.chunk_ready.disconnect()
+            self.scan_thread.scan_finished.disconnect()
+            self.scan_thread.scan_failed.disconnect()
+            self.scan_thread.cancel()
+            self.scan_thread.wait()
+            self.scan_thread = None
+    
+    def on_scan_chunk(self, names):
+        """扫描进度"""
+        self.scanned_count += len(names)
+        folder_name = os.path.basename(self.scanning_folder)
+        self.folder_label.setText(f"⏳ 正在扫描: {folder_name}\n(已找到 {self.scanned_count} 张图片)")
+    
+    def on_scan_finished(self, count, already_sorted):
+        """扫描完成"""
+        self.scan_thread = None
+        folder = self.scanning_folder
+        print(f"找到 {count} 张图片")
+        
+        if count == 0:
+            print("文件夹中没有找到图片")
+            self.folder_label.setText("未选择图片文件夹")
+            self.folder_label.setStyleSheet("color: #ff6b6b; font-style: italic;")
+            QMessageBox.warning(
+                self, "警告", 
+                "所选文件夹中没有找到支持的图片文件！\n\n"
+                "支持的格式：JPG, PNG, BMP, TIFF"
+            )
+            return
+        
+        self.image_folder = folder
+        folder_name = os.path.basename(folder)
+        self.folder_label.setText(f"✅ 已选择: {folder_name}\n({count} 张图片)")
+        self.folder_label.setStyleSheet("color: #48dbfb;")
+        print(f"图片文件夹设置为: {self.image_folder}")
+        self.update_ok_button()
+    
+    def on_scan_failed(self, message):
+        """扫描失败"""
+        self.scan_thread = None
+        print(f"读取文件夹失败: {message}")
+        self.folder_label.setText("未选择图片文件夹")
+        self.folder_label.setStyleSheet("color: #ff6b6b; font-style: italic;")
+        QMessageBox.warning(self, "错误", f"无法访问文件夹：{message}")
+    
+    def on_recursive_toggled(self, checked: bool):
+        """切换是否包含子文件夹后重新扫描"""
+        folder = self.image_folder or self.scanning_folder
+        if folder:
+            self.start_folder_scan(folder)
     
     def select_model_file(self):
         """选择模型文件"""
@@ -315,7 +368,13 @@ class StartupDialog(QDialog):
             'image_folder': self.image_folder,
             'dataset_folder': self.dataset_folder,
             'model_file': self.model_file,
+            'recursive': self.recursive_checkbox.isChecked(),
             'auto_save': self.auto_save_checkbox.isChecked()
         }
         print(f"返回配置: {config}")
-        return config
\ No newline at end of file
+        return config
+    
+    def done(self, result):
+        """关闭对话框前停止扫描线程"""
+        self.stop_folder_scan()
+        super().done(result)
\ No newline at end of file
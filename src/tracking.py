@@ -0,0 +1,205 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence, Tuple
+import cv2
+import numpy as np
+from .label_store import LabelWriter
+from .model import SmartAdd
+from .prediction_cache import PredictionCache
+
+# 默认每隔多少帧用模型检测一次（关键帧）
+DEFAULT_KEYFRAME_INTERVAL = 8
+# 前向-后向跟踪误差上限（跟踪图像像素），超过即认为跟踪不可靠，改用模型检测
+DEFAULT_MAX_TRACK_ERROR = 1.0
+
+_LK_PARAMS = dict(
+    winSize=(21, 21),
+    maxLevel=3,
+    criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 30, 0.01),
+)
+
+
+def to_gray(img: np.ndarray) -> np.ndarray:
+    """光流使用的单通道图像"""
+    return img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+
+def propagate_points(prev_gray: np.ndarray, next_gray: np.ndarray,
+                     points: np.ndarray) -> Tuple[Optional[np.ndarray], float]:
+    """金字塔 Lucas-Kanade 光流把点从上一帧传播到下一帧
+
+    points 为像素坐标 (N,2)。返回 (新坐标, 前向-后向误差最大值)；
+    任一点跟踪失败或移出图像时返回 (None, inf)。
+    """
+    prev_pts = points.reshape(-1, 1, 2).astype(np.float32)
+    next_pts, status, _ = cv2.calcOpticalFlowPyrLK(prev_gray, next_gray, prev_pts, None, **_LK_PARAMS)
+    if next_pts is None or not status.all():
+        return None, float('inf')
+    back_pts, back_status, _ = cv2.calcOpticalFlowPyrLK(next_gray, prev_gray, next_pts, None, **_LK_PARAMS)
+    if back_pts is None or not back_status.all():
+        return None, float('inf')
+
+    next_pts = next_pts.reshape(-1, 2)
+    height, width = next_gray.shape[:2]
+    if ((next_pts < 0) | (next_pts >= (width, height))).any():
+        return None, float('inf')
+    error = float(np.sqrt(((back_pts.reshape(-1, 2) - points.reshape(-1, 2)) ** 2).sum(axis=1)).max())
+    return next_pts, error
+
+
+class PointTracker:
+    """逐帧跟踪标签点，决定哪些帧需要用模型检测
+
+    坐标以归一化形式 (K,7,2) 保存，跟踪时换算到当前跟踪图像的像素坐标，
+    因此缩小解码的图像同样适用。序列标识（所在文件夹和原图尺寸）变化时重新检测。
+    """
+
+    def __init__(self, keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL,
+                 max_error: float = DEFAULT_MAX_TRACK_ERROR):
+        self.keyframe_interval = max(1, keyframe_interval)
+        self.max_error = max_error
+        self.reset()
+
+    def reset(self):
+        self.prev_gray: Optional[np.ndarray] = None
+        self.prev_points: Optional[np.ndarray] = None
+        self.sequence = None
+        self.since_keyframe = 0
+
+    def track(self, gray: np.ndarray, sequence) -> Optional[np.ndarray]:
+        """跟踪到新的一帧，返回归一化坐标；需要模型检测（关键帧）时返回 None"""
+        if (self.prev_points is None or sequence != self.sequence
+                or self.since_keyframe + 1 >= self.keyframe_interval
+                or gray.shape != self.prev_gray.shape):
+            return None
+
+        height, width = gray.shape[:2]
+        scale = np.array([width, height], dtype=np.float32)
+        next_pts, error = propagate_points(self.prev_gray, gray, self.prev_points.reshape(-1, 2) * scale)
+        if next_pts is None or error > self.max_error:
+            return None
+
+        points = (next_pts / scale).reshape(self.prev_points.shape)
+        self.prev_gray = gray
+        self.prev_points = points
+        self.since_keyframe += 1
+        return points
+
+    def set_keyframe(self, gray: np.ndarray, points: Optional[np.ndarray], sequence):
+        """记录模型检测的结果，后续帧从这里开始跟踪"""
+        if points is None:
+            self.reset()
+            return
+        self.prev_gray = gray
+        self.prev_points = np.asarray(points, dtype=np.float32)
+        self.sequence = sequence
+        self.since_keyframe = 0
+
+
+class TrackingDetector:
+    """关键帧检测 + 光流跟踪的批量检测
+
+    连续的眼部视频帧之间变化很小：只在关键帧（每 keyframe_interval 帧，
+    或跟踪误差过大、换到另一段序列时）运行模型，其余帧用光流把上一帧的点
+    传播过来。必须按顺序处理，因此只有读取和解码在后台线程中预取。
+    run 的参数和返回值与 DetectionPipeline.run 相同。
+    """
+
+    def __init__(self, model: SmartAdd, label_folder: str,
+                 keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL,
+                 max_error: float = DEFAULT_MAX_TRACK_ERROR,
+                 prefetch: int = 8, report_interval: int = 32):
+        self.model = model
+        self.label_folder = label_folder
+        self.tracker = PointTracker(keyframe_interval, max_error)
+        self.prefetch = max(1, prefetch)
+        self.report_interval = max(1, report_interval)
+        self.keyframes = 0
+        self.tracked = 0
+
+    def _keyframe(self, path: str, img: np.ndarray, shape: Tuple[int, int],
+                  cache, model_key: str) -> Optional[np.ndarray]:
+        """用模型检测关键帧（优先使用缓存结果）"""
+        image_key = PredictionCache.image_key(path) if cache is not None else None
+        if image_key is not None:
+            cached = cache.get(model_key, image_key)
+            if cached is not None:
+                return cached[0]
+
+        self.model.preprocess_into(img, self.model.batch_buffer(1)[0])
+        points = self.model.infer_batch(1)[0]
+        if points is not None and image_key is not None:
+            cache.put(model_key, image_key, (points, shape))
+        return points
+
+    def run(self, paths: Sequence[str],
+            on_progress: Optional[Callable[[int, List[str]], None]] = None,
+            cancel_event: Optional[threading.Event] = None,
+            running_event: Optional[threading.Event] = None) -> Tuple[int, int]:
+        """按顺序检测，返回 (检测成功数, 已处理数)"""
+        writer = LabelWriter(self.label_folder)
+        self.tracker.reset()
+        self.keyframes = 0
+        self.tracked = 0
+        cache = self.model.prediction_cache()
+        model_key = self.model.prediction_key()
+
+        detected = 0
+        processed = 0
+        pending_count = 0
+        labels: List[Tuple[str, np.ndarray]] = []
+
+        def flush():
+            nonlocal detected, pending_count, labels
+            written = writer.write_many(labels)
+            detected += len(written)
+            if on_progress is not None and pending_count:
+                on_progress(pending_count, written)
+            pending_count = 0
+            labels = []
+
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="tracking-read") as pool:
+            loads = deque()
+            next_index = 0
+            while True:
+                while next_index < len(paths) and len(loads) < self.prefetch:
+                    path = paths[next_index]
+                    loads.append((path, pool.submit(self.model.load_for_inference, path)))
+                    next_index += 1
+                if not loads:
+                    break
+                if running_event is not None:
+                    running_event.wait()
+                if cancel_event is not None and cancel_event.is_set():
+                    for _, future in loads:
+                        future.cancel()
+                    break
+
+                path, future = loads.popleft()
+                img, shape = future.result()
+                processed += 1
+                pending_count += 1
+                if img is None:
+                    print(f"Failed to load image: {path}")
+                    self.tracker.reset()
+                else:
+                    gray = to_gray(img)
+                    sequence = (os.path.dirname(path), shape)
+                    points = self.tracker.track(gray, sequence)
+                    if points is not None:
+                        self.tracked += 1
+                    else:
+                        points = self._keyframe(path, img, shape, cache, model_key)
+                        self.tracker.set_keyframe(gray, points, sequence)
+                        self.keyframes += 1
+                    if points is not None:
+                        labels.append((path, points))
+                if pending_count >= self.report_interval:
+                    flush()
+        flush()
+        return detected, processed
+
+    def summary(self) -> str:
+        return f"关键帧（模型检测）: {self.keyframes}，光流跟踪: {self.tracked}"
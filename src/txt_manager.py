@@ -1,7 +1,12 @@
 import os
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
+import numpy as np
 from PyQt5.QtCore import QPointF
 from .label_manager import OneLabel
+from .label_io import read_label_file
+from .label_store import LabelStore, open_label_store
+from .label_saver import SaveItem, SaveKey, get_label_saver
+from .label_index import find_label_index, open_label_index
 
 class AllLabel:
     """所有标签管理类"""
@@ -14,6 +19,15 @@ class AllLabel:
         self.image_height = 0
         self.folder_path = ""
         self.image_name = ""
+        # 数据集有标签库（labels.sqlite3）时读写标签库，否则读写 labels/<图片名>.txt
+        self.store: Optional[LabelStore] = None
+        # 修改代数：增删标签时加一；与各标签自己的代数一起判断当前图片是否被修改
+        self.generation = 0
+        self._saved_state: Tuple = ()
+        # 当前图片在磁盘上（或已排队保存）的归一化坐标，None 表示与磁盘不一致
+        self._saved_points: Optional[np.ndarray] = np.empty((0, 7, 2))
+        # 整个数据集中修改过但尚未保存的图片（未开启自动保存时切换图片留下的修改）
+        self.dirty: Dict[SaveKey, SaveItem] = {}
     
     def set_point(self, point: QPointF) -> bool:
         """设置点"""
@@ -24,6 +38,7 @@ class AllLabel:
         if self.label_now.success():
             self.labels_in_pic.append(self.label_now)
             self.label_now = OneLabel(7)
+            self.mark_modified()
             return True
         return False
     
@@ -34,6 +49,7 @@ class AllLabel:
         """重置所有标签"""
         self.labels_in_pic.clear()
         self.label_now.reset()
+        self.mark_modified()
     
     def set_num(self, num: int):
         """设置点数（固定为7，此方法保持兼容性）"""
@@ -45,9 +61,14 @@ class AllLabel:
         self.image_height = height
         self.image_width = width
     
+    def has_size(self) -> bool:
+        """是否已知图片尺寸（图片无法解码或尚未加载时未知，无法换算归一化坐标）"""
+        return self.image_width > 0 and self.image_height > 0
+    
     def set_label_path(self, folder_path: str):
         """设置标签文件夹路径"""
         self.folder_path = os.path.join(folder_path, "labels")
+        self.store = open_label_store(self.folder_path)
         return True
     
     def empty(self) -> bool:
@@ -59,72 +80,157 @@ class AllLabel:
             return
         elif self.labels_in_pic:
             self.labels_in_pic.pop()
+            self.mark_modified()
     
     def erase_focus(self, index: int):
         """删除指定索引的标签"""
         if 0 <= index < len(self.labels_in_pic):
             self.labels_in_pic.pop(index)
+            self.mark_modified()
     
     def set_image_name(self, name: str):
-        """设置图片名称并读取对应的txt文件"""
+        """设置图片名称并读取对应的标注（未保存的修改、尚未写完的保存、标签库或txt文件）"""
         self.image_name = name
-        if self.folder_path:
+        dirty = self.dirty.get(self.key())
+        if dirty is not None:
+            self.set_normalized_points(dirty[1])
+            self.mark_saved(None)
+            return
+        pending = get_label_saver().pending(self.folder_path, name) if self.folder_path else None
+        if pending is not None:
+            self.set_normalized_points(pending)
+        elif self.store is not None:
+            points = self.store.get(name)
+            if points is not None:
+                self.set_normalized_points(points)
+        elif self.folder_path:
+            # 标签索引建好后，索引中没有的图片不必再检查文件是否存在
+            index = find_label_index(self.folder_path)
             txt_path = os.path.join(self.folder_path, f"{name}.txt")
-            if os.path.exists(txt_path):
+            if index is None:
+                has_labels = os.path.exists(txt_path)
+            else:
+                # 没有完整标签的项（空文件、只有未标完的标签）不必读取
+                entry = index.get(name)
+                has_labels = entry is not None and entry[0] > 0
+            if has_labels:
                 self.read_data_from_txt(txt_path)
+        self.mark_saved(self.normalized_points())
     
     def read_data_from_txt(self, path: str):
         """从txt文件读取标注数据"""
         self.labels_in_pic.clear()
         
         try:
-            with open(path, 'r') as f:
-                for line in f:
-                    parts = line.strip().split()
-                    if len(parts) != 14:  # 7个点 × 2个坐标 = 14个数值
-                        continue
-                    
-                    label = OneLabel(7)
-                    
-                    # 读取7个点的坐标
-                    for i in range(7):
-                        x = float(parts[i * 2]) * self.image_width
-                        y = float(parts[i * 2 + 1]) * self.image_height
-                        label.set_point(QPointF(x, y))
-                    
-                    self.labels_in_pic.append(label)
+            points = read_label_file(path)
         except Exception as e:
             print(f"Error reading txt file {path}: {e}")
-    
-    def save_as_txt(self):
-        """保存为txt文件"""
-        if not self.folder_path or not self.image_name:
-            print("Error: path not set")
             return
+        if points is not None:
+            self.set_normalized_points(points)
+    
+    def set_normalized_points(self, points: np.ndarray):
+        """用归一化坐标 (K,7,2) 替换当前图片的标签"""
+        scale = np.array([self.image_width, self.image_height], dtype=np.float64)
+        self.labels_in_pic[:] = [OneLabel.from_points(coords) for coords in (points * scale).tolist()]
+        self.mark_modified()
+    
+    def normalized_points(self) -> np.ndarray:
+        """已完成标签的归一化坐标 (K,7,2)，图片尺寸未知时为空"""
+        if not self.has_size():
+            return np.empty((0, 7, 2))
+        points = [
+            [(point.x() / self.image_width, point.y() / self.image_height)
+             for point in label.label_points]
+            for label in self.labels_in_pic
+            if len(label.label_points) == 7  # 确保有7个点
+        ]
+        return np.array(points, dtype=np.float64).reshape(-1, 7, 2)
+    
+    def unfinished_count(self) -> int:
+        """未标完（少于7个点）的标签数，这些标签不会写入文件"""
+        unfinished = sum(1 for label in self.labels_in_pic if len(label.label_points) != 7)
+        return unfinished + (1 if 0 < self.label_now.size() < 7 else 0)
+    
+    def key(self) -> SaveKey:
+        return (self.folder_path, self.image_name)
+    
+    def mark_modified(self):
+        """记录一次修改（直接修改标签列表或点坐标后调用）"""
+        self.generation += 1
+    
+    def _state(self) -> Tuple:
+        return (self.generation, tuple((id(label), label.generation) for label in self.labels_in_pic))
+    
+    def mark_saved(self, points: Optional[np.ndarray]):
+        """记录磁盘上的标注（points 为已保存的坐标，None 表示当前标注与磁盘不一致）"""
+        self._saved_points = points
+        self._saved_state = self._state()
+    
+    def is_modified(self) -> bool:
+        """当前图片的标注是否与磁盘不同
         
-        # 确保labels文件夹存在
-        os.makedirs(self.folder_path, exist_ok=True)
+        代数没有变化时直接返回 False；有变化时再按保存精度（6位小数）比较坐标，
+        例如重新检测得到相同的结果、点拖动后又放回原处都不算修改。
+        图片尺寸未知时标签无法换算，视为未修改，不会写入（以免删除磁盘上的标签）。
+        """
+        if not self.has_size():
+            return False
+        if self._saved_points is None:
+            return True
+        if self._state() == self._saved_state:
+            return False
+        points = self.normalized_points()
+        if (points.shape == self._saved_points.shape
+                and np.array_equal(np.round(points, 6), np.round(self._saved_points, 6))):
+            self._saved_state = self._state()
+            return False
+        return True
+    
+    def stash(self):
+        """离开当前图片但不保存时，把修改记入数据集的未保存集合，之后可以一起保存"""
+        if self.folder_path and self.image_name and self.is_modified():
+            self.dirty[self.key()] = (self.store, self.normalized_points())
+    
+    def dirty_count(self) -> int:
+        """未保存的图片数（包括当前图片）"""
+        current = self.folder_path and self.image_name and self.is_modified()
+        return len(self.dirty) + (1 if current and self.key() not in self.dirty else 0)
+    
+    def save_as_txt(self) -> bool:
+        """保存当前图片的标注（交给后台写入器，立即返回；没有标签时删除标签文件）
         
-        file_path = os.path.join(self.folder_path, f"{self.image_name}.txt")
+        标注没有修改时不写入，返回是否排队写入。
+        """
+        if not self.folder_path or not self.image_name:
+            print("Error: path not set")
+            return False
         
-        try:
-            if not self.empty():
-                with open(file_path, 'w') as f:
-                    for label in self.labels_in_pic:
-                        if len(label.label_points) == 7:  # 确保有7个点
-                            coord_strings = []
-                            for point in label.label_points:
-                                x_norm = point.x() / self.image_width
-                                y_norm = point.y() / self.image_height
-                                coord_strings.append(f"{x_norm:.6f}")
-                                coord_strings.append(f"{y_norm:.6f}")
-                            f.write(" ".join(coord_strings) + "\n")
-            else:
-                # 如果没有标签，删除文件（如果存在）
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-        except Exception as e:
-            print(f"Error saving txt file: {e}")
+        if not self.is_modified():
+            # 不需要写入，但未标完的标签仍要反映到标签索引（"下一张标注不完整"）
+            unfinished = self.unfinished_count()
+            if unfinished and self.has_size():
+                open_label_index(self.folder_path).update(
+                    self.image_name, self.normalized_points(), unfinished)
+            return False
+        points = self.normalized_points()
+        get_label_saver().submit(self.folder_path, self.image_name, points, self.store,
+                                 self.unfinished_count())
+        self.dirty.pop(self.key(), None)
+        self.mark_saved(points)
+        return True
+    
+    def save_all(self) -> int:
+        """保存当前图片和所有未保存的修改，只写入修改过的图片，返回写入的图片数"""
+        saved = 0
+        if self.folder_path and self.image_name and self.save_as_txt():
+            saved += 1
+        saver = get_label_saver()
+        for (folder, name), (store, points) in self.dirty.items():
+            saver.submit(folder, name, points, store)
+            saved += 1
+        self.dirty.clear()
+        return saved
     
     def get_label_info(self, index: int) -> str:
         """获取标签信息字符串"""
@@ -0,0 +1,212 @@
+import os
+import threading
+import time
+import traceback
+from typing import Sequence
+from PyQt5.QtCore import QThread, pyqtSignal
+from .folder_scanner import FolderScanner
+from .model import SmartAdd
+from .session_tuner import tune_and_save
+from .batch import ProcessPoolDetector, detect_in_process, worker_model_options
+from .manifest import DetectManifest, DETECT_ALL
+from .label_index import LabelIndex, find_label_index, open_label_index
+
+
+class FolderScanThread(QThread):
+    """后台扫描图片文件夹，按块发送结果"""
+
+    chunk_ready = pyqtSignal(list)          # 一批相对路径
+    scan_finished = pyqtSignal(int, bool)   # 图片总数, 结果是否已排序
+    scan_failed = pyqtSignal(str)
+
+    def __init__(self, folder: str, recursive: bool = False, parent=None):
+        super().__init__(parent)
+        self.scanner = FolderScanner(folder, recursive)
+
+    def cancel(self):
+        self.scanner.cancel()
+
+    def run(self):
+        try:
+            for chunk in self.scanner.scan():
+                self.chunk_ready.emit(chunk)
+        except OSError as e:
+            self.scan_failed.emit(str(e))
+            return
+        if not self.scanner.cancelled:
+            self.scan_finished.emit(self.scanner.count, self.scanner.from_cache)
+
+
+class LabelIndexThread(QThread):
+    """后台建立标签索引（多线程读取标签文件夹）
+
+    cancel 之后不再发出 index_ready（切换文件夹时不必等待扫描结束）。
+    """
+
+    index_ready = pyqtSignal(object)    # LabelIndex
+
+    def __init__(self, label_folder: str, workers: int = 8, parent=None):
+        super().__init__(parent)
+        self.index: LabelIndex = open_label_index(label_folder)
+        self.workers = workers
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def run(self):
+        self.index.build(self.workers)
+        if not self._cancelled.is_set():
+            self.index_ready.emit(self.index)
+
+
+class ModelLoadThread(QThread):
+    """后台加载模型并预热，加载期间界面保持可操作
+
+    模型加载到新的 SmartAdd 实例（沿用 model 的设置），不影响正在使用的实例，
+    加载成功后由调用方换上 self.model。cancel 之后跳过预热，也不再发出 model_loaded。
+    retune 为 True 时先在本机重新调优推理配置并保存（覆盖之前的调优结果），再加载模型。
+    """
+
+    model_loaded = pyqtSignal(bool)     # 是否加载成功
+
+    def __init__(self, model: SmartAdd, model_path: str, parent=None, retune: bool = False):
+        super().__init__(parent)
+        self.model = SmartAdd()
+        for name, value in worker_model_options(model).items():
+            setattr(self.model, name, value)
+        self.model.calibration_paths = model.calibration_paths
+        self.model_path = model_path
+        self.retune = retune
+        # 请求的推理精度，量化失败时模型会退回 FP32
+        self.quantization = model.quantization
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def run(self):
+        if self.retune:
+            try:
+                tune_and_save(self.model_path)
+            except Exception as e:
+                print(f"Error tuning session config: {e}")
+            if self._cancelled.is_set():
+                return
+        success = self.model.set_model(self.model_path)
+        if self._cancelled.is_set():
+            return
+        if success:
+            self.model.warm_up()
+            # 推理结果缓存按时间和数量清理（只在主进程中进行）
+            cache = self.model.prediction_cache()
+            if cache is not None:
+                cache.prune()
+        if not self._cancelled.is_set():
+            self.model_loaded.emit(success)
+
+
+class SmartDetectThread(QThread):
+    """后台批量智能检测 - 不经过显示控件，结果直接写入标签文件夹
+
+    num_workers > 1 时使用多进程分片检测，每个进程持有独立的推理会话。
+    mode 为检测范围（见 manifest.DETECT_MODES），需要检测的图片在后台线程中按清单筛选，
+    写入的标签逐批记入清单，中断后再次运行只处理剩余的图片。
+    keyframe_interval > 0 时只对关键帧运行模型，其余帧用光流跟踪（见 tracking.TrackingDetector）。
+    """
+
+    progress = pyqtSignal(int, int, float)          # 已完成, 总数, 预计剩余秒数
+    labels_written = pyqtSignal(list)               # 本批已写入标签的图片路径
+    detect_failed = pyqtSignal(str)                 # 出错信息（之后仍会发出 detect_finished）
+    detect_finished = pyqtSignal(int, int, bool)    # 检测成功数, 已处理数, 是否被取消
+
+    def __init__(self, model: SmartAdd, image_paths: Sequence[str], dataset_folder: str,
+                 num_workers: int = 1, mode: str = DETECT_ALL, keyframe_interval: int = 0,
+                 parent=None):
+        super().__init__(parent)
+        self.model = model
+        self.image_paths = image_paths
+        self.label_folder = os.path.join(dataset_folder, "labels")
+        self.manifest = DetectManifest(dataset_folder)
+        self.num_workers = num_workers
+        self.mode = mode
+        self.keyframe_interval = keyframe_interval
+        self._total = 0
+        self._cancel = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+        self._done = 0
+        self._detected = 0
+        self._start_time = 0.0
+        self._pause_start = 0.0
+        self._paused_time = 0.0
+
+    def pause(self):
+        if self._running.is_set():
+            self._pause_start = time.monotonic()
+            self._running.clear()
+
+    def resume(self):
+        if not self._running.is_set():
+            self._paused_time += time.monotonic() - self._pause_start
+            self._running.set()
+
+    def is_paused(self) -> bool:
+        return not self._running.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+        self._running.set()
+
+    def run(self):
+        """检测全部图片；出错时发出 detect_failed，无论成功与否最后都发出 detect_finished"""
+        self._done = 0
+        self._detected = 0
+        self._start_time = time.monotonic()
+        self._paused_time = 0.0
+        try:
+            self._detect()
+        except Exception as e:
+            traceback.print_exc()
+            self.detect_failed.emit(f"{type(e).__name__}: {e}")
+        finally:
+            self.detect_finished.emit(self._detected, self._done, self._cancel.is_set())
+
+    def _detect(self):
+        paths = self.manifest.plan(self.image_paths, self.mode, self.model.model_hash)
+        self._total = len(paths)
+        self.progress.emit(0, self._total, 0.0)
+        if not paths:
+            return
+
+        if self.num_workers > 1:
+            detector = ProcessPoolDetector(
+                self.model.model_path, self.label_folder,
+                num_workers=self.num_workers,
+                model_options=worker_model_options(self.model),
+                keyframe_interval=self.keyframe_interval
+            )
+            detected, processed = detector.run(
+                paths, self._report, self._cancel, self._running
+            )
+        else:
+            detected, processed = detect_in_process(
+                self.model, paths, self.label_folder,
+                self._report, self._cancel, self._running,
+                keyframe_interval=self.keyframe_interval
+            )
+        self._detected, self._done = detected, processed
+
+    def _report(self, count: int, written: list):
+        """记录写入的标签并汇报进度，只按实际工作时间估算剩余时间（暂停时间不计入）"""
+        self.manifest.record(written, self.model.model_hash)
+        index = find_label_index(self.label_folder)
+        if index is not None:
+            index.refresh(DetectManifest.label_name(path) for path in written)
+        self._done += count
+        self._detected += len(written)
+        total = self._total
+        busy_time = time.monotonic() - self._start_time - self._paused_time
+        eta = max(busy_time, 0.0) / max(self._done, 1) * (total - self._done)
+        self.labels_written.emit(written)
+        self.progress.emit(self._done, total, eta)
@@ -0,0 +1,14 @@
+import os
+import sys
+import pytest
+
+# 测试直接导入 src 包，不需要安装
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """每个测试使用独立的缓存目录，不读写用户的缓存"""
+    path = tmp_path / "cache"
+    monkeypatch.setenv("PAPERTRACKER_CACHE_DIR", str(path))
+    return path
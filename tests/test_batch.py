@@ -0,0 +1,14 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_batch_does_not_import_qt():
+    # 在新的解释器中导入（同一进程中其他测试已经加载了Qt）
+    code = ("import sys, src.batch; "
+            "loaded = [m for m in sys.modules if m.split('.')[0] == 'PyQt5']; "
+            "assert not loaded, loaded")
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,39 @@
+import os
+import pytest
+
+pytest.importorskip("PyQt5")
+from src.file_list_model import ImageListModel, PathArray
+
+
+def test_path_array_access():
+    paths = PathArray("/data", ["b.jpg", "sub/a.jpg", "图片.png"])
+    assert len(paths) == 3
+    assert paths[1] == os.path.join("/data", "sub/a.jpg")
+    assert paths.name(-1) == "图片.png"
+    with pytest.raises(IndexError):
+        paths.name(3)
+
+
+def test_path_array_copy_is_independent():
+    paths = PathArray("/data", ["a.jpg"])
+    copy = paths.copy()
+    paths.extend(["b.jpg"])
+    assert copy.names() == ["a.jpg"] and paths.names() == ["a.jpg", "b.jpg"]
+
+
+def test_path_array_sort_returns_order():
+    paths = PathArray("", ["c.jpg", "a.jpg", "b.jpg"])
+    assert paths.sort() == [1, 2, 0]
+    assert paths.names() == ["a.jpg", "b.jpg", "c.jpg"]
+
+
+def test_model_streaming_and_sort_keeps_row():
+    model = ImageListModel()
+    model.set_paths("/data", [])
+    model.append_paths(["c.jpg", "a.jpg"])
+    model.append_paths(["b.jpg"])
+    assert model.rowCount() == 3
+    # 当前选中 c.jpg（第0行），排序后位于最后
+    assert model.sort_paths(0) == 2
+    assert model.path(2) == os.path.join("/data", "c.jpg")
+    assert model.sort_paths() == -1
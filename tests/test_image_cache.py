@@ -0,0 +1,57 @@
+import os
+import cv2
+import numpy as np
+from src.image_cache import ImageCache
+
+
+def write_image(path, value=0, size=8):
+    cv2.imwrite(str(path), np.full((size, size, 3), value, dtype=np.uint8))
+    return str(path)
+
+
+def test_get_decodes_once(tmp_path):
+    cache = ImageCache()
+    path = write_image(tmp_path / "a.png")
+    first = cache.get(path)
+    assert first is not None and first.shape[:2] == (8, 8)
+    assert cache.get(path) is first
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_lru_eviction_by_bytes(tmp_path):
+    paths = [write_image(tmp_path / f"{i}.png", i) for i in range(3)]
+    nbytes = ImageCache().get(paths[0]).nbytes
+    cache = ImageCache(max_bytes=nbytes * 2)
+    cache.get(paths[0])
+    cache.get(paths[1])
+    cache.get(paths[0])  # paths[1] 变为最久未使用
+    cache.get(paths[2])
+    assert cache.contains(paths[0]) and cache.contains(paths[2])
+    assert not cache.contains(paths[1])
+    assert cache.stats()['bytes'] == nbytes * 2
+
+    cache.set_max_bytes(nbytes)
+    assert cache.stats()['entries'] == 1 and cache.contains(paths[2])
+
+
+def test_too_large_image_not_cached(tmp_path):
+    path = write_image(tmp_path / "big.png", size=64)
+    cache = ImageCache(max_bytes=100)
+    assert cache.get(path) is not None
+    assert not cache.contains(path) and cache.stats()['bytes'] == 0
+
+
+def test_modified_file_invalidates_entry(tmp_path):
+    path = write_image(tmp_path / "a.png", 10)
+    cache = ImageCache()
+    assert cache.get(path)[0, 0, 0] == 10
+    write_image(path, 200, size=9)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert cache.peek(path) is None
+    assert cache.get(path)[0, 0, 0] == 200
+    assert cache.stats()['entries'] == 1
+
+
+def test_missing_file(tmp_path):
+    assert ImageCache().get(str(tmp_path / "missing.png")) is None
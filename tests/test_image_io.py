@@ -0,0 +1,98 @@
+import struct
+import cv2
+import numpy as np
+from src.image_cache import get_image_cache
+from src.image_io import decode_reduced, read_image_size, reduced_grayscale_flags
+from src.model import SmartAdd
+
+
+def encode(ext, width, height, channels=3):
+    img = np.zeros((height, width, channels), dtype=np.uint8)
+    ok, data = cv2.imencode(ext, img)
+    assert ok
+    return data
+
+
+def with_exif_orientation(jpeg, orientation):
+    """在 SOI 之后插入只含方向标记的 EXIF 段"""
+    tiff = b"MM\x00*" + struct.pack(">I", 8) + struct.pack(">H", 1)
+    tiff += struct.pack(">HHIHH", 0x0112, 3, 1, orientation, 0) + struct.pack(">I", 0)
+    payload = b"Exif\x00\x00" + tiff
+    segment = b"\xff\xe1" + struct.pack(">H", len(payload) + 2) + payload
+    raw = jpeg.tobytes()
+    return np.frombuffer(raw[:2] + segment + raw[2:], dtype=np.uint8)
+
+
+def test_read_image_size_formats():
+    assert read_image_size(encode(".jpg", 640, 480)) == (640, 480)
+    assert read_image_size(encode(".png", 300, 200)) == (300, 200)
+    assert read_image_size(encode(".bmp", 90, 70)) == (90, 70)
+
+
+def test_read_image_size_top_down_bmp():
+    data = bytearray(encode(".bmp", 90, 70).tobytes())
+    # 高度为负数表示自上而下存储的BMP
+    data[22:26] = struct.pack("<i", -70)
+    assert read_image_size(np.frombuffer(bytes(data), dtype=np.uint8)) == (90, 70)
+
+
+def test_read_image_size_truncated_or_unknown():
+    jpeg = encode(".jpg", 640, 480)
+    png = encode(".png", 300, 200)
+    assert read_image_size(None) is None
+    assert read_image_size(png[:20]) is None
+    # 在 SOF 之前截断的JPEG
+    sof = jpeg.tobytes().index(b"\xff\xc0")
+    assert read_image_size(jpeg[:sof]) is None
+    assert read_image_size(np.frombuffer(b"GIF89a" + b"\x00" * 40, dtype=np.uint8)) is None
+
+
+def test_reduced_grayscale_flags():
+    assert reduced_grayscale_flags(1280, 960, 112, 112) == (cv2.IMREAD_REDUCED_GRAYSCALE_8, 8)
+    assert reduced_grayscale_flags(800, 400, 112, 112) == (cv2.IMREAD_REDUCED_GRAYSCALE_2, 2)
+    assert reduced_grayscale_flags(200, 200, 112, 112) == (cv2.IMREAD_GRAYSCALE, 1)
+
+
+def test_decode_reduced_maps_back_to_original():
+    img = np.zeros((400, 800, 3), dtype=np.uint8)
+    img[100:140, 600:660] = 255
+    ok, data = cv2.imencode(".png", img)
+    reduced, shape = decode_reduced(data, 112, 112)
+    assert shape == (400, 800)
+    assert reduced.ndim == 2 and reduced.shape == (200, 400)
+
+    # 缩小图中的位置按原图尺寸换算回原图像素
+    ys, xs = np.nonzero(reduced > 128)
+    x = xs.mean() / reduced.shape[1] * shape[1]
+    y = ys.mean() / reduced.shape[0] * shape[0]
+    assert abs(x - 630) <= 2 and abs(y - 120) <= 2
+
+
+def test_decode_reduced_exif_rotation():
+    data = with_exif_orientation(encode(".jpg", 64, 32), 6)
+    # 文件头中是旋转前的尺寸
+    assert read_image_size(data) == (64, 32)
+    reduced, shape = decode_reduced(data, 8, 8)
+    assert reduced.shape == (16, 8)
+    assert shape == (64, 32)
+
+
+def test_decode_reduced_invalid():
+    assert decode_reduced(np.empty(0, dtype=np.uint8), 112, 112) == (None, None)
+    assert decode_reduced(np.frombuffer(b"not an image" * 4, dtype=np.uint8), 112, 112) == (None, None)
+
+
+def test_inference_decode_ignores_display_cache(tmp_path):
+    path = str(tmp_path / "frame.png")
+    cv2.imwrite(path, np.zeros((480, 640, 3), dtype=np.uint8))
+    model = SmartAdd()
+    reduced, shape = model.load_for_inference(path)
+
+    # 图片被显示（放入显示缓存）后，推理仍使用相同的缩小解码
+    assert get_image_cache().get(path) is not None
+    img, cached_shape = model.load_for_inference(path)
+    assert img.shape == reduced.shape == (120, 160) and cached_shape == shape == (480, 640)
+
+    model.reduced_decode = False
+    img, shape = model.load_for_inference(path)
+    assert img is get_image_cache().peek(path) and shape == (480, 640)
@@ -0,0 +1,72 @@
+import os
+import numpy as np
+import pytest
+from src.label_io import write_label_file
+from src.label_index import LabelIndex, summarize_label_file, summarize_points
+
+
+def test_summarize_label_file(tmp_path):
+    path = str(tmp_path / "a.txt")
+    assert summarize_label_file(path) is None
+    write_label_file(path, np.zeros((2, 7, 2)))
+    assert summarize_label_file(path) == (2, True)
+    with open(path, "a") as f:
+        f.write("0.1 0.2 0.3 0.4\n")
+    assert summarize_label_file(path) == (2, False)
+    open(path, "w").close()
+    assert summarize_label_file(path) == (0, False)
+
+
+def test_summarize_points_matches_written_file(tmp_path):
+    path = str(tmp_path / "a.txt")
+    for points in (np.zeros((2, 7, 2)), np.zeros((1, 7, 2))):
+        write_label_file(path, points)
+        assert summarize_points(points) == summarize_label_file(path)
+    # 没有标签时标签文件被删除
+    assert summarize_points(np.empty((0, 7, 2))) is None
+    # 未标完的标签不写入文件，但索引中视为不完整
+    assert summarize_points(np.zeros((2, 7, 2)), unfinished=1) == (2, False)
+    assert summarize_points(np.empty((0, 7, 2)), unfinished=1) == (0, False)
+
+
+def test_build_and_update(tmp_path):
+    label_folder = str(tmp_path / "labels")
+    os.makedirs(label_folder)
+    write_label_file(os.path.join(label_folder, "a.txt"), np.zeros((1, 7, 2)))
+    index = LabelIndex(label_folder)
+    index.build(workers=2)
+    assert index.ready and index.get("a") == (1, True) and index.get("b") is None
+
+    index.update("b", np.zeros((3, 7, 2)))
+    index.update("a", np.empty((0, 7, 2)))
+    assert index.get("b") == (3, True) and index.get("a") is None
+
+    write_label_file(os.path.join(label_folder, "c.txt"), np.zeros((2, 7, 2)))
+    index.refresh(["c"])
+    assert index.get("c") == (2, True) and len(index) == 2
+
+
+def test_find_next_wraps_around(tmp_path):
+    pytest.importorskip("PyQt5")
+    from src.file_list_model import STATUS_INCOMPLETE, STATUS_UNLABELED, ImageListModel
+
+    label_folder = str(tmp_path / "labels")
+    os.makedirs(label_folder)
+    for name in ("0", "2"):
+        write_label_file(os.path.join(label_folder, f"{name}.txt"), np.zeros((1, 7, 2)))
+    with open(os.path.join(label_folder, "3.txt"), "w") as f:
+        f.write("0.5 0.5\n")
+
+    model = ImageListModel()
+    model.set_paths(str(tmp_path), [f"{i}.jpg" for i in range(5)])
+    model.set_label_dir(label_folder)
+    assert model.find_next(STATUS_UNLABELED, 0) == -1  # 索引建好前不查找
+    index = LabelIndex(label_folder)
+    index.build()
+    model.set_label_index(index)
+
+    assert model.find_next(STATUS_UNLABELED, 0) == 1
+    assert model.find_next(STATUS_UNLABELED, 1) == 4
+    assert model.find_next(STATUS_UNLABELED, 4) == 1
+    assert model.find_next(STATUS_INCOMPLETE, 3) == 3
+    assert model.status_counts() == (2, 1, 5)
@@ -0,0 +1,47 @@
+import numpy as np
+from src.label_io import format_label_lines, parse_label_text, read_label_file, read_label_folder, write_label_file
+
+
+def make_points(count, seed=0):
+    return np.random.default_rng(seed).random((count, 7, 2))
+
+
+def test_format_and_parse_round_trip():
+    points = make_points(3)
+    parsed = parse_label_text(format_label_lines(points))
+    assert parsed.shape == (3, 7, 2)
+    np.testing.assert_allclose(parsed, points, atol=1e-6)
+
+
+def test_parse_skips_partial_and_invalid_lines():
+    good = " ".join(["0.5"] * 14)
+    text = "\n".join([good, "0.1 0.2 0.3", "", " ".join(["x"] * 14), good])
+    parsed = parse_label_text(text)
+    assert parsed.shape == (2, 7, 2)
+    assert np.all(parsed == 0.5)
+
+
+def test_parse_empty_text():
+    assert parse_label_text("").shape == (0, 7, 2)
+
+
+def test_read_label_file_missing(tmp_path):
+    assert read_label_file(str(tmp_path / "missing.txt")) is None
+
+
+def test_read_label_folder(tmp_path):
+    write_label_file(str(tmp_path / "b.txt"), make_points(2, seed=1))
+    write_label_file(str(tmp_path / "a.txt"), make_points(1, seed=2))
+    (tmp_path / "empty.txt").write_text("")
+    (tmp_path / "notes.md").write_text("ignored")
+
+    names, points, image_index = read_label_folder(str(tmp_path), workers=2)
+    assert names == ["a", "b"]  # 没有标签的文件不返回
+    assert points.dtype == np.float32 and points.shape == (3, 7, 2)
+    assert image_index.tolist() == [0, 1, 1]
+    np.testing.assert_allclose(points[1:], make_points(2, seed=1), atol=1e-6)
+
+
+def test_read_label_folder_missing(tmp_path):
+    names, points, image_index = read_label_folder(str(tmp_path / "labels"))
+    assert names == [] and points.shape == (0, 7, 2) and len(image_index) == 0
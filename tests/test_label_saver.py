@@ -0,0 +1,72 @@
+import os
+import numpy as np
+from src.label_io import read_label_file
+from src.label_saver import LabelSaver
+from src.label_store import LabelStore
+
+
+class FailingStore:
+    """put_many 抛出异常的标签库（模拟意外错误）"""
+
+    def __init__(self):
+        self.fail = True
+        self.saved = {}
+
+    def put_many(self, items):
+        if self.fail:
+            raise RuntimeError("disk error")
+        self.saved.update(items)
+        return True
+
+
+def test_submit_writes_txt_and_deletes_empty(tmp_path):
+    label_folder = str(tmp_path / "labels")
+    saver = LabelSaver(batch_delay=0)
+    points = np.full((2, 7, 2), 0.25)
+    saver.submit(label_folder, "a", points)
+    assert saver.flush(timeout=5)
+    np.testing.assert_allclose(read_label_file(os.path.join(label_folder, "a.txt")), points)
+
+    saver.submit(label_folder, "a", np.empty((0, 7, 2)))
+    assert saver.flush(timeout=5)
+    assert not os.path.exists(os.path.join(label_folder, "a.txt"))
+    assert saver.pending_count() == 0
+    assert not [name for name in os.listdir(label_folder) if ".tmp" in name]
+
+
+def test_pending_returns_latest_submission(tmp_path):
+    label_folder = str(tmp_path / "labels")
+    saver = LabelSaver(batch_delay=10)
+    saver.submit(label_folder, "a", np.zeros((1, 7, 2)))
+    saver.submit(label_folder, "a", np.ones((2, 7, 2)))
+    assert saver.pending(label_folder, "a").shape == (2, 7, 2)
+    assert saver.pending(label_folder, "b") is None
+    # flush 时不再等待合并延迟
+    assert saver.flush(timeout=5)
+    assert len(read_label_file(os.path.join(label_folder, "a.txt"))) == 2
+
+
+def test_store_batch(tmp_path):
+    label_folder = str(tmp_path / "labels")
+    store = LabelStore(str(tmp_path / "labels.sqlite3"))
+    saver = LabelSaver(batch_delay=0)
+    for i in range(5):
+        saver.submit(label_folder, f"frame_{i}", np.zeros((1, 7, 2)), store)
+    assert saver.flush(timeout=5)
+    assert store.stats() == (5, 5)
+    assert not os.path.exists(label_folder)
+
+
+def test_unexpected_error_keeps_writer_alive(tmp_path):
+    label_folder = str(tmp_path / "labels")
+    store = FailingStore()
+    saver = LabelSaver(batch_delay=0)
+    saver.submit(label_folder, "a", np.zeros((1, 7, 2)), store)
+    assert not saver.flush(timeout=5)
+    assert saver.failed_count() == 1
+    assert saver.pending(label_folder, "a") is not None
+
+    # 失败的保存在下次 flush 时重试
+    store.fail = False
+    assert saver.flush(timeout=5)
+    assert saver.failed_count() == 0 and "a" in store.saved
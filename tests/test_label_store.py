@@ -0,0 +1,99 @@
+import os
+import numpy as np
+from src.label_io import read_label_file, write_label_file
+from src.label_store import LabelStore, LabelWriter, load_all_labels, main, open_label_store
+
+
+def make_points(count, seed=0):
+    return np.random.default_rng(seed).random((count, 7, 2))
+
+
+def make_txt_dataset(dataset):
+    label_folder = os.path.join(dataset, "labels")
+    os.makedirs(label_folder)
+    write_label_file(os.path.join(label_folder, "frame_1.txt"), make_points(2, seed=1))
+    write_label_file(os.path.join(label_folder, "frame_0.txt"), make_points(1, seed=2))
+    return label_folder
+
+
+def test_put_get_delete(tmp_path):
+    store = LabelStore(str(tmp_path / "labels.sqlite3"))
+    points = make_points(2)
+    assert store.put("a", points)
+    np.testing.assert_allclose(store.get("a"), points, atol=1e-6)
+    assert store.contains("a") and store.names() == {"a"}
+    assert store.stats() == (1, 2)
+
+    # 没有标签时删除对应行
+    assert store.put("a", np.empty((0, 7, 2)))
+    assert store.get("a") is None and not store.contains("a")
+    assert store.put("b", points) and store.delete("b")
+    assert store.names() == set()
+
+
+def test_mtimes_change_on_write(tmp_path):
+    store = LabelStore(str(tmp_path / "labels.sqlite3"))
+    store.put_many([("a", make_points(1)), ("b", make_points(1))])
+    before = store.mtimes()
+    assert set(before) == {"a", "b"}
+    store.put("a", make_points(1, seed=3))
+    after = store.mtimes(["a", "missing"])
+    assert set(after) == {"a"} and after["a"] > before["a"]
+
+
+def test_import_export_round_trip(tmp_path):
+    label_folder = make_txt_dataset(str(tmp_path / "dataset"))
+    store = open_label_store(label_folder, create=True)
+    assert store.import_txt(label_folder, workers=2, chunk_size=1) == 2
+
+    names, points, image_index = store.read_all()
+    assert names == ["frame_0", "frame_1"]
+    assert image_index.tolist() == [0, 1, 1]
+    # 标签库按txt精度保存，导入后无损
+    for name in names:
+        np.testing.assert_array_equal(store.get(name), read_label_file(os.path.join(label_folder, f"{name}.txt")))
+
+    exported = str(tmp_path / "exported")
+    assert store.export_txt(exported) == 2
+    for name in names:
+        with open(os.path.join(label_folder, f"{name}.txt")) as a, open(os.path.join(exported, f"{name}.txt")) as b:
+            assert a.read() == b.read()
+
+
+def test_label_writer_uses_store_or_txt(tmp_path):
+    txt_folder = str(tmp_path / "txt" / "labels")
+    written = LabelWriter(txt_folder).write_many([("/images/a.jpg", make_points(1))])
+    assert written == ["/images/a.jpg"]
+    assert os.path.exists(os.path.join(txt_folder, "a.txt"))
+
+    store_folder = str(tmp_path / "store" / "labels")
+    os.makedirs(os.path.dirname(store_folder))
+    store = open_label_store(store_folder, create=True)
+    # 没有txt时导入同样创建标签库文件
+    assert store.import_txt(store_folder) == 0
+    LabelWriter(store_folder).write_many([("/images/b.png", make_points(2))])
+    assert store.stats() == (1, 2)
+    assert not os.path.exists(store_folder)
+
+
+def test_cli_import_and_export(tmp_path, capsys):
+    dataset = str(tmp_path / "dataset")
+    label_folder = make_txt_dataset(dataset)
+    assert main(["import", dataset]) == 0
+    for name in os.listdir(label_folder):
+        os.remove(os.path.join(label_folder, name))
+    assert main(["export", dataset]) == 0
+    assert sorted(os.listdir(label_folder)) == ["frame_0.txt", "frame_1.txt"]
+    assert len(read_label_file(os.path.join(label_folder, "frame_1.txt"))) == 2
+
+
+def test_load_all_labels_prefers_store(tmp_path):
+    label_folder = make_txt_dataset(str(tmp_path / "dataset"))
+    assert open_label_store(label_folder) is None
+    names, points, _ = load_all_labels(label_folder)
+    assert names == ["frame_0", "frame_1"] and len(points) == 3
+
+    store = open_label_store(label_folder, create=True)
+    store.put("frame_2", make_points(4))
+    names, points, _ = load_all_labels(label_folder)
+    assert names == ["frame_2"] and len(points) == 4
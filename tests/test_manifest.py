@@ -0,0 +1,65 @@
+import os
+import numpy as np
+from src.label_io import write_label_file
+from src.label_store import open_label_store
+from src.manifest import DETECT_ALL, DETECT_MISSING, DETECT_STALE, DetectManifest
+
+POINTS = np.full((1, 7, 2), 0.5)
+
+
+def setup_dataset(tmp_path):
+    dataset = str(tmp_path / "dataset")
+    os.makedirs(os.path.join(dataset, "labels"))
+    paths = [f"/images/frame_{i}.jpg" for i in range(4)]
+    return dataset, paths
+
+
+def write_labels(manifest, paths, store=None):
+    if store is not None:
+        store.put_many((manifest.label_name(path), POINTS) for path in paths)
+    else:
+        for path in paths:
+            write_label_file(os.path.join(manifest.label_folder, f"{manifest.label_name(path)}.txt"), POINTS)
+
+
+def check_plan_modes(manifest, paths, store=None):
+    # frame_0: 人工标注；frame_1: 旧模型生成；frame_2: 旧模型生成后被修改；frame_3: 没有标签
+    write_labels(manifest, paths[:3], store)
+    manifest.record(paths[1:3], "old")
+    edited = manifest.label_name(paths[2])
+    if store is not None:
+        store.put(edited, POINTS)
+    else:
+        file_path = os.path.join(manifest.label_folder, f"{edited}.txt")
+        mtime = os.stat(file_path).st_mtime_ns
+        os.utime(file_path, ns=(mtime + 10**9, mtime + 10**9))
+
+    assert manifest.plan(paths, DETECT_ALL, "new") == paths
+    assert manifest.plan(paths, DETECT_MISSING, "new") == [paths[3]]
+    assert manifest.plan(paths, DETECT_STALE, "new") == [paths[1], paths[3]]
+    # 同一模型生成的标签不需要重新检测
+    assert manifest.plan(paths, DETECT_STALE, "old") == [paths[3]]
+
+
+def test_plan_modes_with_txt_labels(tmp_path):
+    dataset, paths = setup_dataset(tmp_path)
+    check_plan_modes(DetectManifest(dataset), paths)
+
+
+def test_plan_modes_with_label_store(tmp_path):
+    dataset, paths = setup_dataset(tmp_path)
+    store = open_label_store(os.path.join(dataset, "labels"), create=True)
+    store.import_txt(os.path.join(dataset, "labels"))
+    manifest = DetectManifest(dataset)
+    assert manifest.store is store
+    check_plan_modes(manifest, paths, store)
+
+
+def test_record_persists_across_instances(tmp_path):
+    dataset, paths = setup_dataset(tmp_path)
+    manifest = DetectManifest(dataset)
+    write_labels(manifest, paths[:2])
+    # 没有标签文件的图片不记录
+    manifest.record(paths, "model")
+    assert set(DetectManifest(dataset).auto_labels()) == {"frame_0", "frame_1"}
+    assert DetectManifest(dataset).label_names() == {"frame_0", "frame_1"}
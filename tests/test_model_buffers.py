@@ -0,0 +1,106 @@
+import cv2
+import numpy as np
+import pytest
+
+onnx = pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+from onnx import TensorProto, helper
+from src.model import SmartAdd
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    """动态批次的小模型：Nx1x112x112 → Nx14"""
+    weights = np.random.default_rng(0).normal(0, 0.01, (112 * 112, 14)).astype(np.float32)
+    graph = helper.make_graph(
+        [helper.make_node("Flatten", ["input"], ["f"], axis=1),
+         helper.make_node("Gemm", ["f", "W", "b"], ["g"]),
+         helper.make_node("Sigmoid", ["g"], ["output"])],
+        "m",
+        [helper.make_tensor_value_info("input", TensorProto.FLOAT, ["N", 1, 112, 112])],
+        [helper.make_tensor_value_info("output", TensorProto.FLOAT, ["N", 14])],
+        [helper.make_tensor("W", TensorProto.FLOAT, weights.shape, weights.ravel()),
+         helper.make_tensor("b", TensorProto.FLOAT, [14], np.zeros(14, dtype=np.float32))],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)],
+                              ir_version=8)
+    path = str(tmp_path / "model.onnx")
+    onnx.save(model, path)
+    return path
+
+
+def write_images(folder, count):
+    rng = np.random.default_rng(1)
+    paths = []
+    for i in range(count):
+        path = str(folder / f"{i}.png")
+        cv2.imwrite(path, rng.integers(0, 255, (120, 160, 3), dtype=np.uint8))
+        paths.append(path)
+    return paths
+
+
+def load_model(model_path, batch_size):
+    model = SmartAdd()
+    # 每次都实际推理，不从推理结果缓存读取
+    model.use_prediction_cache = False
+    assert model.set_model(model_path)
+    model.batch_size = batch_size
+    return model
+
+
+def test_batch_matches_single_frame(model_path, tmp_path):
+    paths = write_images(tmp_path, 10)
+    expected = load_model(model_path, 1).predict_batch(paths)
+    model = load_model(model_path, 4)
+    assert model.batch_buffer(4).shape == (4, 1, 112, 112)
+    # 最后一批只有2帧
+    results = model.predict_batch(paths)
+    for (points, shape), (expected_points, expected_shape) in zip(results, expected):
+        assert shape == expected_shape == (120, 160)
+        np.testing.assert_allclose(points, expected_points, atol=1e-5)
+
+
+def test_buffers_grow_with_batch_size(model_path):
+    model = load_model(model_path, 2)
+    assert model.buffers().capacity == 2
+    # 首次使用后调大 batch_size，缓冲区随之重新分配
+    model.batch_size = 16
+    assert model.buffers().capacity == 16
+    assert model.batch_buffer(16).shape[0] == 16
+    # 请求的行数超过 batch_size 时同样扩容
+    assert model.buffers(20).capacity == 20
+
+
+def test_batch_results_match_after_resize(model_path, tmp_path):
+    paths = write_images(tmp_path, 20)
+    model = load_model(model_path, 1)
+    expected = model.predict_batch(paths)
+    model.batch_size = 2
+    model.predict_batch(paths[:2])
+    model.batch_size = 16
+    results = model.predict_batch(paths)
+    for (points, shape), (expected_points, expected_shape) in zip(results, expected):
+        assert shape == expected_shape
+        np.testing.assert_allclose(points, expected_points, atol=1e-5)
+
+
+def test_preprocess_thread_allocates_only_scratch(model_path):
+    import threading
+
+    model = load_model(model_path, 64)
+    img = np.random.default_rng(2).integers(0, 255, (120, 160, 3), dtype=np.uint8)
+    expected = model.preprocess_image_from_cv2(img)
+    allocated = {}
+
+    def decode():
+        out = np.empty((1, 112, 112), dtype=np.float32)
+        model.preprocess_into(img, out)
+        allocated['inference'] = hasattr(model._local, 'buffers')
+        allocated['scratch'] = hasattr(model._local, 'scratch')
+        allocated['out'] = out
+
+    thread = threading.Thread(target=decode)
+    thread.start()
+    thread.join()
+    assert allocated['scratch'] and not allocated['inference']
+    np.testing.assert_array_equal(allocated['out'], expected[0])
@@ -0,0 +1,84 @@
+import queue
+from src.pipeline import _STOP, StageStats, _start_stage
+
+
+def drain(q):
+    items = []
+    while True:
+        item = q.get(timeout=5)
+        if item is _STOP:
+            return items
+        items.append(item)
+
+
+def join_all(threads):
+    for thread in threads:
+        thread.join(timeout=5)
+    assert not any(thread.is_alive() for thread in threads)
+
+
+def test_stop_propagates_through_stages():
+    in_q, mid_q, out_q = queue.Queue(), queue.Queue(maxsize=2), queue.Queue()
+    first = StageStats("first", 3)
+    second = StageStats("second", 2)
+    threads = _start_stage(lambda x: x * 2, in_q, mid_q, 3, 2, first)
+    threads += _start_stage(lambda items: sum(items), mid_q, out_q, 2, 1, second, batch_size=4)
+    for i in range(100):
+        in_q.put(i)
+    for _ in range(3):
+        in_q.put(_STOP)
+
+    assert sum(drain(out_q)) == sum(range(100)) * 2
+    join_all(threads)
+    assert first.items == 100 and second.items == 100
+    # 最后退出的线程只向下游发送一次结束标记
+    assert out_q.empty()
+
+
+def test_errors_are_forwarded_as_failures():
+    in_q, out_q = queue.Queue(), queue.Queue()
+
+    def func(x):
+        if x % 3 == 0:
+            raise ValueError(x)
+        return x
+
+    threads = _start_stage(func, in_q, out_q, 2, 1, StageStats("stage", 2), on_error=lambda x: -x)
+    for i in range(1, 10):
+        in_q.put(i)
+    for _ in range(2):
+        in_q.put(_STOP)
+
+    assert sorted(drain(out_q)) == [-9, -6, -3, 1, 2, 4, 5, 7, 8]
+    join_all(threads)
+
+
+def test_failing_error_handler_does_not_hang():
+    in_q, out_q = queue.Queue(), queue.Queue()
+
+    def fail(item):
+        raise RuntimeError("boom")
+
+    threads = _start_stage(fail, in_q, out_q, 2, 3, StageStats("stage", 2), batch_size=2, on_error=fail)
+    for i in range(5):
+        in_q.put(i)
+    for _ in range(2):
+        in_q.put(_STOP)
+
+    # 失败的帧被丢弃，下游的每个线程仍收到结束标记
+    for _ in range(3):
+        assert out_q.get(timeout=5) is _STOP
+    join_all(threads)
+    assert out_q.empty()
+
+
+def test_final_stage_without_output_queue():
+    in_q = queue.Queue()
+    seen = []
+    threads = _start_stage(seen.append, in_q, None, 2, 0, StageStats("write", 2))
+    for i in range(10):
+        in_q.put(i)
+    for _ in range(2):
+        in_q.put(_STOP)
+    join_all(threads)
+    assert sorted(seen) == list(range(10))
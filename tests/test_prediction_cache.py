@@ -0,0 +1,81 @@
+import os
+import sqlite3
+import time
+import numpy as np
+from src.prediction_cache import PredictionCache
+
+
+def make_prediction(value=0.5):
+    return np.full((1, 7, 2), value, dtype=np.float32), (480, 640)
+
+
+def image_key(tmp_path, name="a.jpg"):
+    path = tmp_path / name
+    if not path.exists():
+        path.write_bytes(b"image")
+    return PredictionCache.image_key(str(path))
+
+
+def test_round_trip_and_stats(tmp_path):
+    cache = PredictionCache(str(tmp_path / "predictions.sqlite3"))
+    key = image_key(tmp_path)
+    assert cache.get("model", key) is None
+    cache.put("model", key, make_prediction())
+    points, shape = cache.get("model", key)
+    assert shape == (480, 640)
+    np.testing.assert_array_equal(points, make_prediction()[0])
+    assert cache.stats() == {'hits': 1, 'misses': 1}
+
+
+def test_modified_image_and_other_model_miss(tmp_path):
+    cache = PredictionCache(str(tmp_path / "predictions.sqlite3"))
+    key = image_key(tmp_path)
+    cache.put("model", key, make_prediction())
+    assert cache.get("other", key) is None
+
+    path = key[0]
+    with open(path, "wb") as f:
+        f.write(b"modified image")
+    assert cache.get("model", PredictionCache.image_key(path)) is None
+    assert cache.get("model", None) is None
+
+
+def test_prune_keeps_other_models(tmp_path):
+    cache = PredictionCache(str(tmp_path / "predictions.sqlite3"))
+    key = image_key(tmp_path)
+    cache.put("old-model", key, make_prediction(0.1))
+    cache.put("new-model", key, make_prediction(0.2))
+    cache.prune()
+    assert cache.get("old-model", key) is not None
+    assert cache.get("new-model", key) is not None
+
+
+def test_prune_by_age_and_count(tmp_path):
+    db_path = str(tmp_path / "predictions.sqlite3")
+    cache = PredictionCache(db_path)
+    keys = [image_key(tmp_path, f"{i}.jpg") for i in range(5)]
+    cache.put_many("model", [(key, make_prediction()) for key in keys])
+
+    # 第一张是40天前写入的，其余按写入顺序排列
+    now = int(time.time())
+    with sqlite3.connect(db_path) as conn:
+        for i, key in enumerate(keys):
+            written = now - 40 * 86400 if i == 0 else now - 10 + i
+            conn.execute("UPDATE predictions SET written = ? WHERE path = ?", (written, key[0]))
+
+    cache.prune(max_age_days=30, max_rows=2)
+    remaining = [key for key in keys if cache.get("model", key) is not None]
+    assert remaining == keys[3:]
+
+
+def test_clear(tmp_path):
+    cache = PredictionCache(str(tmp_path / "predictions.sqlite3"))
+    key = image_key(tmp_path)
+    cache.put("model", key, make_prediction())
+    cache.clear()
+    assert cache.get("model", key) is None
+
+
+def test_default_path_uses_cache_dir(cache_dir):
+    cache = PredictionCache()
+    assert os.path.dirname(cache.db_path).startswith(str(cache_dir))
@@ -0,0 +1,125 @@
+import os
+import numpy as np
+import pytest
+
+pytest.importorskip("PyQt5")
+from PyQt5.QtCore import QPointF
+from src.label_io import read_label_file, write_label_file
+from src.label_saver import get_label_saver
+from src.txt_manager import AllLabel
+
+POINTS = np.linspace(0.1, 0.9, 14).reshape(1, 7, 2)
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    label_folder = tmp_path / "labels"
+    label_folder.mkdir()
+    for name in ("a", "b"):
+        write_label_file(str(label_folder / f"{name}.txt"), POINTS)
+    return tmp_path
+
+
+def open_image(all_label, name, size=(480, 640)):
+    all_label.reset()
+    all_label.set_pic_size(*size)
+    all_label.set_image_name(name)
+
+
+def make_label(dataset):
+    all_label = AllLabel()
+    all_label.set_label_path(str(dataset))
+    return all_label
+
+
+def test_round_trip_is_not_modified(dataset):
+    all_label = make_label(dataset)
+    open_image(all_label, "a")
+    assert len(all_label.labels_in_pic) == 1
+    assert not all_label.is_modified()
+
+    # 点拖动后又放回原处不算修改
+    label = all_label.labels_in_pic[0]
+    original = QPointF(label[0])
+    label[0] = QPointF(original.x() + 5, original.y())
+    assert all_label.is_modified()
+    label[0] = original
+    assert not all_label.is_modified()
+
+    # 重新读入相同的坐标也不算修改
+    all_label.set_normalized_points(all_label.normalized_points())
+    assert not all_label.is_modified()
+
+
+def test_stash_keeps_edits_without_auto_save(dataset):
+    all_label = make_label(dataset)
+    open_image(all_label, "a")
+    all_label.erase_focus(0)
+    assert all_label.dirty_count() == 1
+    all_label.stash()
+
+    open_image(all_label, "b")
+    assert len(all_label.labels_in_pic) == 1
+    assert all_label.dirty_count() == 1
+
+    # 回到修改过的图片时显示未保存的修改，不读磁盘上的标签
+    open_image(all_label, "a")
+    assert all_label.empty() and all_label.is_modified()
+    assert len(read_label_file(str(dataset / "labels" / "a.txt"))) == 1
+
+
+def test_save_all_writes_only_dirty_images(dataset):
+    label_folder = dataset / "labels"
+    all_label = make_label(dataset)
+    before = os.stat(label_folder / "b.txt").st_mtime_ns
+
+    open_image(all_label, "a")
+    all_label.erase_focus(0)
+    all_label.stash()
+    open_image(all_label, "b")
+    open_image(all_label, "c")
+    all_label.set_normalized_points(POINTS[:, ::-1])
+
+    assert all_label.dirty_count() == 2
+    assert all_label.save_all() == 2
+    assert get_label_saver().flush(timeout=5)
+    assert all_label.dirty_count() == 0
+
+    # 标签全部删除的图片删除标签文件，未修改的图片不写入
+    assert not os.path.exists(label_folder / "a.txt")
+    assert os.stat(label_folder / "b.txt").st_mtime_ns == before
+    np.testing.assert_allclose(read_label_file(str(label_folder / "c.txt")), POINTS[:, ::-1], atol=1e-6)
+
+
+def test_unknown_image_size_is_not_modified(dataset):
+    all_label = make_label(dataset)
+    # 图片无法解码时尺寸为0，读取已有标签不能出错，也不能覆盖磁盘上的标签
+    open_image(all_label, "a", size=(0, 0))
+    assert not all_label.is_modified()
+    assert all_label.dirty_count() == 0
+    assert not all_label.save_as_txt()
+    assert get_label_saver().flush(timeout=5)
+    assert len(read_label_file(str(dataset / "labels" / "a.txt"))) == 1
+
+
+def test_unfinished_label_marks_index_incomplete(dataset):
+    from src.label_index import open_label_index
+
+    all_label = make_label(dataset)
+    index = open_label_index(all_label.folder_path)
+    index.build(workers=1)
+    open_image(all_label, "a")
+    # 只标了3个点就离开
+    for i in range(3):
+        all_label.set_point(QPointF(10 * i, 10 * i))
+    assert all_label.unfinished_count() == 1
+    assert not all_label.save_as_txt()
+    assert index.get("a") == (1, False)
+
+    # 标完后保存，按保存的坐标重新统计
+    for i in range(3, 7):
+        all_label.set_point(QPointF(10 * i, 10 * i))
+    assert all_label.complete_current_label()
+    assert all_label.save_as_txt()
+    assert index.get("a") == (2, True)
+    assert get_label_saver().flush(timeout=5)